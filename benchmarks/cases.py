@@ -0,0 +1,323 @@
+import random
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List
+
+from coriander.analysis import TemplateAnalysis
+from coriander.generation import DefaultGenerator
+from coriander.incremental import IncrementalMatcher
+from coriander.intents import DefaultIntentIndex
+from coriander.matching import (
+    DefaultMatcher,
+    DefaultMemoizedMatcher,
+    DefaultNFAMatcher,
+    DefaultRegexMatcher,
+    Matcher,
+)
+from coriander.tokenizers import DefaultTokenizer
+
+ENGINES: Dict[str, Callable[[], Matcher]] = {
+    'matcher': DefaultMatcher,
+    'lazy': partial(DefaultMatcher, lazy=True),
+    'memoized': DefaultMemoizedMatcher,
+    'regex': DefaultRegexMatcher,
+    'nfa': DefaultNFAMatcher,
+}
+
+GREETING_TEMPLATE = '[hello|hi|good [morning|evening]]~greeting my name is *~name'
+ANCHORED_TEMPLATE = '*~greeting my name is *~name'
+BOOKING_WORDS = ['book', 'order', 'find', 'table', 'room', 'cancel', 'today', 'taxi']
+
+
+class Benchmark:
+    """Function timed by the runner, identified by group, name and params."""
+
+    def __init__(
+        self,
+        group: str,
+        name: str,
+        params: Dict[str, Any],
+        function: Callable[[], Any],
+    ) -> None:
+        self.group = group
+        self.name = name
+        self.params = params
+        self.function = function
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(id={repr(self.id)})'
+
+    @property
+    def id(self) -> str:
+        params = ','.join(f'{key}={value}' for key, value in self.params.items())
+        return f'{self.group}.{self.name}[{params}]'
+
+
+def consume(create_iterator: Callable[[], Iterable[Any]]) -> None:
+    for _ in create_iterator():
+        pass
+
+
+def append_chars(incremental_matcher: IncrementalMatcher, message: str) -> None:
+    session = incremental_matcher.session()
+    for char in message:
+        session.append(char)
+        if not session.viable:
+            break
+    session.match_results()
+
+
+def long_template(words_count: int) -> str:
+    return ' '.join(
+        ['[hello|hi]~greeting', '(dear)', 'INT~age', '*~name'][index % 4]
+        for index in range(words_count)
+    )
+
+
+def synonyms(count: int) -> List[str]:
+    greetings = ['hello', 'hi', 'hey', 'good day']
+    return [f'{greetings[index % 4]} no{index}' for index in range(count)]
+
+
+def nested_template(depth: int) -> str:
+    template = 'a'
+    for index in range(depth):
+        template = f'[{template}|b{index}]~c{index} (x)'
+    return template
+
+
+def tokenizer_benchmarks() -> List[Benchmark]:
+    tokenizer = DefaultTokenizer()
+    benchmarks = []
+
+    for words_count in (10, 100, 1000):
+        template = long_template(words_count)
+        benchmarks.append(
+            Benchmark(
+                group='tokenize',
+                name='long',
+                params={'words': words_count},
+                function=partial(tokenizer.tokenize, template),
+            )
+        )
+
+    for depth in (5, 20, 80):
+        template = nested_template(depth)
+        benchmarks.append(
+            Benchmark(
+                group='tokenize',
+                name='nested',
+                params={'depth': depth},
+                function=partial(tokenizer.tokenize, template),
+            )
+        )
+
+    return benchmarks
+
+
+def matcher_benchmarks() -> List[Benchmark]:
+    benchmarks = []
+
+    for engine, create_matcher in ENGINES.items():
+        matcher = create_matcher()
+        template = matcher.compile(GREETING_TEMPLATE)
+        anchored_template = matcher.compile(ANCHORED_TEMPLATE)
+
+        for length in (10, 100, 1000):
+            name = 'x' * length
+            success_message = f'good morning my name is {name}'
+            failure_message = f'good morning my surname is {name}'
+            benchmarks.append(
+                Benchmark(
+                    group='match',
+                    name='success',
+                    params={'engine': engine, 'length': length},
+                    function=partial(matcher.match, success_message, template),
+                )
+            )
+            benchmarks.append(
+                Benchmark(
+                    group='match',
+                    name='failure',
+                    params={'engine': engine, 'length': length},
+                    function=partial(matcher.match, failure_message, template),
+                )
+            )
+            # Any tokens around a literal, the greeting as long as the name.
+            anchored_message = f'{"hey " * (length // 4)}my name is {name}'
+            benchmarks.append(
+                Benchmark(
+                    group='match',
+                    name='anchored',
+                    params={'engine': engine, 'length': length},
+                    function=partial(
+                        matcher.match,
+                        anchored_message,
+                        anchored_template,
+                    ),
+                )
+            )
+
+        # Backtracking is exponential in the number of words here.
+        lengths = (4, 8) if engine in ('matcher', 'lazy') else (8, 32, 128)
+        pathological_template = matcher.compile('* * * * x')
+        for length in lengths:
+            message = 'a ' * length
+            benchmarks.append(
+                Benchmark(
+                    group='match',
+                    name='pathological',
+                    params={'engine': engine, 'words': length},
+                    function=partial(matcher.match, message, pathological_template),
+                )
+            )
+
+        for synonyms_count in (10, 100, 1000):
+            greetings = synonyms(synonyms_count)
+            synonyms_template = matcher.compile(
+                f'[{"|".join(greetings)}]~greeting my name is *~name'
+            )
+            message = f'{greetings[-1]} my name is Anise'
+            benchmarks.append(
+                Benchmark(
+                    group='match',
+                    name='synonyms',
+                    params={'engine': engine, 'synonyms': synonyms_count},
+                    function=partial(matcher.match, message, synonyms_template),
+                )
+            )
+
+    return benchmarks
+
+
+def intents_benchmarks() -> List[Benchmark]:
+    benchmarks = []
+    message = 'please book a table for 4 at 19 in Anise'
+
+    for templates_count in (10, 100, 1000):
+        rng = random.Random(templates_count)
+        templates = [
+            f'[please|] {rng.choice(["book", "order", "find"])}{index} '
+            f'a [table|room] for INT~people *~rest'
+            for index in range(templates_count - 1)
+        ] + ['please book a [table|room] for INT~people at INT~time in *~place']
+
+        matcher = DefaultMemoizedMatcher(cache_size=None)
+        compiled_templates = [matcher.compile(template) for template in templates]
+        benchmarks.append(
+            Benchmark(
+                group='intents',
+                name='match_many_templates',
+                params={'templates': templates_count},
+                function=partial(
+                    consume,
+                    partial(matcher.match_many_templates, message, compiled_templates),
+                ),
+            )
+        )
+
+        index = DefaultIntentIndex({'booking': templates})
+        benchmarks.append(
+            Benchmark(
+                group='intents',
+                name='intent_index',
+                params={'templates': templates_count},
+                function=partial(index.match, message),
+            )
+        )
+
+        benchmarks.append(
+            Benchmark(
+                group='intents',
+                name='analysis',
+                params={'templates': templates_count},
+                function=partial(TemplateAnalysis, matcher, compiled_templates),
+            )
+        )
+
+        star_templates = [
+            f'* {rng.choice(BOOKING_WORDS)} * {rng.choice(BOOKING_WORDS)} *'
+            for _ in range(templates_count)
+        ]
+        benchmarks.append(
+            Benchmark(
+                group='intents',
+                name='analysis_stars',
+                params={'templates': templates_count},
+                function=partial(TemplateAnalysis, matcher, star_templates),
+            )
+        )
+
+        incremental_matcher = IncrementalMatcher(matcher, templates)
+        benchmarks.append(
+            Benchmark(
+                group='intents',
+                name='incremental',
+                params={'templates': templates_count},
+                function=partial(append_chars, incremental_matcher, message),
+            )
+        )
+
+    return benchmarks
+
+
+def generator_benchmarks() -> List[Benchmark]:
+    generator = DefaultGenerator()
+    benchmarks = []
+
+    for words_count in (10, 100):
+        template = generator.compile(long_template(words_count))
+        benchmarks.append(
+            Benchmark(
+                group='generate',
+                name='random',
+                params={'words': words_count},
+                function=partial(generator.generate, template),
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                group='generate',
+                name='context',
+                params={'words': words_count},
+                function=partial(
+                    generator.generate,
+                    template,
+                    context={'greeting': 'hi', 'age': 25, 'name': 'Anise'},
+                ),
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                group='generate',
+                name='many',
+                params={'words': words_count, 'n': 1000},
+                function=partial(generator.generate_many, template, 1000, seed=1),
+            )
+        )
+        space = generator.message_space(
+            template,
+            any_values=['Anise', 'Millet'],
+            int_values=[1, 2],
+        )
+        benchmarks.append(
+            Benchmark(
+                group='generate',
+                name='enumerate',
+                params={'words': words_count, 'n': 1000},
+                function=partial(
+                    consume,
+                    partial(space.iterate, space.count // 2, 1000),
+                ),
+            )
+        )
+
+    return benchmarks
+
+
+def all_benchmarks() -> List[Benchmark]:
+    return (
+        tokenizer_benchmarks()
+        + matcher_benchmarks()
+        + intents_benchmarks()
+        + generator_benchmarks()
+    )
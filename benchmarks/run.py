@@ -0,0 +1,111 @@
+"""Run benchmarks and write results as JSON.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --filter match.pathological --compare results.json
+
+Every benchmark is calibrated to run at least `--min-time` seconds per round,
+and the best, mean and standard deviation of `--repeat` rounds are reported
+per call. With `--compare`, the ratio to the best time of the same benchmark
+in a previous results file is printed next to each result.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.cases import Benchmark, all_benchmarks
+
+FORMAT_VERSION = 1
+
+
+def measure(benchmark: Benchmark, repeat: int, min_time: float) -> Dict[str, Any]:
+    function = benchmark.function
+    perf_counter = time.perf_counter
+
+    number = 1
+    while True:
+        started_at = perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = perf_counter() - started_at
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 10 < min_time else 10
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        started_at = perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((perf_counter() - started_at) / number)
+
+    return {
+        'id': benchmark.id,
+        'group': benchmark.group,
+        'name': benchmark.name,
+        'params': benchmark.params,
+        'number': number,
+        'repeat': repeat,
+        'best': min(timings),
+        'mean': statistics.mean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    with open(path) as file:
+        data = json.load(file)
+    return {result['id']: result['best'] for result in data['results']}
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:8.2f} {unit}'
+    return f'{seconds / 1e-9:8.2f} ns'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run coriander benchmarks.')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--filter', default='', help='run benchmarks with id part')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05)
+    parser.add_argument('--compare', help='results file to compare with')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.compare) if args.compare else {}
+    results = []
+
+    for benchmark in all_benchmarks():
+        if args.filter not in benchmark.id:
+            continue
+        result = measure(benchmark, repeat=args.repeat, min_time=args.min_time)
+        results.append(result)
+
+        line = f'{benchmark.id:<60} {format_time(result["best"])}'
+        if benchmark.id in baseline:
+            line += f'  x{result["best"] / baseline[benchmark.id]:.2f}'
+        print(line, flush=True)
+
+    if args.output:
+        data = {
+            'format_version': FORMAT_VERSION,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(data, file, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Union
+
+from coriander.core import CompiledTemplate, MatchResult
+from coriander.matching import Matcher
+from coriander.parallel import chunked
+
+
+def match_within(
+    matcher: Matcher,
+    message: str,
+    template: Union[str, CompiledTemplate],
+    max_steps: Optional[int],
+    deadline: Optional[float],
+) -> MatchResult:
+    if max_steps is None and deadline is None:
+        return matcher.match(message=message, template=template)
+
+    timeout = None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+    return matcher.match(
+        message=message,
+        template=template,
+        max_steps=max_steps,
+        timeout=timeout,
+    )
+
+
+def match_chunk(
+    matcher: Matcher,
+    messages: List[str],
+    template: CompiledTemplate,
+    max_steps: Optional[int],
+    deadline: Optional[float],
+) -> List[MatchResult]:
+    return [
+        match_within(matcher, message, template, max_steps, deadline)
+        for message in messages
+    ]
+
+
+def check_deadline(results: List[MatchResult], deadline: Optional[float]) -> None:
+    """Raise timeout for matches the engine aborted before `wait_for` did."""
+    if deadline is None or time.perf_counter() < deadline:
+        return
+    if any(result.aborted for result in results):
+        raise asyncio.TimeoutError()
+
+
+class AsyncMatcher:
+    """Match templates from asyncio code without blocking the event loop.
+
+    Matches run in `executor`, a thread pool of `max_concurrency` threads by
+    default. At most `max_concurrency` jobs are submitted at once, the rest
+    wait on a semaphore, so a burst of calls never builds a long executor
+    queue. With `timeout`, `asyncio.TimeoutError` is raised after that many
+    seconds, including the wait for a slot.
+
+    Cancelled and timed out calls never start jobs that have not started
+    yet. A job already running in a thread cannot be interrupted, but its
+    matches share the deadline of the call and are aborted there, see
+    `Matcher.match`, so the slot is freed soon after the timeout. NFA
+    matches ignore budgets, but take time linear in message length.
+    """
+
+    def __init__(
+        self,
+        matcher: Matcher,
+        executor: Optional[Executor] = None,
+        max_concurrency: int = 4,
+    ) -> None:
+        self.matcher = matcher
+        self.max_concurrency = max_concurrency
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix='coriander',
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'matcher={repr(self.matcher)}, '
+            f'max_concurrency={self.max_concurrency})'
+        )
+
+    async def match(
+        self,
+        message: str,
+        template: Union[str, CompiledTemplate],
+        timeout: Optional[float] = None,
+        max_steps: Optional[int] = None,
+    ) -> MatchResult:
+        """Match message and template. See `Matcher.match` for `max_steps`."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        result = await asyncio.wait_for(
+            self.run(
+                match_within,
+                self.matcher,
+                message,
+                template,
+                max_steps,
+                deadline,
+            ),
+            timeout=timeout,
+        )
+        check_deadline([result], deadline)
+        return result
+
+    async def match_many(
+        self,
+        messages: Iterable[str],
+        template: Union[str, CompiledTemplate],
+        timeout: Optional[float] = None,
+        chunksize: int = 100,
+        max_steps: Optional[int] = None,
+    ) -> List[MatchResult]:
+        """Match messages with template. Return results in order of messages.
+
+        Messages are matched in chunks, so other calls get slots in between
+        and a cancelled call drops the chunks that have not started.
+        `max_steps` limits every match on its own.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        results = await asyncio.wait_for(
+            self._match_many(messages, template, chunksize, max_steps, deadline),
+            timeout=timeout,
+        )
+        check_deadline(results, deadline)
+        return results
+
+    async def _match_many(
+        self,
+        messages: Iterable[str],
+        template: Union[str, CompiledTemplate],
+        chunksize: int,
+        max_steps: Optional[int],
+        deadline: Optional[float],
+    ) -> List[MatchResult]:
+        compiled_template = await self.run(self.matcher.compile, template)
+        chunks = await asyncio.gather(
+            *[
+                self.run(
+                    match_chunk,
+                    self.matcher,
+                    chunk,
+                    compiled_template,
+                    max_steps,
+                    deadline,
+                )
+                for chunk in chunked(messages, chunksize)
+            ]
+        )
+        return [result for chunk in chunks for result in chunk]
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run function in the executor once a slot is free. Return its result."""
+        loop = asyncio.get_event_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._semaphore
+
+        await semaphore.acquire()
+        try:
+            future = self.executor.submit(function, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_: Future) -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(semaphore.release)
+
+        # Released when the job is done or cancelled before it started.
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def close(self) -> None:
+        """Shut down the executor created by this matcher, if any."""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,386 @@
+from collections import deque
+from itertools import count
+from typing import (
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from coriander.core import CompiledTemplate
+from coriander.matching import Matcher
+from coriander.nfa import DIGITS, NFA, DFAState, NFACompiledTemplate, NFACompiler
+from coriander.prefilter import LiteralPrefilter
+
+
+class AnalysisAborted(Exception):
+    """Raised when comparing templates needs more DFA states than allowed."""
+
+
+class Comparison:
+    """What two templates match: a message in common, and messages of one only."""
+
+    __slots__ = ('overlap', 'first_only', 'second_only')
+
+    def __init__(self, overlap: bool, first_only: bool, second_only: bool) -> None:
+        self.overlap = overlap
+        self.first_only = first_only
+        self.second_only = second_only
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'overlap={self.overlap}, '
+            f'first_only={self.first_only}, '
+            f'second_only={self.second_only})'
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Comparison) and (
+            (other.overlap, other.first_only, other.second_only)
+            == (self.overlap, self.first_only, self.second_only)
+        )
+
+    def swapped(self) -> 'Comparison':
+        return Comparison(self.overlap, self.second_only, self.first_only)
+
+
+class TemplateAnalysis:
+    """Languages of templates, i.e. the messages they match, compared.
+
+    Templates are compiled to NFAs and compared pair by pair, walking the
+    product of their lazy DFAs until it is known whether they match a message
+    in common and whether each one matches a message the other does not. The
+    DFA of a template can be exponential in its size, so a walk visiting
+    more than `max_states` states raises `AnalysisAborted`.
+
+    Most pairs are never walked. A template can only match every message of
+    another one if it matches the shortest of them, and the templates that
+    do are found through the literal prefilter. Templates only match a
+    message in common if they can start with the same char.
+
+    Contexts are not compared: templates matching the same messages with
+    different names are duplicates. Templates with custom tokens have no
+    NFA; they are left out of every report and always kept.
+    """
+
+    def __init__(
+        self,
+        matcher: Matcher,
+        templates: Iterable[Union[str, CompiledTemplate]],
+        max_states: int = 10000,
+    ) -> None:
+        self.matcher = matcher
+        self.compiled_templates = [matcher.compile(template) for template in templates]
+        self.max_states = max_states
+
+        self._nfas: Dict[int, NFA] = {}
+        for index, compiled_template in enumerate(self.compiled_templates):
+            if isinstance(compiled_template, NFACompiledTemplate):
+                nfa = compiled_template.nfa
+            else:
+                nfa = NFACompiler().compile(compiled_template.tokens)
+            if nfa is not None:
+                self._nfas[index] = nfa
+
+        # Shortest message of every template matching some message.
+        self._samples: Dict[int, str] = {}
+        for index in self._nfas:
+            sample = self._shortest_message(index)
+            if sample is not None:
+                self._samples[index] = sample
+
+        self._comparisons: Dict[Tuple[int, int], Comparison] = {}
+        self._overlaps: Optional[List[Tuple[int, int]]] = None
+        # Indices of other templates matching every message of a template.
+        self._covering: Dict[int, Set[int]] = {index: set() for index in self._samples}
+
+        prefilter = LiteralPrefilter()
+        for index in self._samples:
+            prefilter.add(index, self.compiled_templates[index].tokens)
+        for index, sample in self._samples.items():
+            for other in prefilter.candidates(sample):
+                if (
+                    other != index
+                    and self._nfas[other].accepts(sample)
+                    and not self.compare(index, other).first_only
+                ):
+                    self._covering[index].add(other)
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'matcher={repr(self.matcher)}, '
+            f'templates={len(self.compiled_templates)})'
+        )
+
+    def compare(self, index: int, other: int) -> Comparison:
+        """Compare templates at index and other, walking their product once."""
+        if index > other:
+            return self.compare(other, index).swapped()
+        comparison = self._comparisons.get((index, other))
+        if comparison is None:
+            comparison = self._walk(index, other)
+            self._comparisons[index, other] = comparison
+        return comparison
+
+    def unmatchable(self) -> List[CompiledTemplate]:
+        """Return templates matching no message."""
+        return [
+            self.compiled_templates[index]
+            for index in self._nfas
+            if index not in self._samples
+        ]
+
+    def duplicates(self) -> List[List[CompiledTemplate]]:
+        """Return groups of templates matching the same messages.
+
+        Groups and their templates are in order of templates, and
+        unmatchable templates are not grouped.
+        """
+        groups: Dict[FrozenSet[int], List[CompiledTemplate]] = {}
+        for index in self._samples:
+            groups.setdefault(self._equivalents(index), []).append(
+                self.compiled_templates[index]
+            )
+        return [group for group in groups.values() if len(group) > 1]
+
+    def subsumptions(self) -> List[Tuple[CompiledTemplate, CompiledTemplate]]:
+        """Return pairs of templates, the first matching fewer messages.
+
+        Every message the first template matches, the second one matches
+        too. Duplicates and unmatchable templates are not reported.
+        """
+        return [
+            (self.compiled_templates[index], self.compiled_templates[other])
+            for index, covering in self._covering.items()
+            for other in sorted(covering)
+            if index not in self._covering[other]
+        ]
+
+    def overlaps(self) -> List[Tuple[CompiledTemplate, CompiledTemplate]]:
+        """Return pairs of templates matching a message in common.
+
+        Every pair of templates that can start with the same char is
+        compared, so this costs up to a walk per pair of templates.
+        """
+        return [
+            (self.compiled_templates[index], self.compiled_templates[other])
+            for index, other in self._overlapping_pairs()
+        ]
+
+    def minimized_templates(self) -> List[CompiledTemplate]:
+        """Return templates matching the same messages as all templates together.
+
+        Unmatchable templates, templates matching fewer messages than another
+        one and all but the first of duplicates are dropped. A template
+        matching only messages several others match together is kept.
+        Messages keep matching, but with contexts of the kept templates.
+        """
+        minimized_templates = []
+        for index, compiled_template in enumerate(self.compiled_templates):
+            if index not in self._nfas:
+                minimized_templates.append(compiled_template)
+                continue
+            covering = self._covering.get(index)
+            if covering is None:
+                continue
+            # Dropped for a template matching more messages or a first duplicate.
+            if any(
+                index not in self._covering[other] or other < index
+                for other in covering
+            ):
+                continue
+            minimized_templates.append(compiled_template)
+        return minimized_templates
+
+    def _equivalents(self, index: int) -> FrozenSet[int]:
+        return frozenset(
+            other for other in self._covering[index] if index in self._covering[other]
+        ) | {index}
+
+    def _overlapping_pairs(self) -> List[Tuple[int, int]]:
+        if self._overlaps is None:
+            self._overlaps = [
+                (index, other)
+                for index, other in self._overlap_candidates()
+                if self._overlap(index, other)
+            ]
+        return self._overlaps
+
+    def _overlap(self, index: int, other: int) -> bool:
+        # A template matching the shortest message of the other one overlaps it.
+        if self._nfas[other].accepts(self._samples[index]):
+            return True
+        if self._nfas[index].accepts(self._samples[other]):
+            return True
+        comparison = self._comparisons.get((index, other))
+        if comparison is None:
+            return self._walk(index, other, overlap_only=True).overlap
+        return comparison.overlap
+
+    def _overlap_candidates(self) -> List[Tuple[int, int]]:
+        # Templates by chars they can start with, and by classes of chars
+        # they start with when the char is not named by them.
+        by_char: Dict[str, Set[int]] = {}
+        by_class: Dict[bool, Set[int]] = {True: set(), False: set()}
+        empty: Set[int] = set()
+        starts: Dict[int, Tuple[Set[str], Set[bool]]] = {}
+        for index in self._samples:
+            nfa = self._nfas[index]
+            state = nfa.start_state
+            chars = {
+                char
+                for char in nfa.chars(state)
+                if nfa.live(nfa.transition(state, char))
+            }
+            classes = {
+                char in DIGITS
+                for char in _unnamed_chars(nfa.chars(state))
+                if nfa.live(nfa.transition(state, char))
+            }
+            starts[index] = (chars, classes)
+            for char in chars:
+                by_char.setdefault(char, set()).add(index)
+            for is_digit in classes:
+                by_class[is_digit].add(index)
+            if nfa.matches(state):
+                empty.add(index)
+
+        pairs: Set[Tuple[int, int]] = set()
+        for index, (chars, classes) in starts.items():
+            candidates = set(empty) if index in empty else set()
+            for char in chars:
+                candidates |= by_char[char] | by_class[char in DIGITS]
+            for is_digit in classes:
+                candidates |= by_class[is_digit]
+                for char, indices in by_char.items():
+                    if (char in DIGITS) == is_digit:
+                        candidates |= indices
+            pairs.update((index, other) for other in candidates if index < other)
+        return sorted(pairs)
+
+    def _shortest_message(self, index: int) -> Optional[str]:
+        nfa = self._nfas[index]
+        start = nfa.start_state
+        if not nfa.live(start):
+            return None
+        # Char and previous kernel of every kernel reached.
+        parents: Dict[FrozenSet[int], Tuple[str, FrozenSet[int]]] = {}
+        queue: Deque[DFAState] = deque([start])
+        seen = {start.kernel}
+
+        while queue:
+            state = queue.popleft()
+            if nfa.matches(state):
+                chars = []
+                kernel = state.kernel
+                while kernel != start.kernel:
+                    char, kernel = parents[kernel]
+                    chars.append(char)
+                return ''.join(reversed(chars))
+
+            named_chars = nfa.chars(state)
+            for char in sorted(named_chars) + _unnamed_chars(named_chars):
+                next_state = nfa.transition(state, char)
+                if next_state.kernel in seen or not nfa.live(next_state):
+                    continue
+                self._check_states(len(seen), index)
+                seen.add(next_state.kernel)
+                parents[next_state.kernel] = (char, state.kernel)
+                queue.append(next_state)
+
+        return None  # pragma: no cover
+
+    def _walk(self, index: int, other: int, overlap_only: bool = False) -> Comparison:
+        """Walk the product of two DFAs until what is asked for is known.
+
+        When only overlap is asked for, other facts of the result may be wrong.
+        """
+        nfa = self._nfas[index]
+        other_nfa = self._nfas[other]
+        overlap = first_only = second_only = False
+        stack = [(nfa.start_state, other_nfa.start_state)]
+        seen = {(nfa.start_state.kernel, other_nfa.start_state.kernel)}
+
+        while stack and not (overlap and (overlap_only or first_only and second_only)):
+            state, other_state = stack.pop()
+            matched = bool(nfa.matches(state))
+            other_matched = bool(other_nfa.matches(other_state))
+            live = bool(nfa.live(state))
+            other_live = bool(other_nfa.live(other_state))
+            if matched and other_matched:
+                overlap = True
+            if matched and not other_matched or live and not other_live:
+                first_only = True
+            if other_matched and not matched or other_live and not live:
+                second_only = True
+            # Once a template cannot match, continuations tell nothing new.
+            if not (live and other_live):
+                continue
+
+            named_chars = nfa.chars(state) | other_nfa.chars(other_state)
+            for char in list(named_chars) + _unnamed_chars(named_chars):
+                next_state = nfa.transition(state, char)
+                next_other_state = other_nfa.transition(other_state, char)
+                key = (next_state.kernel, next_other_state.kernel)
+                if key not in seen:
+                    self._check_states(len(seen), index, other)
+                    seen.add(key)
+                    stack.append((next_state, next_other_state))
+
+        return Comparison(overlap, first_only, second_only)
+
+    def _check_states(self, states_count: int, *indices: int) -> None:
+        if states_count >= self.max_states:
+            templates = ', '.join(
+                repr(self.compiled_templates[index].template) for index in indices
+            )
+            raise AnalysisAborted(
+                f'Comparing {templates} needs more than {self.max_states} states'
+            )
+
+
+def _unnamed_chars(named_chars: FrozenSet[str]) -> List[str]:
+    """Return a digit and another char not in named_chars, if there are any.
+
+    Chars no char instruction names step like any other char of their class.
+    """
+    chars = [char for char in '0123456789' if char not in named_chars][:1]
+    for code in count(ord('a')):
+        if chr(code) not in named_chars:
+            chars.append(chr(code))
+            return chars
+    return chars  # pragma: no cover
+
+
+def overlapping_intents(
+    matcher: Matcher,
+    intents: Mapping[str, Iterable[Union[str, CompiledTemplate]]],
+) -> List[Tuple[str, str]]:
+    """Return pairs of intents having templates matching a message in common.
+
+    Pairs and their intents are in order of intents.
+    """
+    names = list(intents)
+    template_intents = []
+    templates = []
+    for position, intent in enumerate(names):
+        for template in intents[intent]:
+            template_intents.append(position)
+            templates.append(template)
+
+    analysis = TemplateAnalysis(matcher, templates)
+    pairs = set()
+    # One overlapping pair of templates is enough for a pair of intents.
+    for index, other in analysis._overlap_candidates():
+        pair = tuple(sorted((template_intents[index], template_intents[other])))
+        if pair[0] != pair[1] and pair not in pairs and analysis._overlap(index, other):
+            pairs.add(pair)
+    return [(names[position], names[other]) for position, other in sorted(pairs)]
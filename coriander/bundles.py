@@ -0,0 +1,178 @@
+import mmap
+import pickle
+import struct
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from coriander import __version__
+from coriander.compilation import TemplateCompiler
+from coriander.core import CompiledTemplate
+
+MAGIC = b'CORIANDER-BUNDLE'
+FORMAT_VERSION = 1
+
+# Magic, format version, length of coriander version and length of the index.
+_HEADER = struct.Struct(f'<{len(MAGIC)}sHHI')
+
+
+class TemplateBundle(Mapping):
+    """Compiled templates by template, saved to a file and loaded without tokenizing.
+
+    The file starts with a header holding the format and coriander versions
+    and an index of templates, followed by every compiled template pickled
+    on its own. Loading reads the index only; a compiled template is
+    unpickled on first access, so start-up time does not depend on how
+    complex templates are. Custom tokens are pickled by reference, so their
+    classes must be importable where the bundle is loaded. Unpickling can run
+    arbitrary code: only load bundles from trusted sources.
+
+    Templates are compiled by the matcher or generator given to `compile`,
+    e.g. regex matchers store their patterns, and the bundle records its
+    class as `compiler`. Load bundles through `precompiled_templates`; other
+    kinds of matchers convert templates once, when they cache them, and
+    compilers with another `optimize` flag reject the bundle.
+    """
+
+    def __init__(
+        self,
+        compiled_templates: Iterable[CompiledTemplate],
+        optimize: bool = True,
+        compiler: Optional[str] = None,
+    ) -> None:
+        self.optimize = optimize
+        self.compiler = compiler
+        self._compiled_templates: Dict[str, CompiledTemplate] = {
+            compiled_template.template: compiled_template
+            for compiled_template in compiled_templates
+        }
+        # Set for loaded bundles: data and spans of templates not unpickled yet.
+        self._data: Optional[memoryview] = None
+        self._spans: Dict[str, Tuple[int, int]] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'templates={len(self)}, '
+            f'optimize={self.optimize}, '
+            f'compiler={repr(self.compiler)})'
+        )
+
+    def __len__(self) -> int:
+        return len(self._compiled_templates) + len(self._spans)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._compiled_templates
+        yield from list(self._spans)
+
+    def __contains__(self, template: object) -> bool:
+        return template in self._compiled_templates or template in self._spans
+
+    def __getitem__(self, template: str) -> CompiledTemplate:
+        compiled_template = self._compiled_templates.get(template)
+        if compiled_template is not None:
+            return compiled_template
+
+        start, end = self._spans[template]
+        assert self._data is not None
+        compiled_template = pickle.loads(self._data[start:end])
+        self._compiled_templates[template] = compiled_template
+        self._spans.pop(template, None)
+        return compiled_template
+
+    def __reduce__(self) -> tuple:
+        return self.__class__.loads, (self.dumps(),)
+
+    @classmethod
+    def compile(
+        cls,
+        compiler: TemplateCompiler,
+        templates: Iterable[str],
+    ) -> 'TemplateBundle':
+        """Compile templates with matcher or generator, bypassing its cache."""
+        return cls(
+            compiled_templates=[
+                compiler.compile_template(template) for template in templates
+            ],
+            optimize=compiler.optimize,
+            compiler=compiler_name(compiler),
+        )
+
+    def dumps(self) -> bytes:
+        if self._data is not None:
+            # Loaded bundles are immutable, pickled templates are still valid.
+            return bytes(self._data)
+
+        payloads: List[bytes] = []
+        index: List[Tuple[str, int, int]] = []
+        offset = 0
+        for template, compiled_template in self._compiled_templates.items():
+            payload = pickle.dumps(compiled_template, protocol=pickle.HIGHEST_PROTOCOL)
+            payloads.append(payload)
+            index.append((template, offset, offset + len(payload)))
+            offset += len(payload)
+
+        version = __version__.encode()
+        index_payload = pickle.dumps(
+            {'optimize': self.optimize, 'compiler': self.compiler, 'index': index},
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(version), len(index_payload))
+        return b''.join([header, version, index_payload] + payloads)
+
+    @classmethod
+    def loads(cls, data: Union[bytes, mmap.mmap]) -> 'TemplateBundle':
+        """Load bundle from data, which is referenced until all templates are used.
+
+        Templates are unpickled, so data must come from a trusted source.
+        """
+        view = memoryview(data)
+        if len(view) < _HEADER.size:
+            raise ValueError('Not a template bundle: data is too short')
+
+        magic, format_version, version_length, index_length = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('Not a template bundle: wrong magic bytes')
+        if format_version != FORMAT_VERSION:
+            raise ValueError(
+                f'Unsupported template bundle format {format_version}, '
+                f'expected {FORMAT_VERSION}'
+            )
+
+        version_end = _HEADER.size + version_length
+        version = bytes(view[_HEADER.size : version_end]).decode()
+        if version != __version__:
+            raise ValueError(
+                f'Template bundle was written by coriander {version}, '
+                f'this is coriander {__version__}; rebuild the bundle'
+            )
+
+        index_end = version_end + index_length
+        index_data = pickle.loads(view[version_end:index_end])
+
+        bundle = cls(
+            compiled_templates=[],
+            optimize=index_data['optimize'],
+            compiler=index_data['compiler'],
+        )
+        bundle._data = view
+        bundle._spans = {
+            template: (index_end + start, index_end + end)
+            for template, start, end in index_data['index']
+        }
+        return bundle
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as file:
+            file.write(self.dumps())
+
+    @classmethod
+    def load(cls, path: str) -> 'TemplateBundle':
+        """Load bundle from trusted file through a read-only memory map."""
+        with open(path, 'rb') as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.loads(mapping)
+
+
+def compiler_name(compiler: TemplateCompiler) -> str:
+    """Return qualified name of the class of compiler."""
+    compiler_class = compiler.__class__
+    return f'{compiler_class.__module__}.{compiler_class.__qualname__}'
@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from typing import Mapping, Optional, Union
+
+from coriander.core import BaseTokenizer, CompiledTemplate
+from coriander.optimization import optimize
+
+
+class CacheInfo:
+    def __init__(
+        self,
+        hits: int,
+        misses: int,
+        maxsize: Optional[int],
+        currsize: int,
+    ) -> None:
+        self.hits = hits
+        self.misses = misses
+        self.maxsize = maxsize
+        self.currsize = currsize
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'hits={self.hits}, '
+            f'misses={self.misses}, '
+            f'maxsize={self.maxsize}, '
+            f'currsize={self.currsize})'
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, self.__class__) and (
+            (other.hits, other.misses, other.maxsize, other.currsize)
+            == (self.hits, self.misses, self.maxsize, self.currsize)
+        )
+
+
+class TemplateCache:
+    """LRU cache of compiled templates.
+
+    ``maxsize=None`` makes the cache unbounded, ``maxsize=0`` disables it.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 128) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._compiled_templates: 'OrderedDict[str, CompiledTemplate]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._compiled_templates)
+
+    def __contains__(self, template: object) -> bool:
+        return template in self._compiled_templates
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, template: str) -> Optional[CompiledTemplate]:
+        with self._lock:
+            compiled_template = self._compiled_templates.get(template)
+            if compiled_template is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._compiled_templates.move_to_end(template)
+            return compiled_template
+
+    def set(self, template: str, compiled_template: CompiledTemplate) -> None:
+        if self.maxsize == 0:
+            return
+
+        with self._lock:
+            self._compiled_templates[template] = compiled_template
+            self._compiled_templates.move_to_end(template)
+            if self.maxsize is not None:
+                while len(self._compiled_templates) > self.maxsize:
+                    self._compiled_templates.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._compiled_templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            maxsize=self.maxsize,
+            currsize=len(self._compiled_templates),
+        )
+
+
+class TemplateCompiler:
+    """Tokenize-once access to templates shared by matchers and generators.
+
+    With `optimize`, tokens are rewritten by `coriander.optimization.optimize`
+    after tokenization; disable it to get tokens exactly as tokenized.
+
+    Templates missing in the cache are looked up in `precompiled_templates`,
+    e.g. a `coriander.bundles.TemplateBundle`, before they are compiled.
+    Precompiled templates are converted once by `convert_compiled_template`
+    when they are cached, e.g. to the patterns a regex matcher runs.
+    Precompiled templates with an `optimize` flag, like bundles, must have
+    the one of the compiler.
+    """
+
+    def __init__(
+        self,
+        tokenizer: BaseTokenizer,
+        cache_size: Optional[int] = 128,
+        optimize: bool = True,
+    ) -> None:
+        self.tokenizer = tokenizer
+        self.template_cache = TemplateCache(maxsize=cache_size)
+        self.optimize = optimize
+        self._precompiled_templates: Optional[Mapping[str, CompiledTemplate]] = None
+
+    @property
+    def precompiled_templates(self) -> Optional[Mapping[str, CompiledTemplate]]:
+        return self._precompiled_templates
+
+    @precompiled_templates.setter
+    def precompiled_templates(
+        self,
+        precompiled_templates: Optional[Mapping[str, CompiledTemplate]],
+    ) -> None:
+        optimize = getattr(precompiled_templates, 'optimize', self.optimize)
+        if optimize != self.optimize:
+            raise ValueError(
+                f'Precompiled templates have optimize={optimize}, '
+                f'the compiler has optimize={self.optimize}'
+            )
+        self._precompiled_templates = precompiled_templates
+
+    def compile(self, template: Union[str, CompiledTemplate]) -> CompiledTemplate:
+        """Return compiled template, using the cache. Compiled templates pass through."""
+        if isinstance(template, CompiledTemplate):
+            return template
+
+        compiled_template = self.template_cache.get(template)
+        if compiled_template is not None:
+            return compiled_template
+
+        if self._precompiled_templates is not None:
+            compiled_template = self._precompiled_templates.get(template)
+        if compiled_template is None:
+            compiled_template = self.compile_template(template)
+        else:
+            compiled_template = self.convert_compiled_template(compiled_template)
+        self.template_cache.set(template, compiled_template)
+        return compiled_template
+
+    def compile_template(self, template: str) -> CompiledTemplate:
+        """Compile template without touching the cache."""
+        tokens = self.tokenizer.tokenize(template=template)
+        if self.optimize:
+            tokens = optimize(tokens)
+        return CompiledTemplate(template=template, tokens=tokens)
+
+    def convert_compiled_template(
+        self,
+        compiled_template: CompiledTemplate,
+    ) -> CompiledTemplate:
+        """Return compiled template of another compiler as this one compiles it."""
+        return compiled_template
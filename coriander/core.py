@@ -1,5 +1,17 @@
+import random
+import re
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
 
 class FindTokenInTemplateResult:
@@ -8,6 +20,80 @@ class FindTokenInTemplateResult:
         self.end = end
 
 
+class TemplateScan:
+    """Template read once by a tokenizer and the finders it calls.
+
+    Bracket pairs and separators are found in one pass over the whole template
+    per kind of brackets and reused by finders of nested tokens. A pair is
+    the one a depth-counting scan from the opening bracket would find.
+    """
+
+    def __init__(self, template: str) -> None:
+        self.template = template
+        self._brackets: Dict[
+            Tuple[str, str, str],
+            Tuple[Dict[int, int], Dict[int, List[int]]],
+        ] = {}
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(template={repr(self.template)})'
+
+    def find_closing(
+        self,
+        start: int,
+        end: int,
+        char_start: str,
+        char_finish: str,
+        char_separator: str = '',
+    ) -> Optional[int]:
+        """Return position of the bracket closing one at start, if before end."""
+        closings, _ = self._find_brackets(char_start, char_finish, char_separator)
+        closing = closings.get(start)
+        if closing is None or closing >= end:
+            return None
+        return closing
+
+    def find_separators(
+        self,
+        start: int,
+        char_start: str,
+        char_finish: str,
+        char_separator: str,
+    ) -> List[int]:
+        """Return positions of separators directly inside brackets opened at start."""
+        _, separators = self._find_brackets(char_start, char_finish, char_separator)
+        return separators.get(start, [])
+
+    def _find_brackets(
+        self,
+        char_start: str,
+        char_finish: str,
+        char_separator: str,
+    ) -> Tuple[Dict[int, int], Dict[int, List[int]]]:
+        key = (char_start, char_finish, char_separator)
+        brackets = self._brackets.get(key)
+        if brackets is not None:
+            return brackets
+
+        closings: Dict[int, int] = {}
+        separators: Dict[int, List[int]] = {}
+        opened: List[int] = []
+        pattern = '[' + re.escape(char_start + char_finish + char_separator) + ']'
+        for bracket_match in re.finditer(pattern, self.template):
+            index = bracket_match.start()
+            char = self.template[index]
+            if char == char_separator and opened:
+                separators.setdefault(opened[-1], []).append(index)
+            elif char == char_finish and opened:
+                closings[opened.pop()] = index
+            elif char == char_start:
+                opened.append(index)
+
+        brackets = (closings, separators)
+        self._brackets[key] = brackets
+        return brackets
+
+
 class BaseTokenFinder(ABC):
     @abstractmethod
     def find_in_template(
@@ -17,17 +103,165 @@ class BaseTokenFinder(ABC):
     ) -> Optional[FindTokenInTemplateResult]:
         """Find token in start of template."""
 
+    def find_in_template_at(
+        self,
+        scan: TemplateScan,
+        start: int,
+        end: int,
+        tokenizer: 'BaseTokenizer',
+    ) -> Optional[FindTokenInTemplateResult]:
+        """Find token in template[start:end] from start. Return absolute end."""
+        find_result = self.find_in_template(
+            template=scan.template[start:end],
+            tokenizer=tokenizer,
+        )
+        if not find_result:
+            return None
+        return FindTokenInTemplateResult(
+            token=find_result.token,
+            end=start + find_result.end,
+        )
+
+    def start_chars(self) -> Optional[FrozenSet[str]]:
+        """Return chars tokens of this finder start with, or None for any char."""
+        return None
+
+
+def _hash_key(key: tuple) -> int:
+    """Hash of key, or of its hashable prefix when a value is unhashable."""
+    try:
+        return hash(key)
+    except TypeError:
+        return hash(key[:1])
+
+
+class MatchContext(Mapping):
+    """Immutable, hashable mapping of associate names to matched values.
+
+    Contexts compare equal to dicts with the same items. Empty contexts are
+    shared, and merging with an empty context returns the context itself.
+    """
+
+    __slots__ = ('_data', '_hash')
+
+    def __init__(self, data: Optional[Mapping[str, Any]] = None) -> None:
+        self._data: dict = dict(data) if data else {}
+        self._hash: Optional[int] = None
+
+    @classmethod
+    def coerce(cls, context: Optional[Mapping[str, Any]]) -> 'MatchContext':
+        if context.__class__ is MatchContext:
+            return context  # type: ignore
+        if not context:
+            return EMPTY_CONTEXT
+        return cls(context)
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({repr(self._data)})'
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, MatchContext):
+            return other._data == self._data
+        if isinstance(other, Mapping):
+            return dict(other) == self._data
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            try:
+                self._hash = hash(frozenset(self._data.items()))
+            except TypeError:
+                self._hash = hash(frozenset(self._data))
+        return self._hash
+
+    def __getstate__(self) -> dict:
+        return self._data
+
+    def __setstate__(self, state: dict) -> None:
+        self._data = state
+        self._hash = None
+
+    def __bool__(self) -> bool:
+        return bool(self._data)
+
+    def merged(self, other: Optional[Mapping[str, Any]]) -> 'MatchContext':
+        """Return context with items of other added, overriding own ones."""
+        if not other:
+            return self
+        if not self._data:
+            return MatchContext.coerce(other)
+        context = MatchContext()
+        context._data.update(self._data)
+        context._data.update(other)
+        return context
+
+
+EMPTY_CONTEXT = MatchContext()
+
 
 class MatchTokenWithMessageResult:
+    __slots__ = ('end', 'value', 'context')
+
     def __init__(
         self,
         end: int,
         value: Any = None,
-        context: Optional[dict] = None,
+        context: Optional[Mapping[str, Any]] = None,
     ) -> None:
         self.end = end
         self.value = value
-        self.context = context
+        self.context = None if context is None else MatchContext.coerce(context)
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'end={repr(self.end)}, '
+            f'value={repr(self.value)}, '
+            f'context={repr(self.context)})'
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, MatchTokenWithMessageResult) and (
+            (other.end, other.value, other.context)
+            == (self.end, self.value, self.context)
+        )
+
+    def __hash__(self) -> int:
+        return _hash_key((self.end, self.value, self.context))
+
+
+class MatchTokenWithMessageSliceResult(MatchTokenWithMessageResult):
+    """Variant whose value is message[start:end], sliced only when accessed."""
+
+    __slots__ = ('message', 'start')
+
+    def __init__(
+        self,
+        message: str,
+        start: int,
+        end: int,
+        context: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        self.message = message
+        self.start = start
+        self.end = end
+        self.context = None if context is None else MatchContext.coerce(context)
+
+    @property  # type: ignore
+    def value(self) -> str:  # type: ignore
+        return self.message[self.start : self.end]
 
 
 class BaseToken(ABC):
@@ -41,6 +275,35 @@ class BaseToken(ABC):
     ) -> List[MatchTokenWithMessageResult]:
         """Match token with start of message. Return variants ending of token."""
 
+    def match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: 'BaseMatcher',
+    ) -> List[MatchTokenWithMessageResult]:
+        """Match token with message from start. Return variants with absolute ends."""
+        return [
+            MatchTokenWithMessageResult(
+                end=start + r.end,
+                value=r.value,
+                context=r.context,
+            )
+            for r in self.match_with_message(message=message[start:], matcher=matcher)
+        ]
+
+    def iter_match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: 'BaseMatcher',
+    ) -> Iterator[MatchTokenWithMessageResult]:
+        """Match token with message from start. Yield variants one by one."""
+        yield from self.match_with_message_at(
+            message=message,
+            start=start,
+            matcher=matcher,
+        )
+
     @abstractmethod
     def generate_message(
         self,
@@ -56,28 +319,93 @@ class BaseTokenizer(ABC):
     def tokenize(self, template: str) -> List[BaseToken]:
         """Convert template to list of tokens."""
 
+    def tokenize_at(self, scan: TemplateScan, start: int, end: int) -> List[BaseToken]:
+        """Convert template[start:end] to list of tokens."""
+        return self.tokenize(scan.template[start:end])
+
+
+class CompiledTemplate:
+    def __init__(self, template: str, tokens: List[BaseToken]) -> None:
+        self.template = template
+        self.tokens = tokens
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(template={repr(self.template)})'
+
 
 class MatchTokensWithMessageResult:
-    def __init__(self, end: int, context: dict) -> None:
+    __slots__ = ('end', 'context')
+
+    def __init__(self, end: int, context: Mapping[str, Any]) -> None:
         self.end = end
-        self.context = context
+        self.context = MatchContext.coerce(context)
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'end={repr(self.end)}, '
+            f'context={repr(self.context)})'
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, MatchTokensWithMessageResult) and (
+            (other.end, other.context) == (self.end, self.context)
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.end, self.context))
 
 
 class MatchResult:
-    def __init__(self, success: bool, context: dict) -> None:
+    """Result of matching a message with a template.
+
+    `aborted` results ran out of their step budget or time before the match
+    was decided. `steps` is the number of token matches of a budgeted match;
+    it is not compared, since it depends on the engine.
+    """
+
+    __slots__ = ('success', 'context', 'aborted', 'steps')
+
+    def __init__(
+        self,
+        success: bool,
+        context: Mapping[str, Any],
+        aborted: bool = False,
+        steps: int = 0,
+    ) -> None:
         self.success = success
-        self.context = context
+        self.context = MatchContext.coerce(context)
+        self.aborted = aborted
+        self.steps = steps
 
     def __bool__(self) -> bool:
         return self.success
 
+    def __repr__(self) -> str:
+        if self.aborted:
+            return f'{self.__class__.__name__}(aborted=True, steps={self.steps})'
+        return (
+            f'{self.__class__.__name__}('
+            f'success={repr(self.success)}, '
+            f'context={repr(self.context)})'
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, MatchResult) and (
+            (other.success, other.context, other.aborted)
+            == (self.success, self.context, self.aborted)
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.success, self.context, self.aborted))
+
 
 class BaseMatcher(ABC):
     @abstractmethod
     def match(
         self,
         message: str,
-        template: str,
+        template: Union[str, CompiledTemplate],
     ) -> MatchResult:
         """Match message and template."""
 
@@ -89,12 +417,40 @@ class BaseMatcher(ABC):
     ) -> List[MatchTokensWithMessageResult]:
         """Match tokens with start of message. Return variants ending of tokens."""
 
+    def match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List['BaseToken'],
+    ) -> List[MatchTokensWithMessageResult]:
+        """Match tokens with message from start. Return variants with absolute ends."""
+        return [
+            MatchTokensWithMessageResult(end=start + r.end, context=r.context)
+            for r in self.match_with_tokens(message=message[start:], tokens=tokens)
+        ]
+
+    def iter_match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List['BaseToken'],
+    ) -> Iterator[MatchTokensWithMessageResult]:
+        """Match tokens with message from start. Yield variants one by one."""
+        yield from self.match_with_tokens_at(
+            message=message,
+            start=start,
+            tokens=tokens,
+        )
+
 
 class BaseGenerator(ABC):
+    # Random source of tokens, `random.Random` like. The `random` module by default.
+    random: Any = random
+
     @abstractmethod
     def generate(
         self,
-        template: str,
+        template: Union[str, CompiledTemplate],
         context: Optional[dict] = None,
     ) -> str:
         """Generate message from template."""
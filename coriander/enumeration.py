@@ -0,0 +1,236 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import Any, Iterator, List, Mapping, Optional, Sequence
+
+from coriander.core import BaseGenerator, BaseToken
+from coriander.tokens import (
+    AnyToken,
+    CharToken,
+    ChoiceToken,
+    IntToken,
+    LiteralToken,
+    OptionalToken,
+)
+
+
+class _Space(ABC):
+    """Messages indexed from 0 to count - 1."""
+
+    count = 0
+
+    @abstractmethod
+    def message_at(self, index: int) -> str:
+        """Return message at index."""
+
+    @abstractmethod
+    def iter_from(self, offset: int) -> Iterator[str]:
+        """Iterate over messages, starting at index offset."""
+
+
+class _Texts(_Space):
+    def __init__(self, texts: Sequence[str]) -> None:
+        self.texts = texts
+        self.count = len(texts)
+
+    def message_at(self, index: int) -> str:
+        return self.texts[index]
+
+    def iter_from(self, offset: int) -> Iterator[str]:
+        return map(self.texts.__getitem__, range(offset, self.count))
+
+
+class _Product(_Space):
+    """Concatenations of messages of parts, the last part changing fastest."""
+
+    def __init__(self, head: _Space, tail: _Space) -> None:
+        self.head = head
+        self.tail = tail
+        self.count = head.count * tail.count
+
+    def message_at(self, index: int) -> str:
+        head_index, tail_index = divmod(index, self.tail.count)
+        return self.head.message_at(head_index) + self.tail.message_at(tail_index)
+
+    def iter_from(self, offset: int) -> Iterator[str]:
+        head_offset, tail_offset = divmod(offset, self.tail.count)
+        for head in self.head.iter_from(head_offset):
+            for tail in self.tail.iter_from(tail_offset):
+                yield head + tail
+            tail_offset = 0
+
+
+class _Union(_Space):
+    """Messages of every alternative, one alternative after another."""
+
+    def __init__(self, alternatives: List[_Space]) -> None:
+        self.alternatives = [space for space in alternatives if space.count]
+        self.ends = list(accumulate(space.count for space in self.alternatives))
+        self.count = self.ends[-1] if self.ends else 0
+
+    def message_at(self, index: int) -> str:
+        position = bisect_right(self.ends, index)
+        start = self.ends[position - 1] if position else 0
+        return self.alternatives[position].message_at(index - start)
+
+    def iter_from(self, offset: int) -> Iterator[str]:
+        position = bisect_right(self.ends, offset)
+        offset -= self.ends[position - 1] if position else 0
+        for space in self.alternatives[position:]:
+            yield from space.iter_from(offset)
+            offset = 0
+
+
+EMPTY_SPACE = _Texts([''])
+
+
+class MessageSpace:
+    """Every expansion of a template, enumerated lazily in a fixed order.
+
+    Expansions are the messages of every choice of every choice and
+    optional token, and of every value of every any and int token. The
+    cross product is never built: messages are made as they are iterated,
+    and `count` and the message at an index are computed from the counts of
+    tokens. Iterating from `offset` costs no more than from the start, so
+    workers can each take a slice of the space. Different expansions may
+    make equal messages, e.g. of `[a|a]`.
+    """
+
+    def __init__(self, template: str, space: _Space) -> None:
+        self.template = template
+        self._space = space
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'template={repr(self.template)}, '
+            f'count={self.count})'
+        )
+
+    @property
+    def count(self) -> int:
+        return self._space.count
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iterate()
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('message index out of range')
+        return self._space.message_at(index)
+
+    def iterate(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[str]:
+        """Iterate over at most limit messages, starting at index offset."""
+        if offset < 0:
+            raise ValueError('offset must not be negative')
+        if offset >= self.count:
+            return iter(())
+        messages = self._space.iter_from(offset)
+        if limit is not None:
+            messages = islice(messages, limit)
+        return messages
+
+
+def tokens_space(
+    tokens: List[BaseToken],
+    generator: BaseGenerator,
+    values: Mapping[str, Sequence[Any]],
+    any_values: Optional[Sequence[str]],
+    int_values: Optional[Sequence[int]],
+) -> _Space:
+    """Return space of messages of tokens. See `Generator.message_space`."""
+    spaces = [
+        token_space(token, generator, values, any_values, int_values)
+        for token in tokens
+    ]
+
+    # Adjacent single messages, e.g. literals, are joined ahead of time.
+    merged_spaces: List[_Space] = []
+    for space in spaces:
+        if (
+            merged_spaces
+            and type(space) is _Texts
+            and type(merged_spaces[-1]) is _Texts
+            and space.count == merged_spaces[-1].count == 1
+        ):
+            text = merged_spaces[-1].message_at(0) + space.message_at(0)
+            merged_spaces[-1] = _Texts([text])
+        else:
+            merged_spaces.append(space)
+
+    if not merged_spaces:
+        return EMPTY_SPACE
+    result = merged_spaces[-1]
+    for space in reversed(merged_spaces[:-1]):
+        result = _Product(space, result)
+    return result
+
+
+def token_space(
+    token: BaseToken,
+    generator: BaseGenerator,
+    values: Mapping[str, Sequence[Any]],
+    any_values: Optional[Sequence[str]],
+    int_values: Optional[Sequence[int]],
+) -> _Space:
+    token_type = type(token)
+    if token_type is CharToken:
+        return _Texts([token.char])  # type: ignore
+    if token_type is LiteralToken:
+        return _Texts([token.text])  # type: ignore
+
+    name = token.associate_name
+    bound_values = values.get(name) if name else None
+
+    if token_type is OptionalToken:
+        nested_space = tokens_space(
+            token.tokens,  # type: ignore
+            generator,
+            values,
+            any_values,
+            int_values,
+        )
+        if bound_values is None:
+            return _Union([EMPTY_SPACE, nested_space])
+        return _Union(
+            [nested_space if value else EMPTY_SPACE for value in bound_values]
+        )
+
+    if token_type is ChoiceToken and bound_values is None:
+        if token.literal_trie is not None:  # type: ignore
+            return _Texts(token.literal_trie.texts)  # type: ignore
+        if not token.choices:  # type: ignore
+            return EMPTY_SPACE
+        return _Union(
+            [
+                tokens_space(choice, generator, values, any_values, int_values)
+                for choice in token.choices  # type: ignore
+            ]
+        )
+
+    if token_type is AnyToken:
+        if bound_values is None:
+            bound_values = any_values
+        if bound_values is not None:
+            return _Texts(list(bound_values))
+
+    elif token_type is ChoiceToken:
+        return _Texts(list(bound_values))  # type: ignore
+
+    elif token_type is IntToken:
+        if bound_values is None:
+            bound_values = int_values
+        if bound_values is not None:
+            return _Texts([str(value) for value in bound_values])
+
+    elif bound_values is not None:
+        return _Texts(
+            [
+                token.generate_message(generator=generator, value=value, context={})
+                for value in bound_values
+            ]
+        )
+
+    raise ValueError(f'No values to enumerate {repr(token)} with')
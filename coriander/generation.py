@@ -1,21 +1,90 @@
-from typing import List, Optional
+import copy
+import random
+from itertools import accumulate
+from typing import Any, List, Mapping, Optional, Sequence, Union
 
-from coriander.core import BaseGenerator, BaseToken, BaseTokenFinder, BaseTokenizer
+from coriander.compilation import TemplateCompiler
+from coriander.core import (
+    BaseGenerator,
+    BaseToken,
+    BaseTokenFinder,
+    BaseTokenizer,
+    CompiledTemplate,
+)
+from coriander.enumeration import MessageSpace, tokens_space
+from coriander.parallel import (
+    generate_messages_chunk,
+    map_in_processes,
+    without_cache,
+)
+from coriander.sampling import BaseSampler, create_sampler, stream_seed
 from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import (
+    AnyToken,
+    CharToken,
+    ChoiceToken,
+    IntToken,
+    LiteralToken,
+    OptionalToken,
+)
 
 
-class Generator(BaseGenerator):
-    def __init__(self, tokenizer: BaseTokenizer) -> None:
-        self.tokenizer = tokenizer
+class Generator(TemplateCompiler, BaseGenerator):
+    """Generator of messages from templates.
+
+    Random values come from `rng`, a `random.Random`, or from one seeded by
+    `seed`; the global `random` module is used without either. Seeded
+    generators generate the same messages on every run.
+    """
+
+    def __init__(
+        self,
+        tokenizer: BaseTokenizer,
+        cache_size: Optional[int] = 128,
+        optimize: bool = True,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        super().__init__(
+            tokenizer=tokenizer,
+            cache_size=cache_size,
+            optimize=optimize,
+        )
+        if seed is not None and rng is not None:
+            raise ValueError('Pass either seed or rng, not both')
+        self.seed = seed
+        if seed is not None:
+            self.random = random.Random(seed)
+        elif rng is not None:
+            self.random = rng
+
+    def split(self, count: int) -> List['Generator']:
+        """Return count generators with independent random streams, e.g. per worker.
+
+        Streams of a seeded generator depend on its seed and their index only,
+        so workers generate the same messages on every run. Other generators
+        draw a seed for the streams from their random source.
+        """
+        seed = self.seed if self.seed is not None else self.random.getrandbits(64)
+        generators = []
+        for index in range(count):
+            generator = copy.copy(self)
+            generator.seed = stream_seed(seed, 'split', index)
+            generator.random = random.Random(generator.seed)
+            generators.append(generator)
+        return generators
 
     def generate(
         self,
-        template: str,
+        template: Union[str, CompiledTemplate],
         context: Optional[dict] = None,
     ) -> str:
         context = context or {}
-        tokens = self.tokenizer.tokenize(template=template)
-        return self.generate_from_tokens(tokens=tokens, context=context)
+        compiled_template = self.compile(template)
+        return self.generate_from_tokens(
+            tokens=compiled_template.tokens,
+            context=context,
+        )
 
     def generate_from_tokens(
         self,
@@ -38,11 +107,270 @@ class Generator(BaseGenerator):
 
         return ''.join(message_parts)
 
+    def generate_many(
+        self,
+        template: Union[str, CompiledTemplate],
+        n: int,
+        contexts: Optional[Sequence[dict]] = None,
+        seed: Optional[int] = None,
+        processes: Optional[int] = None,
+        chunksize: int = 10000,
+    ) -> List[str]:
+        """Generate n messages, the i-th one with contexts[i] if given.
+
+        Random values are drawn for all messages of a chunk at once, token by
+        token, so messages are generated much faster than by calling
+        `generate` n times. Custom tokens are still generated one by one, from
+        a random source seeded by the stream of their chunk.
+
+        Every chunk of `chunksize` messages draws from its own stream of
+        `seed`, by `coriander.sampling.create_sampler`. Messages depend on the
+        seed and chunk size only, so they are the same whether chunks are
+        generated here or, with `processes`, by a process pool of any size.
+        Without seed, one is drawn from the random source of the generator.
+        """
+        if contexts is not None and len(contexts) != n:
+            raise ValueError(f'Expected {n} contexts, got {len(contexts)}')
+
+        compiled_template = self.compile(template)
+        if seed is None:
+            seed = self.random.getrandbits(64)
+
+        chunks = (
+            (
+                start,
+                min(chunksize, n - start),
+                None if contexts is None else contexts[start : start + chunksize],
+            )
+            for start in range(0, n, chunksize)
+        )
+        if not processes:
+            return [
+                message
+                for start, count, chunk_contexts in chunks
+                for message in self.generate_chunk(
+                    template=compiled_template,
+                    start=start,
+                    count=count,
+                    contexts=chunk_contexts,
+                    seed=seed,
+                )
+            ]
+
+        return list(
+            map_in_processes(
+                function=generate_messages_chunk,
+                items=chunks,
+                processes=processes,
+                chunksize=1,
+                generator=without_cache(self),
+                compiled_templates=[compiled_template],
+                seed=seed,
+            )
+        )
+
+    def generate_chunk(
+        self,
+        template: Union[str, CompiledTemplate],
+        start: int,
+        count: int,
+        contexts: Optional[Sequence[dict]],
+        seed: int,
+    ) -> List[str]:
+        """Generate the chunk of `generate_many` with seed starting at message start."""
+        compiled_template = self.compile(template)
+        chunk_seed = stream_seed(seed, 'chunk', start)
+        # Custom tokens draw from the random source of the generator.
+        generator = copy.copy(self)
+        generator.random = random.Random(stream_seed(chunk_seed, 'custom'))
+        return generator.generate_many_from_tokens(
+            tokens=compiled_template.tokens,
+            count=count,
+            contexts=contexts,
+            sampler=create_sampler(chunk_seed),
+        )
+
+    def message_space(
+        self,
+        template: Union[str, CompiledTemplate],
+        values: Optional[Mapping[str, Sequence[Any]]] = None,
+        any_values: Optional[Sequence[str]] = None,
+        int_values: Optional[Sequence[int]] = None,
+    ) -> MessageSpace:
+        """Return every message template can generate, enumerated lazily.
+
+        Tokens named in `values` take each of their values, like context
+        values of `generate`: texts for any and choice tokens, numbers for
+        int tokens and flags for optional tokens. Other any and int tokens
+        take each of `any_values` and `int_values`; ValueError is raised
+        when a token has no values.
+        """
+        compiled_template = self.compile(template)
+        space = tokens_space(
+            tokens=compiled_template.tokens,
+            generator=self,
+            values=values or {},
+            any_values=any_values,
+            int_values=int_values,
+        )
+        return MessageSpace(template=compiled_template.template, space=space)
+
+    def generate_many_from_tokens(
+        self,
+        tokens: List[BaseToken],
+        count: int,
+        contexts: Optional[Sequence[dict]],
+        sampler: BaseSampler,
+    ) -> List[str]:
+        columns = [
+            self._generate_many_from_token(token, count, contexts, sampler)
+            for token in tokens
+        ]
+        if not columns:
+            return [''] * count
+        if len(columns) == 1:
+            return columns[0]
+        return [''.join(parts) for parts in zip(*columns)]
+
+    def _generate_many_from_token(
+        self,
+        token: BaseToken,
+        count: int,
+        contexts: Optional[Sequence[dict]],
+        sampler: BaseSampler,
+    ) -> List[str]:
+        token_type = type(token)
+        if token_type is CharToken:
+            return [token.char] * count  # type: ignore
+        if token_type is LiteralToken:
+            return [token.text] * count  # type: ignore
+
+        values: Optional[List[Any]] = None
+        if contexts is not None and token.associate_name:
+            values = [context.get(token.associate_name) for context in contexts]
+            if all(value is None for value in values):
+                values = None
+
+        if token_type is OptionalToken:
+            includes = sampler.integers(0, 2, count)
+            if values is not None:
+                includes = [
+                    include if value is None else value
+                    for include, value in zip(includes, values)
+                ]
+            rows = [row for row, include in enumerate(includes) if include]
+            messages = [''] * count
+            nested_messages = self.generate_many_from_tokens(
+                tokens=token.tokens,  # type: ignore
+                count=len(rows),
+                contexts=_select(contexts, rows),
+                sampler=sampler,
+            )
+            for row, message in zip(rows, nested_messages):
+                messages[row] = message
+            return messages
+
+        if token_type in (AnyToken, ChoiceToken, IntToken):
+            if values is None:
+                return self._generate_many_random(token, count, contexts, sampler)
+
+            # Values are used like `generate_message` does, the rest is random.
+            value_messages: List[Optional[str]]
+            if token_type is IntToken:
+                value_messages = [
+                    None if value is None else str(value) for value in values
+                ]
+            else:
+                value_messages = [value if value else None for value in values]
+            rows = [
+                row for row, message in enumerate(value_messages) if message is None
+            ]
+            random_messages = self._generate_many_random(
+                token,
+                len(rows),
+                _select(contexts, rows),
+                sampler,
+            )
+            for row, message in zip(rows, random_messages):
+                value_messages[row] = message
+            return value_messages  # type: ignore
+
+        return [
+            token.generate_message(
+                generator=self,
+                value=context.get(token.associate_name),
+                context=context,
+            )
+            for context in (contexts or [{}] * count)
+        ]
+
+    def _generate_many_random(
+        self,
+        token: BaseToken,
+        count: int,
+        contexts: Optional[Sequence[dict]],
+        sampler: BaseSampler,
+    ) -> List[str]:
+        """Return count messages of any, int or choice token, without values."""
+        if type(token) is AnyToken:
+            lengths = sampler.integers(1, AnyToken.GENERATE_MAX_LENGTH + 1, count)
+            text = sampler.text(AnyToken.GENERATE_ALPHABET, sum(lengths))
+            ends = list(accumulate(lengths))
+            return [text[end - length : end] for end, length in zip(ends, lengths)]
+
+        if type(token) is IntToken:
+            numbers = [str(number) for number in range(IntToken.GENERATE_MAX + 1)]
+            return sampler.choices(numbers, count)
+
+        choices = token.choices  # type: ignore
+        if not choices:
+            return [''] * count
+        if token.literal_trie is not None:  # type: ignore
+            return sampler.choices(token.literal_trie.texts, count)  # type: ignore
+
+        indexes = sampler.integers(0, len(choices), count)
+        rows_by_choice: List[List[int]] = [[] for _ in choices]
+        for row, index in enumerate(indexes):
+            rows_by_choice[index].append(row)
+
+        messages = [''] * count
+        for choice, rows in zip(choices, rows_by_choice):
+            if not rows:
+                continue
+            choice_messages = self.generate_many_from_tokens(
+                tokens=choice,
+                count=len(rows),
+                contexts=_select(contexts, rows),
+                sampler=sampler,
+            )
+            for row, message in zip(rows, choice_messages):
+                messages[row] = message
+        return messages
+
+
+def _select(
+    contexts: Optional[Sequence[dict]],
+    rows: List[int],
+) -> Optional[List[dict]]:
+    if contexts is None:
+        return None
+    return [contexts[row] for row in rows]
+
 
 class DefaultGenerator(Generator):
     def __init__(
         self,
         custom_token_finders: Optional[List[BaseTokenFinder]] = None,
+        cache_size: Optional[int] = 128,
+        optimize: bool = True,
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
     ):
         tokenizer = DefaultTokenizer(custom_token_finders=custom_token_finders)
-        super().__init__(tokenizer=tokenizer)
+        super().__init__(
+            tokenizer=tokenizer,
+            cache_size=cache_size,
+            optimize=optimize,
+            seed=seed,
+            rng=rng,
+        )
@@ -0,0 +1,176 @@
+from typing import Iterable, List, Tuple, Union
+
+from coriander.core import CompiledTemplate, MatchResult
+from coriander.matching import Matcher
+from coriander.nfa import NFA, NFACompiledTemplate, NFACompiler
+
+
+class IncrementalMatcher:
+    """Templates matched with messages given piece by piece, e.g. while typed.
+
+    Templates are compiled to NFAs joined into one, whose DFA is built lazily
+    and shared by all sessions. Appending a character to the message of a
+    session costs one cached DFA transition, however long the message is and
+    however many templates there are.
+
+    Templates with custom tokens have no NFA. They are matched with the whole
+    message by `matcher` when matches are asked for, and are always viable.
+    """
+
+    def __init__(
+        self,
+        matcher: Matcher,
+        templates: Iterable[Union[str, CompiledTemplate]],
+    ) -> None:
+        self.matcher = matcher
+        self.compiled_templates = [matcher.compile(template) for template in templates]
+
+        nfas = []
+        owners: List[int] = []
+        starts: List[int] = []
+        # Template index of every NFA of the union, and templates without one.
+        self._nfa_indices: List[int] = []
+        self._fallback_indices: List[int] = []
+        for index, compiled_template in enumerate(self.compiled_templates):
+            if isinstance(compiled_template, NFACompiledTemplate):
+                nfa = compiled_template.nfa
+            else:
+                nfa = NFACompiler().compile(compiled_template.tokens)
+            if nfa is None:
+                self._fallback_indices.append(index)
+                continue
+            nfas.append(nfa)
+            self._nfa_indices.append(index)
+            starts.append(len(owners) + nfa.start)
+            owners.extend([index] * len(nfa))
+
+        self.nfa = NFA.union(nfas)
+        # Template index of every instruction of the union, -1 for the ones
+        # joining the starts of templates.
+        self._owners = owners + [-1] * (len(self.nfa) - len(owners))
+        self._starts = starts
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'matcher={repr(self.matcher)}, '
+            f'templates={len(self.compiled_templates)})'
+        )
+
+    def session(self) -> 'IncrementalMatchSession':
+        """Start matching a new, empty message."""
+        return IncrementalMatchSession(self)
+
+
+class IncrementalMatchSession:
+    """Message of an `IncrementalMatcher` so far and the DFA state it reached."""
+
+    def __init__(self, incremental_matcher: IncrementalMatcher) -> None:
+        self.incremental_matcher = incremental_matcher
+        self._nfa = incremental_matcher.nfa
+        self._state = self._nfa.start_state
+        self._parts: List[str] = []
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(message={repr(self.message)})'
+
+    @property
+    def message(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    def append(self, text: str) -> None:
+        """Append text to the message, in time proportional to the text."""
+        nfa = self._nfa
+        state = self._state
+        # Without threads no text can bring matches back.
+        if state.kernel:
+            for char in text:
+                state = nfa.transition(state, char)
+                if not state.kernel:
+                    break
+        self._state = state
+        self._parts.append(text)
+
+    def reset(self) -> None:
+        self._state = self._nfa.start_state
+        self._parts = []
+
+    @property
+    def viable(self) -> bool:
+        """Whether some template matches the message or a continuation of it."""
+        return bool(
+            self._nfa.live(self._state) or self.incremental_matcher._fallback_indices
+        )
+
+    @property
+    def matched(self) -> bool:
+        """Whether some template matches the message."""
+        return bool(self._nfa.matches(self._state)) or any(self._fallback_matches())
+
+    def viable_templates(self) -> List[CompiledTemplate]:
+        """Return templates matching the message or a continuation of it."""
+        incremental_matcher = self.incremental_matcher
+        owners = incremental_matcher._owners
+        indices = set(incremental_matcher._fallback_indices)
+        for pc in self._nfa.live(self._state):
+            if owners[pc] != -1:
+                indices.add(owners[pc])
+                continue
+            # Only the empty message is at a join, where every template
+            # matching some message is viable.
+            live_pcs = self._nfa.live_pcs()
+            starts = zip(incremental_matcher._nfa_indices, incremental_matcher._starts)
+            indices.update(index for index, start in starts if start in live_pcs)
+        compiled_templates = incremental_matcher.compiled_templates
+        return [compiled_templates[index] for index in sorted(indices)]
+
+    def matched_templates(self) -> List[CompiledTemplate]:
+        """Return templates matching the message, in order of templates."""
+        return [template for template, _ in self.match_results()]
+
+    def match_results(self) -> List[Tuple[CompiledTemplate, MatchResult]]:
+        """Return templates matching the message with their results.
+
+        Contexts are filled by `matcher`, matching the whole message with
+        every matched template.
+        """
+        incremental_matcher = self.incremental_matcher
+        nfa_indices = incremental_matcher._nfa_indices
+        indices = {
+            nfa_indices[nfa_index] for nfa_index in self._nfa.matches(self._state)
+        }
+        indices.update(
+            index
+            for index, matched in zip(
+                incremental_matcher._fallback_indices,
+                self._fallback_matches(),
+            )
+            if matched
+        )
+
+        results = []
+        message = self.message
+        for index in sorted(indices):
+            compiled_template = incremental_matcher.compiled_templates[index]
+            result = incremental_matcher.matcher.match(
+                message=message,
+                template=compiled_template,
+            )
+            if result:
+                results.append((compiled_template, result))
+        return results
+
+    def _fallback_matches(self) -> List[bool]:
+        incremental_matcher = self.incremental_matcher
+        message = self.message
+        return [
+            bool(
+                incremental_matcher.matcher.match(
+                    message=message,
+                    template=incremental_matcher.compiled_templates[index],
+                )
+            )
+            for index in incremental_matcher._fallback_indices
+        ]
@@ -0,0 +1,136 @@
+from typing import Dict, List, Optional
+
+from coriander.core import BaseToken
+
+
+class Instrumentation:
+    """Hooks called by matchers and tokenizers given this instrumentation.
+
+    All hooks do nothing; subclasses override the ones they need. Hooks are
+    called synchronously, so instrumentation should not be shared between
+    threads without its own locking. Token matches are reported by engines
+    matching token by token; regex, NFA and lazy matching report matches only.
+    """
+
+    def on_tokenize(self, template: str, seconds: float) -> None:
+        """Template was tokenized. Nested templates are part of the outer one."""
+
+    def on_token_match(
+        self,
+        token: BaseToken,
+        depth: int,
+        variants_count: int,
+    ) -> None:
+        """Token was matched at recursion depth and returned variants."""
+
+    def on_match(self, template: str, seconds: float, success: bool) -> None:
+        """Template was matched. Token matches since the last call belong to it."""
+
+
+class TemplateStats:
+    def __init__(self, template: str) -> None:
+        self.template = template
+        self.tokenize_count = 0
+        self.tokenize_time = 0.0
+        self.match_count = 0
+        self.success_count = 0
+        self.match_time = 0.0
+        self.token_calls: Dict[str, int] = {}
+        self.variants_count = 0
+        self.max_depth = 0
+        # Most token matches of one match, a lower bound for `max_steps`.
+        self.max_token_calls = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'template={repr(self.template)}, '
+            f'match_count={self.match_count}, '
+            f'match_time={self.match_time:.6f}, '
+            f'variants_count={self.variants_count}, '
+            f'max_depth={self.max_depth})'
+        )
+
+
+class MatchStats(Instrumentation):
+    """Instrumentation collecting statistics per template.
+
+    Token calls are counted by token class name. Variants are the partial
+    matches tokens return, so templates that make a matcher backtrack stand
+    out by `variants_count` long before their match time does.
+    """
+
+    def __init__(self) -> None:
+        self.stats_by_template: Dict[str, TemplateStats] = {}
+        self._token_calls: Dict[str, int] = {}
+        self._variants_count = 0
+        self._max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self.stats_by_template)
+
+    def __getitem__(self, template: str) -> TemplateStats:
+        return self.stats_by_template[template]
+
+    def get(self, template: str) -> Optional[TemplateStats]:
+        return self.stats_by_template.get(template)
+
+    def template_stats(self, template: str) -> TemplateStats:
+        stats = self.stats_by_template.get(template)
+        if stats is None:
+            stats = TemplateStats(template=template)
+            self.stats_by_template[template] = stats
+        return stats
+
+    def most_expensive(
+        self,
+        count: int = 10,
+        key: str = 'match_time',
+    ) -> List[TemplateStats]:
+        """Return templates with the largest value of a `TemplateStats` field."""
+        return sorted(
+            self.stats_by_template.values(),
+            key=lambda stats: getattr(stats, key),
+            reverse=True,
+        )[:count]
+
+    def clear(self) -> None:
+        self.stats_by_template.clear()
+        self._token_calls = {}
+        self._variants_count = 0
+        self._max_depth = 0
+
+    def on_tokenize(self, template: str, seconds: float) -> None:
+        stats = self.template_stats(template)
+        stats.tokenize_count += 1
+        stats.tokenize_time += seconds
+
+    def on_token_match(
+        self,
+        token: BaseToken,
+        depth: int,
+        variants_count: int,
+    ) -> None:
+        name = token.__class__.__name__
+        self._token_calls[name] = self._token_calls.get(name, 0) + 1
+        self._variants_count += variants_count
+        if depth > self._max_depth:
+            self._max_depth = depth
+
+    def on_match(self, template: str, seconds: float, success: bool) -> None:
+        stats = self.template_stats(template)
+        stats.match_count += 1
+        stats.success_count += success
+        stats.match_time += seconds
+        for name, calls in self._token_calls.items():
+            stats.token_calls[name] = stats.token_calls.get(name, 0) + calls
+        stats.max_token_calls = max(
+            stats.max_token_calls,
+            sum(self._token_calls.values()),
+        )
+        stats.variants_count += self._variants_count
+        stats.max_depth = max(stats.max_depth, self._max_depth)
+
+        self._token_calls = {}
+        self._variants_count = 0
+        self._max_depth = 0
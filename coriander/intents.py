@@ -0,0 +1,278 @@
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from coriander.core import BaseToken, BaseTokenFinder, BaseTokenizer, CompiledTemplate
+from coriander.matching import MemoizedMatcher, MemoizedMatchSession
+from coriander.prefilter import LiteralPrefilter
+from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import (
+    AnyToken,
+    CharToken,
+    ChoiceToken,
+    IntToken,
+    LiteralToken,
+    OptionalToken,
+)
+
+
+def token_key(token: BaseToken) -> Hashable:
+    """Structural key of token. Equal keys match equally and fill equal contexts."""
+    token_type = type(token)
+    inner: Any
+    if token_type is CharToken:
+        inner = token.char  # type: ignore
+    elif token_type is LiteralToken:
+        inner = token.text  # type: ignore
+    elif token_type is AnyToken:
+        inner = token.anchor  # type: ignore
+    elif token_type is IntToken:
+        inner = None
+    elif token_type is OptionalToken:
+        inner = tuple(token_key(t) for t in token.tokens)  # type: ignore
+    elif token_type is ChoiceToken:
+        inner = tuple(
+            tuple(token_key(t) for t in choice)
+            for choice in token.choices  # type: ignore
+        )
+    else:
+        return (token_type, id(token))
+    return (token_type.__name__, token.associate_name, inner)
+
+
+class IntentMatchResult:
+    def __init__(self, intent: str, template: str, context: dict) -> None:
+        self.intent = intent
+        self.template = template
+        self.context = context
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'intent={repr(self.intent)}, '
+            f'template={repr(self.template)}, '
+            f'context={repr(self.context)})'
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, self.__class__) and (
+            (other.intent, other.template, other.context)
+            == (self.intent, self.template, self.context)
+        )
+
+
+class TemplateTrieNode:
+    """Node of a trie over token lists. Templates share nodes of common prefixes."""
+
+    def __init__(self, token: Optional[BaseToken] = None) -> None:
+        self.token = token
+        self.children_by_key: Dict[Hashable, 'TemplateTrieNode'] = {}
+        self.char_children: Dict[str, List['TemplateTrieNode']] = {}
+        self.other_children: List['TemplateTrieNode'] = []
+        self.template_indices: List[int] = []
+        self.subtree_template_indices: Set[int] = set()
+
+    def child(self, token: BaseToken) -> 'TemplateTrieNode':
+        key = token_key(token)
+        node = self.children_by_key.get(key)
+        if node is None:
+            node = TemplateTrieNode(token=token)
+            self.children_by_key[key] = node
+            if type(token) is CharToken:
+                self.char_children.setdefault(token.char, []).append(node)  # type: ignore
+            else:
+                self.other_children.append(node)
+        return node
+
+
+class IntentIndex:
+    """Match a message against many templates grouped by intent in one pass.
+
+    Templates are merged into a trie of tokens, so a prefix shared by several
+    templates is matched once. Character tokens are dispatched by the message
+    character, so templates starting with other characters cost nothing.
+    With `prefilter` enabled, branches leading only to templates whose
+    required literals are missing from the message are never entered.
+    Contexts are the ones `MemoizedMatcher` returns for each template.
+    """
+
+    def __init__(
+        self,
+        intents: Mapping[str, Iterable[str]],
+        tokenizer: BaseTokenizer,
+        prefilter: bool = True,
+    ) -> None:
+        # Character tokens are kept apart, so templates share their prefixes.
+        self.matcher = MemoizedMatcher(
+            tokenizer=tokenizer,
+            cache_size=0,
+            optimize=False,
+        )
+        self.root = TemplateTrieNode()
+        self.templates: List[Tuple[str, str]] = []
+        self.prefilter = LiteralPrefilter() if prefilter else None
+
+        for intent, templates in intents.items():
+            for template in templates:
+                self.add(intent=intent, template=template)
+        if self.prefilter is not None:
+            self.prefilter.build()
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def add(self, intent: str, template: Union[str, CompiledTemplate]) -> None:
+        compiled_template = self.matcher.compile(template)
+        template_index = len(self.templates)
+        node = self.root
+        node.subtree_template_indices.add(template_index)
+        for token in compiled_template.tokens:
+            node = node.child(token)
+            node.subtree_template_indices.add(template_index)
+        node.template_indices.append(template_index)
+        self.templates.append((intent, compiled_template.template))
+        if self.prefilter is not None:
+            self.prefilter.add(
+                template_index=template_index,
+                tokens=compiled_template.tokens,
+            )
+
+    def match(self, message: str) -> Optional[IntentMatchResult]:
+        """Return the first matching template in order of addition."""
+        contexts = self.match_templates(message=message)
+        if not contexts:
+            return None
+        index = min(contexts)
+        intent, template = self.templates[index]
+        return IntentMatchResult(
+            intent=intent,
+            template=template,
+            context=contexts[index],
+        )
+
+    def match_all(self, message: str) -> List[IntentMatchResult]:
+        """Return the first matching template of every matching intent."""
+        contexts = self.match_templates(message=message)
+        result: Dict[str, IntentMatchResult] = {}
+        for index in sorted(contexts):
+            intent, template = self.templates[index]
+            if intent not in result:
+                result[intent] = IntentMatchResult(
+                    intent=intent,
+                    template=template,
+                    context=contexts[index],
+                )
+        return list(result.values())
+
+    def match_templates(self, message: str) -> Dict[int, dict]:
+        """Return contexts of all matching templates by template index."""
+        candidates = None
+        if self.prefilter is not None:
+            candidates = self.prefilter.candidates(message)
+            if not candidates:
+                return {}
+
+        session = MemoizedMatchSession(matcher=self.matcher, message=message)
+        contexts: Dict[int, dict] = {}
+        stack: List[Tuple[TemplateTrieNode, List[Tuple[int, dict]]]] = [
+            (self.root, [(0, {})])
+        ]
+
+        while stack:
+            node, states = stack.pop()
+
+            if node.template_indices:
+                for end, context in states:
+                    if end == len(message):
+                        for index in node.template_indices:
+                            contexts[index] = context
+                        break
+
+            char_children: Dict[int, TemplateTrieNode] = {}
+            char_states: Dict[int, List[Tuple[int, dict]]] = {}
+            for start, context in states:
+                if start == len(message):
+                    continue
+                for child in node.char_children.get(message[start], ()):
+                    child_context = context
+                    associate_name = child.token.associate_name  # type: ignore
+                    if associate_name:
+                        child_context = {**context, associate_name: message[start]}
+                    char_children[id(child)] = child
+                    char_states.setdefault(id(child), []).append(
+                        (start + 1, child_context)
+                    )
+
+            for child_id, child in char_children.items():
+                if candidates is None or not child.subtree_template_indices.isdisjoint(
+                    candidates
+                ):
+                    stack.append((child, char_states[child_id]))
+
+            for child in node.other_children:
+                if (
+                    candidates is not None
+                    and child.subtree_template_indices.isdisjoint(candidates)
+                ):
+                    continue
+                child_states = self._extend(
+                    token=child.token,  # type: ignore
+                    states=states,
+                    message=message,
+                    session=session,
+                )
+                if child_states:
+                    stack.append((child, child_states))
+
+        return contexts
+
+    def _extend(
+        self,
+        token: BaseToken,
+        states: List[Tuple[int, dict]],
+        message: str,
+        session: MemoizedMatchSession,
+    ) -> List[Tuple[int, dict]]:
+        variants: Dict[int, dict] = {}
+        associate_name = token.associate_name
+
+        for start, context in states:
+            if start == len(message):
+                continue
+            for match_token_with_message_result in token.match_with_message_at(
+                message=message,
+                start=start,
+                matcher=session,
+            ):
+                end = match_token_with_message_result.end
+                if end in variants:
+                    continue
+                if associate_name:
+                    variants[end] = {
+                        **context,
+                        associate_name: match_token_with_message_result.value,
+                        **(match_token_with_message_result.context or {}),
+                    }
+                else:
+                    variants[end] = context
+
+        return list(variants.items())
+
+
+class DefaultIntentIndex(IntentIndex):
+    def __init__(
+        self,
+        intents: Mapping[str, Iterable[str]],
+        custom_token_finders: Optional[List[BaseTokenFinder]] = None,
+    ) -> None:
+        tokenizer = DefaultTokenizer(custom_token_finders=custom_token_finders)
+        super().__init__(intents=intents, tokenizer=tokenizer)
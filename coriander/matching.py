@@ -1,32 +1,175 @@
-from typing import List, Optional
+import copy
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
+from coriander.compilation import TemplateCompiler
 from coriander.core import (
+    EMPTY_CONTEXT,
     BaseMatcher,
     BaseToken,
     BaseTokenFinder,
     BaseTokenizer,
+    CompiledTemplate,
+    MatchContext,
     MatchResult,
     MatchTokensWithMessageResult,
+    MatchTokenWithMessageResult,
 )
+from coriander.instrumentation import Instrumentation
+from coriander.nfa import NFACompiledTemplate, NFACompiler
+from coriander.optimization import TokenList
+from coriander.parallel import (
+    map_in_processes,
+    match_messages_chunk,
+    match_templates_chunk,
+    without_cache,
+)
+from coriander.regex import RegexCompiledTemplate, RegexTranslator
 from coriander.tokenizers import DefaultTokenizer
 
 
-class Matcher(BaseMatcher):
+class MatchAborted(Exception):
+    """Raised inside a match whose budget is exhausted."""
+
+
+class MatchBudget:
+    """Step and time limits of one match. A step is one token match."""
+
+    # Reading the clock on every step would cost more than most steps.
+    CLOCK_INTERVAL = 16
+
+    def __init__(
+        self,
+        max_steps: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> None:
+        self.max_steps = max_steps
+        self.deadline = deadline
+        self.steps = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'max_steps={self.max_steps}, '
+            f'deadline={self.deadline}, '
+            f'steps={self.steps})'
+        )
+
+    def step(self) -> None:
+        self.steps += 1
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise MatchAborted()
+        if (
+            self.deadline is not None
+            and self.steps % self.CLOCK_INTERVAL == 1
+            and time.perf_counter() > self.deadline
+        ):
+            raise MatchAborted()
+
+
+class Matcher(TemplateCompiler, BaseMatcher):
+    """Matcher backtracking through every way to split a message between tokens.
+
+    With `lazy`, tokens yield their variants one by one and `match` stops at
+    the first split that covers the whole message, trying shorter variants of
+    earlier tokens first. Contexts of ambiguous messages then follow
+    `RegexMatcher`; success is always the same.
+    """
+
     def __init__(
         self,
         tokenizer: BaseTokenizer,
+        cache_size: Optional[int] = 128,
+        lazy: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        optimize: bool = True,
     ) -> None:
-        self.tokenizer = tokenizer
+        super().__init__(
+            tokenizer=tokenizer,
+            cache_size=cache_size,
+            optimize=optimize,
+        )
+        self.lazy = lazy
+        self.instrumentation = instrumentation
+        self._depth = 0
+        # Set on the copy of the matcher running a budgeted match.
+        self._budget: Optional[MatchBudget] = None
 
     def match(
         self,
         message: str,
-        template: str,
+        template: Union[str, CompiledTemplate],
+        max_steps: Optional[int] = None,
+        timeout: Optional[float] = None,
     ) -> MatchResult:
-        tokens = self.tokenizer.tokenize(template=template)
-        match_tokens_with_message_results = self.match_with_tokens(
+        """Match message and template.
+
+        With `max_steps` or `timeout` in seconds, a match that needs more
+        token matches or time is given up and an aborted result is returned.
+        Results of budgeted matches report their `steps`. Regex engines run
+        budgeted matches with the `Matcher` engine, since regular expressions
+        cannot be interrupted. NFA engines count no steps: NFA matching is
+        linear in message length.
+        """
+        compiled_template = self.compile(template)
+        if self.instrumentation is None:
+            return self._match_within(message, compiled_template, max_steps, timeout)
+
+        started_at = time.perf_counter()
+        result = self._match_within(message, compiled_template, max_steps, timeout)
+        self.instrumentation.on_match(
+            template=compiled_template.template,
+            seconds=time.perf_counter() - started_at,
+            success=result.success,
+        )
+        return result
+
+    def _match_within(
+        self,
+        message: str,
+        template: CompiledTemplate,
+        max_steps: Optional[int],
+        timeout: Optional[float],
+    ) -> MatchResult:
+        tokens = template.tokens
+        if type(tokens) is TokenList and not tokens.accepts_length(len(message)):
+            return MatchResult(success=False, context={})
+
+        if max_steps is None and timeout is None:
+            return self.match_compiled(message=message, template=template)
+
+        budget = MatchBudget(
+            max_steps=max_steps,
+            deadline=None if timeout is None else time.perf_counter() + timeout,
+        )
+        # The budget belongs to this match, so matchers stay shareable.
+        matcher = copy.copy(self)
+        matcher._budget = budget
+        try:
+            result = matcher.match_compiled(message=message, template=template)
+        except MatchAborted:
+            return MatchResult(
+                success=False,
+                context={},
+                aborted=True,
+                steps=budget.steps,
+            )
+        return MatchResult(
+            success=result.success,
+            context=result.context,
+            steps=budget.steps,
+        )
+
+    def match_compiled(self, message: str, template: CompiledTemplate) -> MatchResult:
+        """Match message and compiled template. Engines override this method."""
+        if self.lazy:
+            for context in self._iter_full_contexts(message, template):
+                return MatchResult(success=True, context=context)
+            return MatchResult(success=False, context={})
+
+        match_tokens_with_message_results = self._match_whole_with_tokens(
             message=message,
-            tokens=tokens,
+            tokens=template.tokens,
         )
 
         for match_tokens_with_message_result in match_tokens_with_message_results:
@@ -41,59 +184,692 @@ class Matcher(BaseMatcher):
             context={},
         )
 
+    def iter_matches(
+        self,
+        message: str,
+        template: Union[str, CompiledTemplate],
+    ) -> Iterator[MatchResult]:
+        """Yield results of all distinct ways to match the whole message.
+
+        Matches are found on demand, in the order `match` with `lazy` tries them.
+        """
+        compiled_template = self.compile(template)
+        seen_contexts: Set[MatchContext] = set()
+        for context in self._iter_full_contexts(message, compiled_template):
+            if context not in seen_contexts:
+                seen_contexts.add(context)
+                yield MatchResult(success=True, context=context)
+
+    def _iter_full_contexts(
+        self,
+        message: str,
+        compiled_template: CompiledTemplate,
+    ) -> Iterator[MatchContext]:
+        for match_tokens_with_message_result in self._iter_match_whole_with_tokens(
+            message=message,
+            tokens=compiled_template.tokens,
+        ):
+            yield match_tokens_with_message_result.context
+
+    def match_many(
+        self,
+        messages: Iterable[str],
+        template: Union[str, CompiledTemplate],
+        processes: Optional[int] = None,
+        chunksize: int = 1000,
+    ) -> Iterator[MatchResult]:
+        """Match messages with template. Yield results in order of messages.
+
+        With `processes`, chunks of messages are matched by a process pool
+        whose workers receive the matcher and the compiled template once.
+        """
+        compiled_template = self.compile(template)
+        if not processes:
+            return (
+                self.match(message=message, template=compiled_template)
+                for message in messages
+            )
+
+        return map_in_processes(
+            function=match_messages_chunk,
+            items=messages,
+            processes=processes,
+            chunksize=chunksize,
+            matcher=without_cache(self),
+            compiled_templates=[compiled_template],
+        )
+
+    def match_many_templates(
+        self,
+        message: str,
+        templates: Iterable[Union[str, CompiledTemplate]],
+        processes: Optional[int] = None,
+        chunksize: int = 1000,
+    ) -> Iterator[MatchResult]:
+        """Match message with templates. Yield results in order of templates.
+
+        With `processes`, chunks of templates are matched by a process pool
+        whose workers receive the matcher and the compiled templates once.
+        """
+        compiled_templates = [self.compile(template) for template in templates]
+        if not processes:
+            return (
+                self.match(message=message, template=compiled_template)
+                for compiled_template in compiled_templates
+            )
+
+        return map_in_processes(
+            function=match_templates_chunk,
+            items=range(len(compiled_templates)),
+            processes=processes,
+            chunksize=chunksize,
+            matcher=without_cache(self),
+            compiled_templates=compiled_templates,
+            message=message,
+        )
+
     def match_with_tokens(
         self,
         message: str,
         tokens: List[BaseToken],
     ) -> List[MatchTokensWithMessageResult]:
-        if not tokens:
+        return self.match_with_tokens_at(message=message, start=0, tokens=tokens)
+
+    def match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List[BaseToken],
+    ) -> List[MatchTokensWithMessageResult]:
+        return self._match_with_tokens_at(
+            message=message,
+            start=start,
+            tokens=tokens,
+            index=0,
+        )
+
+    def _match_whole_with_tokens(
+        self,
+        message: str,
+        tokens: List[BaseToken],
+    ) -> List[MatchTokensWithMessageResult]:
+        """Match tokens with the whole message. Return variants ending at its end."""
+        return self._match_with_tokens_at(
+            message=message,
+            start=0,
+            tokens=tokens,
+            index=0,
+            whole=True,
+        )
+
+    def _match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List[BaseToken],
+        index: int,
+        whole: bool = False,
+    ) -> List[MatchTokensWithMessageResult]:
+        """Match tokens[index:] from start; with `whole`, up to the message end only."""
+        if index == len(tokens):
+            if whole and start != len(message):
+                return []
             return [
                 MatchTokensWithMessageResult(
-                    end=0,
-                    context={},
+                    end=start,
+                    context=EMPTY_CONTEXT,
                 )
             ]
 
-        if not message:
+        if start == len(message):
             return []
 
-        match_token_with_message_results = tokens[0].match_with_message(
+        if type(tokens) is TokenList:
+            # The rest of the message is too short or starts with another char.
+            remaining = len(message) - start
+            if remaining < tokens.min_lengths[index]:
+                return []
+            if whole:
+                max_length = tokens.max_lengths[index]
+                if max_length is not None and remaining > max_length:
+                    return []
+            first_chars = tokens.first_chars[index]
+            if first_chars is not None and message[start] not in first_chars:
+                return []
+
+        token = tokens[index]
+        if self.instrumentation is None and self._budget is None:
+            match_token_with_message_results = token.match_with_message_at(
+                message=message,
+                start=start,
+                matcher=self,
+            )
+        else:
+            match_token_with_message_results = self._match_token_tracked(
+                message=message,
+                start=start,
+                token=token,
+                depth=self._depth + index,
+                matcher=self,
+            )
+
+        result: List[MatchTokensWithMessageResult] = []
+        associate_name = token.associate_name
+
+        for match_token_with_message_result in match_token_with_message_results:
+            other_match_tokens_with_message_results = self._match_with_tokens_at(
+                message=message,
+                start=match_token_with_message_result.end,
+                tokens=tokens,
+                index=index + 1,
+                whole=whole,
+            )
+            if not associate_name:
+                result.extend(other_match_tokens_with_message_results)
+                continue
+
+            context = MatchContext(
+                {associate_name: match_token_with_message_result.value}
+            ).merged(match_token_with_message_result.context)
+            result.extend(
+                MatchTokensWithMessageResult(
+                    end=other_result.end,
+                    context=context.merged(other_result.context),
+                )
+                for other_result in other_match_tokens_with_message_results
+            )
+
+        # Results of the next tokens are distinct and sorted already, so only
+        # several variants of this token or a merged context make duplicates.
+        # Equal variants collapse; the first one of every end stays first.
+        if len(match_token_with_message_results) > 1 or (
+            associate_name and len(result) > 1
+        ):
+            result = sorted(dict.fromkeys(result), key=lambda x: x.end)
+        return result
+
+    def _match_token_tracked(
+        self,
+        message: str,
+        start: int,
+        token: BaseToken,
+        depth: int,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        if self._budget is not None:
+            self._budget.step()
+        if self.instrumentation is None:
+            return token.match_with_message_at(
+                message=message,
+                start=start,
+                matcher=matcher,
+            )
+
+        # Token lists nested in the token start one level deeper.
+        self._depth, outer_depth = depth + 1, self._depth
+        try:
+            match_token_with_message_results = token.match_with_message_at(
+                message=message,
+                start=start,
+                matcher=matcher,
+            )
+        finally:
+            self._depth = outer_depth
+        self.instrumentation.on_token_match(
+            token=token,
+            depth=depth,
+            variants_count=len(match_token_with_message_results),
+        )
+        return match_token_with_message_results
+
+    def iter_match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List[BaseToken],
+    ) -> Iterator[MatchTokensWithMessageResult]:
+        return self._iter_match_with_tokens_at(
             message=message,
-            matcher=self,
+            start=start,
+            tokens=tokens,
+            index=0,
         )
 
-        result = set()
+    def _iter_match_whole_with_tokens(
+        self,
+        message: str,
+        tokens: List[BaseToken],
+    ) -> Iterator[MatchTokensWithMessageResult]:
+        return self._iter_match_with_tokens_at(
+            message=message,
+            start=0,
+            tokens=tokens,
+            index=0,
+            whole=True,
+        )
 
-        for match_token_with_message_result in match_token_with_message_results:
-            context = {}
-            associate_name = tokens[0].associate_name
+    def _iter_match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List[BaseToken],
+        index: int,
+        whole: bool = False,
+    ) -> Iterator[MatchTokensWithMessageResult]:
+        if index == len(tokens):
+            if not whole or start == len(message):
+                yield MatchTokensWithMessageResult(end=start, context=EMPTY_CONTEXT)
+            return
+
+        if start == len(message):
+            return
+
+        if type(tokens) is TokenList:
+            remaining = len(message) - start
+            if remaining < tokens.min_lengths[index]:
+                return
+            if whole:
+                max_length = tokens.max_lengths[index]
+                if max_length is not None and remaining > max_length:
+                    return
+            first_chars = tokens.first_chars[index]
+            if first_chars is not None and message[start] not in first_chars:
+                return
+
+        token = tokens[index]
+        associate_name = token.associate_name
+        if self._budget is not None:
+            self._budget.step()
+
+        for match_token_with_message_result in token.iter_match_with_message_at(
+            message=message,
+            start=start,
+            matcher=self,
+        ):
+            context = EMPTY_CONTEXT
             if associate_name:
-                context[associate_name] = match_token_with_message_result.value
-                if match_token_with_message_result.context:
-                    context = {**context, **match_token_with_message_result.context}
+                context = MatchContext(
+                    {associate_name: match_token_with_message_result.value}
+                )
+                context = context.merged(match_token_with_message_result.context)
 
-            other_match_tokens_with_message_results = self.match_with_tokens(
-                message=message[match_token_with_message_result.end :],
-                tokens=tokens[1:],
+            for other_result in self._iter_match_with_tokens_at(
+                message=message,
+                start=match_token_with_message_result.end,
+                tokens=tokens,
+                index=index + 1,
+                whole=whole,
+            ):
+                yield MatchTokensWithMessageResult(
+                    end=other_result.end,
+                    context=context.merged(other_result.context),
+                )
+
+
+class DefaultMatcher(Matcher):
+    def __init__(
+        self,
+        custom_token_finders: Optional[List[BaseTokenFinder]] = None,
+        cache_size: Optional[int] = 128,
+        lazy: bool = False,
+        instrumentation: Optional[Instrumentation] = None,
+        optimize: bool = True,
+    ) -> None:
+        tokenizer = DefaultTokenizer(
+            custom_token_finders=custom_token_finders,
+            instrumentation=instrumentation,
+        )
+        super(DefaultMatcher, self).__init__(
+            tokenizer=tokenizer,
+            cache_size=cache_size,
+            lazy=lazy,
+            instrumentation=instrumentation,
+            optimize=optimize,
+        )
+
+
+class MemoizedMatchSession(BaseMatcher):
+    """State of one memoized match: partial matches by (tokens, index, offset).
+
+    Tokens receive the session as their matcher, so nested token lists of
+    optional and choice tokens are memoized too. For every end only the first
+    variant is kept, which is the one `Matcher.match` would pick for it.
+    """
+
+    def __init__(self, matcher: Matcher, message: str) -> None:
+        self.matcher = matcher
+        self.message = message
+        self.memo: Dict[Tuple[int, int, int, bool], List[Tuple[int, MatchContext]]] = {}
+        self.tokens_by_id: Dict[int, List[BaseToken]] = {}
+        self.tracked = (
+            matcher.instrumentation is not None or matcher._budget is not None
+        )
+
+    def match(
+        self,
+        message: str,
+        template: Union[str, CompiledTemplate],
+    ) -> MatchResult:
+        return self.matcher.match(message=message, template=template)
+
+    def match_with_tokens(
+        self,
+        message: str,
+        tokens: List[BaseToken],
+    ) -> List[MatchTokensWithMessageResult]:
+        start = len(self.message) - len(message)
+        if start < 0 or not self.message.endswith(message):
+            return self.matcher.match_with_tokens(message=message, tokens=tokens)
+
+        return [
+            MatchTokensWithMessageResult(end=r.end - start, context=r.context)
+            for r in self.match_with_tokens_at(
+                message=self.message,
+                start=start,
+                tokens=tokens,
             )
-            for other_result in other_match_tokens_with_message_results:
-                context = {**context, **other_result.context}
-                result.add(
-                    MatchTokensWithMessageResult(
-                        end=other_result.end + match_token_with_message_result.end,
-                        context=context,
+        ]
+
+    def match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List[BaseToken],
+    ) -> List[MatchTokensWithMessageResult]:
+        if message is not self.message and message != self.message:
+            return self.matcher.match_with_tokens_at(
+                message=message,
+                start=start,
+                tokens=tokens,
+            )
+
+        return [
+            MatchTokensWithMessageResult(end=end, context=context)
+            for end, context in self.match_from(tokens=tokens, index=0, start=start)
+        ]
+
+    def match_from(
+        self,
+        tokens: List[BaseToken],
+        index: int,
+        start: int,
+        whole: bool = False,
+    ) -> List[Tuple[int, MatchContext]]:
+        """Match tokens[index:] with message[start:]. Return sorted (end, context).
+
+        With `whole`, only variants ending at the end of the message are kept.
+        """
+        # Holding the list keeps its id from being reused during the session.
+        self.tokens_by_id[id(tokens)] = tokens
+        key = (id(tokens), index, start, whole)
+        if key in self.memo:
+            return self.memo[key]
+
+        if index == len(tokens):
+            if whole and start != len(self.message):
+                result = []
+            else:
+                result = [(start, EMPTY_CONTEXT)]
+        elif start == len(self.message) or (
+            type(tokens) is TokenList
+            and not self._may_match_at(tokens, index, start, whole)  # type: ignore
+        ):
+            result = []
+        else:
+            token = tokens[index]
+            if not self.tracked:
+                match_token_with_message_results = token.match_with_message_at(
+                    message=self.message,
+                    start=start,
+                    matcher=self,
+                )
+            else:
+                match_token_with_message_results = self.matcher._match_token_tracked(
+                    message=self.message,
+                    start=start,
+                    token=token,
+                    depth=self.matcher._depth + index,
+                    matcher=self,
+                )
+
+            variants: Dict[int, MatchContext] = {}
+            associate_name = token.associate_name
+            for match_token_with_message_result in match_token_with_message_results:
+                context = EMPTY_CONTEXT
+                if associate_name:
+                    context = MatchContext(
+                        {associate_name: match_token_with_message_result.value}
                     )
+                    context = context.merged(match_token_with_message_result.context)
+
+                other_results = self.match_from(
+                    tokens=tokens,
+                    index=index + 1,
+                    start=match_token_with_message_result.end,
+                    whole=whole,
                 )
+                for end, other_context in other_results:
+                    if end not in variants:
+                        variants[end] = context.merged(other_context)
 
-        return list(sorted(result, key=lambda x: x.end))
+            result = sorted(variants.items(), key=lambda x: x[0])
 
+        self.memo[key] = result
+        return result
 
-class DefaultMatcher(Matcher):
+    def _may_match_at(
+        self,
+        tokens: TokenList,
+        index: int,
+        start: int,
+        whole: bool,
+    ) -> bool:
+        remaining = len(self.message) - start
+        if remaining < tokens.min_lengths[index]:
+            return False
+        max_length = tokens.max_lengths[index]
+        if whole and max_length is not None and remaining > max_length:
+            return False
+        first_chars = tokens.first_chars[index]
+        return first_chars is None or self.message[start] in first_chars
+
+
+class MemoizedMatcher(Matcher):
+    """Matcher with dynamic programming over (token index, message offset).
+
+    Work stays polynomial in message length even for templates like `* * * * x`
+    that make the plain `Matcher` backtrack exponentially. `match_with_tokens`
+    returns one variant per end instead of every variant.
+    """
+
+    def match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List[BaseToken],
+    ) -> List[MatchTokensWithMessageResult]:
+        session = MemoizedMatchSession(matcher=self, message=message)
+        return session.match_with_tokens_at(message=message, start=start, tokens=tokens)
+
+    def _match_whole_with_tokens(
+        self,
+        message: str,
+        tokens: List[BaseToken],
+    ) -> List[MatchTokensWithMessageResult]:
+        session = MemoizedMatchSession(matcher=self, message=message)
+        return [
+            MatchTokensWithMessageResult(end=end, context=context)
+            for end, context in session.match_from(
+                tokens=tokens,
+                index=0,
+                start=0,
+                whole=True,
+            )
+        ]
+
+    def _iter_match_whole_with_tokens(
+        self,
+        message: str,
+        tokens: List[BaseToken],
+    ) -> Iterator[MatchTokensWithMessageResult]:
+        return iter(self._match_whole_with_tokens(message=message, tokens=tokens))
+
+    def iter_match_with_tokens_at(
+        self,
+        message: str,
+        start: int,
+        tokens: List[BaseToken],
+    ) -> Iterator[MatchTokensWithMessageResult]:
+        # Memoized variants are computed together, one per end.
+        yield from self.match_with_tokens_at(
+            message=message,
+            start=start,
+            tokens=tokens,
+        )
+
+
+class DefaultMemoizedMatcher(MemoizedMatcher):
     def __init__(
         self,
         custom_token_finders: Optional[List[BaseTokenFinder]] = None,
+        cache_size: Optional[int] = 128,
+        instrumentation: Optional[Instrumentation] = None,
+        optimize: bool = True,
     ) -> None:
-        tokenizer = DefaultTokenizer(custom_token_finders=custom_token_finders)
-        super(DefaultMatcher, self).__init__(
+        tokenizer = DefaultTokenizer(
+            custom_token_finders=custom_token_finders,
+            instrumentation=instrumentation,
+        )
+        super().__init__(
+            tokenizer=tokenizer,
+            cache_size=cache_size,
+            instrumentation=instrumentation,
+            optimize=optimize,
+        )
+
+
+class RegexMatcher(Matcher):
+    """Matcher running templates as compiled regular expressions.
+
+    Templates with tokens that have no regular expression translation, such
+    as tokens of custom finders, are matched by the `Matcher` engine. When a
+    message splits between tokens in several ways, the contexts may come from
+    another split than the one `Matcher` picks; success is always the same.
+    Matches with `max_steps` or `timeout` are run by the `Matcher` engine too.
+    """
+
+    def compile_template(self, template: str) -> CompiledTemplate:
+        return self.convert_compiled_template(super().compile_template(template))
+
+    def convert_compiled_template(
+        self,
+        compiled_template: CompiledTemplate,
+    ) -> CompiledTemplate:
+        if isinstance(compiled_template, RegexCompiledTemplate):
+            return compiled_template
+        return RegexCompiledTemplate(
+            template=compiled_template.template,
+            tokens=compiled_template.tokens,
+            regex_template=RegexTranslator().translate(compiled_template.tokens),
+        )
+
+    def match_compiled(self, message: str, template: CompiledTemplate) -> MatchResult:
+        # Backtracking of the regex module cannot be given up within a budget.
+        if self._budget is not None:
+            return super().match_compiled(message=message, template=template)
+
+        if isinstance(template, RegexCompiledTemplate):
+            regex_template = template.regex_template
+        else:
+            regex_template = RegexTranslator().translate(template.tokens)
+
+        if regex_template is None:
+            return super().match_compiled(message=message, template=template)
+
+        context = regex_template.match(message)
+        if context is None:
+            return MatchResult(success=False, context={})
+        return MatchResult(success=True, context=context)
+
+
+class DefaultRegexMatcher(RegexMatcher):
+    def __init__(
+        self,
+        custom_token_finders: Optional[List[BaseTokenFinder]] = None,
+        cache_size: Optional[int] = 128,
+        instrumentation: Optional[Instrumentation] = None,
+        optimize: bool = True,
+    ) -> None:
+        tokenizer = DefaultTokenizer(
+            custom_token_finders=custom_token_finders,
+            instrumentation=instrumentation,
+        )
+        super().__init__(
+            tokenizer=tokenizer,
+            cache_size=cache_size,
+            instrumentation=instrumentation,
+            optimize=optimize,
+        )
+
+
+class NFAMatcher(Matcher):
+    """Matcher running templates as Thompson NFAs in time linear in message length.
+
+    A lazily built DFA decides whether the message matches, and the Pike VM
+    fills the context only for templates with associate names. Templates with
+    custom tokens are matched by the `Matcher` engine. Contexts of ambiguous
+    messages follow `RegexMatcher`.
+    """
+
+    def compile_template(self, template: str) -> CompiledTemplate:
+        return self.convert_compiled_template(super().compile_template(template))
+
+    def convert_compiled_template(
+        self,
+        compiled_template: CompiledTemplate,
+    ) -> CompiledTemplate:
+        if isinstance(compiled_template, NFACompiledTemplate):
+            return compiled_template
+        return NFACompiledTemplate(
+            template=compiled_template.template,
+            tokens=compiled_template.tokens,
+            nfa=NFACompiler().compile(compiled_template.tokens),
+        )
+
+    def match_compiled(self, message: str, template: CompiledTemplate) -> MatchResult:
+        if isinstance(template, NFACompiledTemplate):
+            nfa = template.nfa
+        else:
+            nfa = NFACompiler().compile(template.tokens)
+
+        if nfa is None:
+            return super().match_compiled(message=message, template=template)
+
+        if not nfa.accepts(message):
+            return MatchResult(success=False, context={})
+
+        if not nfa.captures:
+            return MatchResult(success=True, context={})
+
+        context = nfa.match(message)
+        return MatchResult(success=context is not None, context=context or {})
+
+
+class DefaultNFAMatcher(NFAMatcher):
+    def __init__(
+        self,
+        custom_token_finders: Optional[List[BaseTokenFinder]] = None,
+        cache_size: Optional[int] = 128,
+        instrumentation: Optional[Instrumentation] = None,
+        optimize: bool = True,
+    ) -> None:
+        tokenizer = DefaultTokenizer(
+            custom_token_finders=custom_token_finders,
+            instrumentation=instrumentation,
+        )
+        super().__init__(
             tokenizer=tokenizer,
+            cache_size=cache_size,
+            instrumentation=instrumentation,
+            optimize=optimize,
         )
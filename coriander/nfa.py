@@ -0,0 +1,700 @@
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from coriander.core import BaseToken, CompiledTemplate
+from coriander.tokens import (
+    AnyToken,
+    CharToken,
+    ChoiceToken,
+    IntToken,
+    LiteralToken,
+    OptionalToken,
+)
+
+OP_CHAR = 0
+OP_ANY = 1
+OP_DIGIT = 2
+OP_SPLIT = 3
+OP_JUMP = 4
+OP_SAVE = 5
+OP_ASSERT_NOT_END = 6
+OP_ASSERT_NOT_DIGIT = 7
+OP_MATCH = 8
+OP_FAIL = 9
+
+CONSUMING_OPS = frozenset({OP_CHAR, OP_ANY, OP_DIGIT})
+DIGITS = frozenset('0123456789')
+
+LOOKAHEAD_DIGIT = 0
+LOOKAHEAD_OTHER = 1
+LOOKAHEAD_END = 2
+
+
+class NFACapture:
+    KIND_TEXT = 'text'
+    KIND_INT = 'int'
+    KIND_PRESENT = 'present'
+
+    def __init__(
+        self,
+        associate_name: str,
+        kind: str,
+        start_slot: int,
+        end_slot: int,
+        reached_slot: Optional[int] = None,
+    ) -> None:
+        self.associate_name = associate_name
+        self.kind = kind
+        self.start_slot = start_slot
+        self.end_slot = end_slot
+        self.reached_slot = start_slot if reached_slot is None else reached_slot
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'associate_name={repr(self.associate_name)}, '
+            f'kind={repr(self.kind)})'
+        )
+
+    def value(self, message: str, slots: Tuple[int, ...]) -> Any:
+        start = slots[self.start_slot]
+        if self.kind == self.KIND_PRESENT:
+            return start != -1
+        text = message[start : slots[self.end_slot]]
+        if self.kind == self.KIND_INT:
+            return int(text)
+        return text
+
+
+class DFAState:
+    def __init__(self, kernel: FrozenSet[int]) -> None:
+        self.kernel = kernel
+        self.transitions: Dict[str, 'DFAState'] = {}
+        self.accepting: Optional[bool] = None
+        # Arguments of match instructions reached at the end, live kernel and
+        # chars of char instructions reached next.
+        self.matches: Optional[FrozenSet[Any]] = None
+        self.live: Optional[FrozenSet[int]] = None
+        self.chars: Optional[FrozenSet[str]] = None
+
+
+class NFA:
+    """Thompson NFA of a template with capture slots.
+
+    `accepts` runs a DFA built lazily from the NFA and cached between calls,
+    `match` runs a Pike VM to fill captures. Both are linear in message
+    length. Threads are kept in priority order, so contexts come from the
+    split `re` would pick.
+    """
+
+    MAX_DFA_STATES = 10000
+
+    def __init__(
+        self,
+        ops: List[int],
+        args: List[Any],
+        outs: List[int],
+        alt_outs: List[int],
+        start: int,
+        captures: List[NFACapture],
+        slots_count: int,
+    ) -> None:
+        self.ops = ops
+        self.args = args
+        self.outs = outs
+        self.alt_outs = alt_outs
+        self.start = start
+        self.captures = captures
+        self.slots_count = slots_count
+        self._reset_dfa()
+        self._live_pcs: Optional[FrozenSet[int]] = None
+
+    @classmethod
+    def union(cls, nfas: List['NFA']) -> 'NFA':
+        """Return NFA matching what any of nfas matches, without captures.
+
+        Match instructions of the union hold the index of their NFA in nfas,
+        and instructions of every NFA follow the ones of the NFA before it.
+        """
+        ops: List[int] = []
+        args: List[Any] = []
+        outs: List[int] = []
+        alt_outs: List[int] = []
+        starts = []
+
+        for index, nfa in enumerate(nfas):
+            offset = len(ops)
+            starts.append(nfa.start + offset)
+            ops.extend(nfa.ops)
+            args.extend(
+                index if op == OP_MATCH else arg for op, arg in zip(nfa.ops, nfa.args)
+            )
+            outs.extend(out + offset if out != -1 else -1 for out in nfa.outs)
+            alt_outs.extend(out + offset if out != -1 else -1 for out in nfa.alt_outs)
+
+        if starts:
+            start = starts[-1]
+        else:
+            start = len(ops)
+            ops.append(OP_FAIL)
+            args.append(None)
+            outs.append(-1)
+            alt_outs.append(-1)
+        for nfa_start in reversed(starts[:-1]):
+            ops.append(OP_SPLIT)
+            args.append(None)
+            outs.append(nfa_start)
+            alt_outs.append(start)
+            start = len(ops) - 1
+
+        return cls(
+            ops=ops,
+            args=args,
+            outs=outs,
+            alt_outs=alt_outs,
+            start=start,
+            captures=[],
+            slots_count=0,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state['_dfa_states']
+        del state['_dfa_start']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._reset_dfa()
+
+    def closure(self, kernel: FrozenSet[int], lookahead: Optional[str]) -> Set[int]:
+        """Return consuming and match instructions reachable without input."""
+        ops = self.ops
+        outs = self.outs
+        alt_outs = self.alt_outs
+        result = set()
+        visited = set()
+        stack = list(kernel)
+
+        while stack:
+            pc = stack.pop()
+            if pc in visited:
+                continue
+            visited.add(pc)
+            op = ops[pc]
+            if op in CONSUMING_OPS or op == OP_MATCH:
+                result.add(pc)
+            elif op == OP_SPLIT:
+                stack.append(outs[pc])
+                stack.append(alt_outs[pc])
+            elif op == OP_JUMP or op == OP_SAVE:
+                stack.append(outs[pc])
+            elif op == OP_ASSERT_NOT_END:
+                if lookahead is not None:
+                    stack.append(outs[pc])
+            elif op == OP_ASSERT_NOT_DIGIT:
+                if lookahead is None or lookahead not in DIGITS:
+                    stack.append(outs[pc])
+
+        return result
+
+    def step(self, kernel: FrozenSet[int], char: str) -> FrozenSet[int]:
+        """Return kernel of instructions reached by consuming char."""
+        ops = self.ops
+        args = self.args
+        outs = self.outs
+        result = set()
+        for pc in self.closure(kernel, lookahead=char):
+            op = ops[pc]
+            if (
+                (op == OP_CHAR and args[pc] == char)
+                or op == OP_ANY
+                or (op == OP_DIGIT and char in DIGITS)
+            ):
+                result.add(outs[pc])
+        return frozenset(result)
+
+    @property
+    def start_state(self) -> DFAState:
+        return self._dfa_start
+
+    def transition(self, state: DFAState, char: str) -> DFAState:
+        """Return DFA state reached from state by char, built on first use."""
+        next_state = state.transitions.get(char)
+        if next_state is None:
+            next_state = self._dfa_state(self.step(state.kernel, char))
+            state.transitions[char] = next_state
+        return next_state
+
+    def matches(self, state: DFAState) -> FrozenSet[Any]:
+        """Return arguments of match instructions reached if the message ends."""
+        if state.matches is None:
+            state.matches = frozenset(
+                self.args[pc]
+                for pc in self.closure(state.kernel, lookahead=None)
+                if self.ops[pc] == OP_MATCH
+            )
+        return state.matches
+
+    def live(self, state: DFAState) -> FrozenSet[int]:
+        """Return instructions of the kernel of state that can still reach a match."""
+        if state.live is None:
+            state.live = state.kernel & self.live_pcs()
+        return state.live
+
+    def chars(self, state: DFAState) -> FrozenSet[str]:
+        """Return chars state steps on by char instructions.
+
+        Other chars step like any digit or any other char of their class.
+        """
+        if state.chars is None:
+            ops = self.ops
+            args = self.args
+            state.chars = frozenset(
+                args[pc]
+                for lookahead in ('0', 'a')
+                for pc in self.closure(state.kernel, lookahead=lookahead)
+                if ops[pc] == OP_CHAR
+            )
+        return state.chars
+
+    def live_pcs(self) -> FrozenSet[int]:
+        """Return instructions some continuation of the message matches from.
+
+        Threads do not interact, so an instruction is live when a match is
+        reachable from it alone. Assertions only look at whether the next
+        char is a digit, another char or the end, so the search runs
+        backwards from match instructions over instructions paired with
+        what comes next.
+        """
+        if self._live_pcs is not None:
+            return self._live_pcs
+
+        ops = self.ops
+        args = self.args
+        outs = self.outs
+        alt_outs = self.alt_outs
+        # What comes next: a digit, another char or the end of the message.
+        lookaheads = (LOOKAHEAD_DIGIT, LOOKAHEAD_OTHER, LOOKAHEAD_END)
+        predecessors: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        live_nodes = set()
+
+        for pc, op in enumerate(ops):
+            for lookahead in lookaheads:
+                node = (pc, lookahead)
+                targets: List[int] = []
+                if op in CONSUMING_OPS:
+                    if op == OP_CHAR:
+                        is_digit = args[pc] in DIGITS
+                        consumes = lookahead == (
+                            LOOKAHEAD_DIGIT if is_digit else LOOKAHEAD_OTHER
+                        )
+                    elif op == OP_DIGIT:
+                        consumes = lookahead == LOOKAHEAD_DIGIT
+                    else:
+                        consumes = lookahead != LOOKAHEAD_END
+                    if consumes:
+                        for next_lookahead in lookaheads:
+                            predecessors.setdefault(
+                                (outs[pc], next_lookahead), []
+                            ).append(node)
+                    continue
+                if op == OP_MATCH:
+                    if lookahead == LOOKAHEAD_END:
+                        live_nodes.add(node)
+                elif op == OP_SPLIT:
+                    targets = [outs[pc], alt_outs[pc]]
+                elif op == OP_JUMP or op == OP_SAVE:
+                    targets = [outs[pc]]
+                elif op == OP_ASSERT_NOT_END:
+                    if lookahead != LOOKAHEAD_END:
+                        targets = [outs[pc]]
+                elif op == OP_ASSERT_NOT_DIGIT:
+                    if lookahead != LOOKAHEAD_DIGIT:
+                        targets = [outs[pc]]
+                for target in targets:
+                    predecessors.setdefault((target, lookahead), []).append(node)
+
+        stack = list(live_nodes)
+        while stack:
+            for node in predecessors.get(stack.pop(), ()):
+                if node not in live_nodes:
+                    live_nodes.add(node)
+                    stack.append(node)
+
+        self._live_pcs = frozenset(pc for pc, _ in live_nodes)
+        return self._live_pcs
+
+    def accepts(self, message: str) -> bool:
+        """Check whether the whole message matches, using the lazy DFA."""
+        state = self._dfa_start
+        for char in message:
+            next_state = state.transitions.get(char)
+            if next_state is None:
+                next_state = self._dfa_state(self.step(state.kernel, char))
+                state.transitions[char] = next_state
+            if not next_state.kernel:
+                return False
+            state = next_state
+
+        if state.accepting is None:
+            state.accepting = any(
+                self.ops[pc] == OP_MATCH
+                for pc in self.closure(state.kernel, lookahead=None)
+            )
+        return state.accepting
+
+    def match(self, message: str) -> Optional[dict]:
+        """Match the whole message with the Pike VM. Return context or None."""
+        ops = self.ops
+        args = self.args
+        outs = self.outs
+        threads = self._add_threads(
+            threads=[],
+            pc=self.start,
+            slots=(-1,) * self.slots_count,
+            position=0,
+            message=message,
+        )
+
+        for position, char in enumerate(message):
+            next_threads: List[Tuple[int, Tuple[int, ...]]] = []
+            visited: Set[int] = set()
+            for pc, slots in threads:
+                op = ops[pc]
+                if (
+                    (op == OP_CHAR and args[pc] == char)
+                    or op == OP_ANY
+                    or (op == OP_DIGIT and char in DIGITS)
+                ):
+                    self._add_threads(
+                        threads=next_threads,
+                        pc=outs[pc],
+                        slots=slots,
+                        position=position + 1,
+                        message=message,
+                        visited=visited,
+                    )
+            threads = next_threads
+            if not threads:
+                return None
+
+        for pc, slots in threads:
+            if ops[pc] == OP_MATCH:
+                context = {}
+                for capture in self.captures:
+                    if slots[capture.reached_slot] != -1:
+                        context[capture.associate_name] = capture.value(message, slots)
+                return context
+        return None
+
+    def _add_threads(
+        self,
+        threads: List[Tuple[int, Tuple[int, ...]]],
+        pc: int,
+        slots: Tuple[int, ...],
+        position: int,
+        message: str,
+        visited: Optional[Set[int]] = None,
+    ) -> List[Tuple[int, Tuple[int, ...]]]:
+        ops = self.ops
+        outs = self.outs
+        alt_outs = self.alt_outs
+        lookahead = message[position] if position < len(message) else None
+        if visited is None:
+            visited = set()
+        stack = [(pc, slots)]
+
+        while stack:
+            pc, slots = stack.pop()
+            if pc in visited:
+                continue
+            visited.add(pc)
+            op = ops[pc]
+            if op in CONSUMING_OPS or op == OP_MATCH:
+                threads.append((pc, slots))
+            elif op == OP_SPLIT:
+                stack.append((alt_outs[pc], slots))
+                stack.append((outs[pc], slots))
+            elif op == OP_JUMP:
+                stack.append((outs[pc], slots))
+            elif op == OP_SAVE:
+                slot = self.args[pc]
+                slots = slots[:slot] + (position,) + slots[slot + 1 :]
+                stack.append((outs[pc], slots))
+            elif op == OP_ASSERT_NOT_END:
+                if lookahead is not None:
+                    stack.append((outs[pc], slots))
+            elif op == OP_ASSERT_NOT_DIGIT:
+                if lookahead is None or lookahead not in DIGITS:
+                    stack.append((outs[pc], slots))
+
+        return threads
+
+    def _reset_dfa(self) -> None:
+        start_kernel = frozenset({self.start})
+        self._dfa_start = DFAState(kernel=start_kernel)
+        self._dfa_states: Dict[FrozenSet[int], DFAState] = {
+            start_kernel: self._dfa_start
+        }
+
+    def _dfa_state(self, kernel: FrozenSet[int]) -> DFAState:
+        state = self._dfa_states.get(kernel)
+        if state is None:
+            if len(self._dfa_states) >= self.MAX_DFA_STATES:
+                # States are reachable from the start through transitions, so
+                # a new start lets the whole old DFA be collected.
+                self._reset_dfa()
+                state = self._dfa_states.get(kernel)
+                if state is not None:
+                    return state
+            state = DFAState(kernel=kernel)
+            self._dfa_states[kernel] = state
+        return state
+
+
+class NFACompiledTemplate(CompiledTemplate):
+    def __init__(
+        self,
+        template: str,
+        tokens: List[BaseToken],
+        nfa: Optional[NFA],
+    ) -> None:
+        super().__init__(template=template, tokens=tokens)
+        self.nfa = nfa
+
+
+class NFACompiler:
+    """Compile tokens of `DefaultTokenizer` to a Thompson NFA.
+
+    Follows the rules of `RegexTranslator`: tokens never start at the end of
+    the message, nested names are visible only through named containers, and
+    custom tokens make `compile` return None.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.ops: List[int] = []
+        self.args: List[Any] = []
+        self.outs: List[int] = []
+        self.alt_outs: List[int] = []
+        self.captures: List[NFACapture] = []
+        self.slots_count = 0
+
+    def compile(self, tokens: List[BaseToken]) -> Optional[NFA]:
+        self.reset()
+        fragment = self.compile_tokens(tokens=tokens, capture=True)
+        if fragment is None:
+            return None
+        start, dangling = fragment
+        self.patch(dangling, self.emit(OP_MATCH))
+        return NFA(
+            ops=self.ops,
+            args=self.args,
+            outs=self.outs,
+            alt_outs=self.alt_outs,
+            start=start,
+            captures=self.captures,
+            slots_count=self.slots_count,
+        )
+
+    def emit(self, op: int, arg: Any = None, out: int = -1, alt_out: int = -1) -> int:
+        self.ops.append(op)
+        self.args.append(arg)
+        self.outs.append(out)
+        self.alt_outs.append(alt_out)
+        return len(self.ops) - 1
+
+    def patch(self, dangling: List[Tuple[int, bool]], target: int) -> None:
+        for pc, alternative in dangling:
+            if alternative:
+                self.alt_outs[pc] = target
+            else:
+                self.outs[pc] = target
+
+    def new_slot(self) -> int:
+        self.slots_count += 1
+        return self.slots_count - 1
+
+    def compile_tokens(
+        self,
+        tokens: List[BaseToken],
+        capture: bool,
+    ) -> Optional[Tuple[int, List[Tuple[int, bool]]]]:
+        if not tokens:
+            pc = self.emit(OP_JUMP)
+            return pc, [(pc, False)]
+
+        start = None
+        dangling: List[Tuple[int, bool]] = []
+        for token in tokens:
+            fragment = self.compile_token(token=token, capture=capture)
+            if fragment is None:
+                return None
+            if start is None:
+                start = fragment[0]
+            else:
+                self.patch(dangling, fragment[0])
+            dangling = fragment[1]
+        return start, dangling  # type: ignore
+
+    def compile_token(
+        self,
+        token: BaseToken,
+        capture: bool,
+    ) -> Optional[Tuple[int, List[Tuple[int, bool]]]]:
+        associate_name = token.associate_name if capture else None
+        token_type = type(token)
+
+        if token_type is OptionalToken:
+            return self.compile_optional(token, associate_name)  # type: ignore
+
+        if token_type is ChoiceToken:
+            return self.compile_choice(token, associate_name)  # type: ignore
+
+        if token_type is CharToken:
+            pc = self.emit(OP_CHAR, arg=token.char)  # type: ignore
+            fragment = (pc, [(pc, False)])
+        elif token_type is LiteralToken:
+            first = pc = self.emit(OP_CHAR, arg=token.text[0])  # type: ignore
+            for char in token.text[1:]:  # type: ignore
+                next_pc = self.emit(OP_CHAR, arg=char)
+                self.outs[pc] = next_pc
+                pc = next_pc
+            fragment = (first, [(pc, False)])
+        elif token_type is AnyToken:
+            pc = self.emit(OP_ANY)
+            loop = self.emit(OP_SPLIT, alt_out=pc)
+            self.outs[pc] = loop
+            fragment = (pc, [(loop, False)])
+        elif token_type is IntToken:
+            pc = self.emit(OP_DIGIT)
+            loop = self.emit(OP_SPLIT, out=pc)
+            self.outs[pc] = loop
+            fragment = (pc, [(loop, True)])
+        else:
+            return None
+
+        kind = NFACapture.KIND_INT if token_type is IntToken else NFACapture.KIND_TEXT
+        if associate_name:
+            fragment = self.wrap_capture(fragment, associate_name, kind)
+        if token_type is IntToken:
+            assertion = self.emit(OP_ASSERT_NOT_DIGIT)
+            self.patch(fragment[1], assertion)
+            fragment = (fragment[0], [(assertion, False)])
+        return fragment
+
+    def compile_optional(
+        self,
+        token: OptionalToken,
+        associate_name: Optional[str],
+    ) -> Optional[Tuple[int, List[Tuple[int, bool]]]]:
+        guard = self.emit(OP_ASSERT_NOT_END)
+        reached_slot = None
+        if associate_name:
+            reached_slot = self.new_slot()
+            reached = self.emit(OP_SAVE, arg=reached_slot)
+            self.outs[guard] = reached
+            capture = NFACapture(
+                associate_name=associate_name,
+                kind=NFACapture.KIND_PRESENT,
+                start_slot=self.new_slot(),
+                end_slot=-1,
+                reached_slot=reached_slot,
+            )
+            self.captures.append(capture)
+            split = self.emit(OP_SPLIT)
+            self.outs[reached] = split
+            present = self.emit(OP_SAVE, arg=capture.start_slot)
+            self.alt_outs[split] = present
+        else:
+            split = self.emit(OP_SPLIT)
+            self.outs[guard] = split
+
+        fragment = self.compile_tokens(
+            tokens=token.tokens,
+            capture=bool(associate_name),
+        )
+        if fragment is None:
+            return None
+
+        if associate_name:
+            self.outs[present] = fragment[0]
+        else:
+            self.alt_outs[split] = fragment[0]
+        return guard, [(split, False)] + fragment[1]
+
+    def compile_choice(
+        self,
+        token: ChoiceToken,
+        associate_name: Optional[str],
+    ) -> Optional[Tuple[int, List[Tuple[int, bool]]]]:
+        guard = self.emit(OP_ASSERT_NOT_END)
+        if not token.choices:
+            self.outs[guard] = self.emit(OP_FAIL)
+            return guard, []
+
+        capture = None
+        entry = guard
+        if associate_name:
+            capture = NFACapture(
+                associate_name=associate_name,
+                kind=NFACapture.KIND_TEXT,
+                start_slot=self.new_slot(),
+                end_slot=self.new_slot(),
+            )
+            self.captures.append(capture)
+            entry = self.emit(OP_SAVE, arg=capture.start_slot)
+            self.outs[guard] = entry
+
+        dangling: List[Tuple[int, bool]] = []
+        previous: Tuple[int, bool] = (entry, False)
+        for index, choice in enumerate(token.choices):
+            if index < len(token.choices) - 1:
+                split = self.emit(OP_SPLIT)
+                self.patch([previous], split)
+                fragment = self.compile_tokens(
+                    tokens=choice,
+                    capture=bool(associate_name),
+                )
+                if fragment is None:
+                    return None
+                self.outs[split] = fragment[0]
+                previous = (split, True)
+            else:
+                fragment = self.compile_tokens(
+                    tokens=choice,
+                    capture=bool(associate_name),
+                )
+                if fragment is None:
+                    return None
+                self.patch([previous], fragment[0])
+            dangling.extend(fragment[1])
+
+        if capture:
+            end = self.emit(OP_SAVE, arg=capture.end_slot)
+            self.patch(dangling, end)
+            dangling = [(end, False)]
+        return guard, dangling
+
+    def wrap_capture(
+        self,
+        fragment: Tuple[int, List[Tuple[int, bool]]],
+        associate_name: str,
+        kind: str,
+    ) -> Tuple[int, List[Tuple[int, bool]]]:
+        capture = NFACapture(
+            associate_name=associate_name,
+            kind=kind,
+            start_slot=self.new_slot(),
+            end_slot=self.new_slot(),
+        )
+        self.captures.append(capture)
+        start = self.emit(OP_SAVE, arg=capture.start_slot, out=fragment[0])
+        end = self.emit(OP_SAVE, arg=capture.end_slot)
+        self.patch(fragment[1], end)
+        return start, [(end, False)]
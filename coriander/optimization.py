@@ -0,0 +1,277 @@
+from typing import Any, Callable, FrozenSet, Iterable, List, Optional
+
+from coriander.core import BaseToken
+from coriander.tokens import (
+    AnyToken,
+    CharToken,
+    ChoiceToken,
+    IntToken,
+    LiteralToken,
+    OptionalToken,
+)
+from coriander.tries import literal_trie
+
+
+class TokenBounds:
+    """What matches of a token or token list can look like.
+
+    `max_length` is None when unbounded. `first_chars` holds every character
+    a non-empty match can start with, or None when it can start with any.
+    """
+
+    def __init__(
+        self,
+        min_length: int,
+        max_length: Optional[int],
+        first_chars: Optional[FrozenSet[str]],
+    ) -> None:
+        self.min_length = min_length
+        self.max_length = max_length
+        self.first_chars = first_chars
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'min_length={self.min_length}, '
+            f'max_length={self.max_length}, '
+            f'first_chars={repr(self.first_chars)})'
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, TokenBounds) and (
+            (other.min_length, other.max_length, other.first_chars)
+            == (self.min_length, self.max_length, self.first_chars)
+        )
+
+
+UNKNOWN_BOUNDS = TokenBounds(min_length=0, max_length=None, first_chars=None)
+
+
+def token_bounds(token: BaseToken) -> TokenBounds:
+    """Return bounds of built-in tokens. Other tokens may match anything."""
+    if type(token) is CharToken:
+        return TokenBounds(1, 1, frozenset(token.char))  # type: ignore
+    if type(token) is LiteralToken:
+        text = token.text  # type: ignore
+        return TokenBounds(len(text), len(text), frozenset(text[:1]))
+    if type(token) is AnyToken:
+        return TokenBounds(1, None, None)
+    if type(token) is IntToken:
+        return TokenBounds(1, None, frozenset(IntToken.ALPHABET))
+    if type(token) is OptionalToken:
+        bounds = tokens_bounds(token.tokens)  # type: ignore
+        return TokenBounds(0, bounds.max_length, bounds.first_chars)
+    if type(token) is ChoiceToken:
+        choices_bounds = [
+            tokens_bounds(choice) for choice in token.choices  # type: ignore
+        ]
+        if not choices_bounds:
+            return UNKNOWN_BOUNDS
+        max_lengths = [
+            bounds.max_length
+            for bounds in choices_bounds
+            if bounds.max_length is not None
+        ]
+        return TokenBounds(
+            min_length=min(bounds.min_length for bounds in choices_bounds),
+            max_length=(
+                max(max_lengths) if len(max_lengths) == len(choices_bounds) else None
+            ),
+            first_chars=_union(bounds.first_chars for bounds in choices_bounds),
+        )
+    return UNKNOWN_BOUNDS
+
+
+def tokens_bounds(tokens: List[BaseToken]) -> TokenBounds:
+    """Return bounds of the concatenation of tokens."""
+    if isinstance(tokens, TokenList):
+        return TokenBounds(
+            min_length=tokens.min_lengths[0],
+            max_length=tokens.max_lengths[0],
+            first_chars=tokens.nonempty_first_chars,
+        )
+    return _suffix_bounds([token_bounds(token) for token in tokens])[0]
+
+
+class TokenList(list):
+    """Tokens with precomputed bounds of every suffix, for pruning matches.
+
+    A match of tokens[index:] is at least `min_lengths[index]` characters
+    long, at most `max_lengths[index]` (None when unbounded) and, unless
+    `first_chars[index]` is None, starts with one of its characters. Matchers
+    skip offsets where the rest of the message can not satisfy that.
+    """
+
+    def __init__(self, tokens: List[BaseToken]) -> None:
+        super().__init__(tokens)
+        suffix_bounds = _suffix_bounds([token_bounds(token) for token in tokens])
+        self.min_lengths = [bounds.min_length for bounds in suffix_bounds]
+        self.max_lengths = [bounds.max_length for bounds in suffix_bounds]
+        # First characters only prune suffixes that can not match empty.
+        self.first_chars = [
+            bounds.first_chars if bounds.min_length else None
+            for bounds in suffix_bounds
+        ]
+        self.nonempty_first_chars = suffix_bounds[0].first_chars
+
+    def accepts_length(self, length: int) -> bool:
+        """Return whether a message of length may match all tokens."""
+        max_length = self.max_lengths[0]
+        return self.min_lengths[0] <= length and (
+            max_length is None or length <= max_length
+        )
+
+
+def _suffix_bounds(bounds_list: List[TokenBounds]) -> List[TokenBounds]:
+    """Return bounds of every suffix, including the empty one, by start index."""
+    suffix = TokenBounds(min_length=0, max_length=0, first_chars=frozenset())
+    result = [suffix]
+    for bounds in reversed(bounds_list):
+        first_chars = bounds.first_chars
+        if not bounds.min_length:
+            first_chars = _union([first_chars, suffix.first_chars])
+        suffix = TokenBounds(
+            min_length=bounds.min_length + suffix.min_length,
+            max_length=(
+                None
+                if bounds.max_length is None or suffix.max_length is None
+                else bounds.max_length + suffix.max_length
+            ),
+            first_chars=first_chars,
+        )
+        result.append(suffix)
+    result.reverse()
+    return result
+
+
+def _union(
+    chars_sets: Iterable[Optional[FrozenSet[str]]],
+) -> Optional[FrozenSet[str]]:
+    result: FrozenSet[str] = frozenset()
+    for chars in chars_sets:
+        if chars is None:
+            return None
+        result |= chars
+    return result
+
+
+def coalesce_literals(tokens: List[BaseToken]) -> List[BaseToken]:
+    """Return tokens with runs of unnamed character tokens merged into literals.
+
+    Optional and choice tokens are rebuilt with coalesced nested tokens and
+    keep their associate names. Subclasses of built-in tokens are kept as is.
+    """
+    result: List[BaseToken] = []
+    run: List[CharToken] = []
+
+    for token in tokens:
+        if type(token) is CharToken and not token.associate_name:
+            run.append(token)  # type: ignore
+            continue
+
+        if run:
+            result.append(_literal(run))
+            run = []
+        result.append(_map_nested(token, coalesce_literals))
+
+    if run:
+        result.append(_literal(run))
+    return result
+
+
+def anchor_any_tokens(tokens: List[BaseToken]) -> List[BaseToken]:
+    """Return tokens with any tokens anchored to the literal following them.
+
+    An anchored any token only ends where its anchor occurs, so it jumps
+    between occurrences of the next literal instead of trying every end.
+    """
+    result: List[BaseToken] = []
+    for index, token in enumerate(tokens):
+        if type(token) is AnyToken and token.anchor is None:  # type: ignore
+            anchor = _literal_text(tokens[index + 1 : index + 2])
+            if anchor:
+                any_token = AnyToken(anchor=anchor)
+                any_token.associate_name = token.associate_name
+                token = any_token
+        result.append(_map_nested(token, anchor_any_tokens))
+    return result
+
+
+def index_literal_choices(tokens: List[BaseToken]) -> List[BaseToken]:
+    """Return tokens with choices of literal text given a trie of their texts.
+
+    Tries are shared by all choices of the same texts, e.g. a synonym list
+    used by many templates is kept in memory once.
+    """
+    result: List[BaseToken] = []
+    for token in tokens:
+        token = _map_nested(token, index_literal_choices)
+        if type(token) is ChoiceToken and token.choices:  # type: ignore
+            texts = [_text(choice) for choice in token.choices]  # type: ignore
+            if all(text is not None for text in texts):
+                token.literal_trie = literal_trie(texts)  # type: ignore
+        result.append(token)
+    return result
+
+
+def _text(tokens: List[BaseToken]) -> Optional[str]:
+    """Return the text tokens match, None unless they are unnamed literals."""
+    texts = []
+    for token in tokens:
+        if token.associate_name:
+            return None
+        if type(token) is CharToken:
+            texts.append(token.char)  # type: ignore
+        elif type(token) is LiteralToken:
+            texts.append(token.text)  # type: ignore
+        else:
+            return None
+    return ''.join(texts)
+
+
+def _literal_text(tokens: List[BaseToken]) -> Optional[str]:
+    for token in tokens:
+        if type(token) is CharToken:
+            return token.char  # type: ignore
+        if type(token) is LiteralToken:
+            return token.text  # type: ignore
+    return None
+
+
+def _map_nested(
+    token: BaseToken,
+    function: Callable[[List[BaseToken]], List[BaseToken]],
+) -> BaseToken:
+    """Return optional or choice token rebuilt with function of its token lists."""
+    if type(token) is OptionalToken:
+        nested_token: BaseToken = OptionalToken(
+            tokens=function(token.tokens),  # type: ignore
+        )
+    elif type(token) is ChoiceToken:
+        nested_token = ChoiceToken(
+            choices=[function(choice) for choice in token.choices],  # type: ignore
+        )
+        # Passes keep what choices match, so their trie stays valid.
+        nested_token.literal_trie = token.literal_trie  # type: ignore
+    else:
+        return token
+    nested_token.associate_name = token.associate_name
+    return nested_token
+
+
+def _literal(run: List[CharToken]) -> BaseToken:
+    if len(run) == 1:
+        return run[0]
+    return LiteralToken(text=''.join(token.char for token in run))
+
+
+def annotate_bounds(tokens: List[BaseToken]) -> TokenList:
+    """Return tokens as `TokenList`, nested token lists of built-in tokens too."""
+    return TokenList([_map_nested(token, annotate_bounds) for token in tokens])
+
+
+def optimize(tokens: List[BaseToken]) -> List[BaseToken]:
+    """Return tokens rewritten to match faster with the same results."""
+    return annotate_bounds(
+        index_literal_choices(anchor_any_tokens(coalesce_literals(tokens)))
+    )
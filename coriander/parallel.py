@@ -0,0 +1,112 @@
+import copy
+import pickle
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Sequence, TypeVar
+
+from coriander.compilation import TemplateCache
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Set in every worker process by `load_worker_state`.
+_worker_state: dict = {}
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def without_cache(compiler: T) -> T:
+    """Shallow copy of matcher or generator with an empty cache, cheap to pickle."""
+    compiler_copy = copy.copy(compiler)
+    compiler_copy.template_cache = TemplateCache(maxsize=0)  # type: ignore
+    return compiler_copy
+
+
+def load_worker_state(state_id: str, state_data: bytes) -> None:
+    """Unpickle state of a pool in this worker, unless it is loaded already."""
+    if _worker_state.get('state_id') != state_id:
+        _worker_state.clear()
+        _worker_state.update(pickle.loads(state_data))
+        _worker_state['state_id'] = state_id
+
+
+def run_chunk(
+    function: Callable[[List[T]], Sequence[R]],
+    state_id: str,
+    state_data: bytes,
+    chunk: List[T],
+) -> Sequence[R]:
+    load_worker_state(state_id, state_data)
+    return function(chunk)
+
+
+def match_messages_chunk(messages: List[str]) -> list:
+    matcher = _worker_state['matcher']
+    (compiled_template,) = _worker_state['compiled_templates']
+    return [
+        matcher.match(message=message, template=compiled_template)
+        for message in messages
+    ]
+
+
+def match_templates_chunk(template_indices: List[int]) -> list:
+    matcher = _worker_state['matcher']
+    message = _worker_state['message']
+    compiled_templates = _worker_state['compiled_templates']
+    return [
+        matcher.match(message=message, template=compiled_templates[index])
+        for index in template_indices
+    ]
+
+
+def generate_messages_chunk(chunks: List[tuple]) -> list:
+    generator = _worker_state['generator']
+    (compiled_template,) = _worker_state['compiled_templates']
+    seed = _worker_state['seed']
+    return [
+        message
+        for start, count, contexts in chunks
+        for message in generator.generate_chunk(
+            template=compiled_template,
+            start=start,
+            count=count,
+            contexts=contexts,
+            seed=seed,
+        )
+    ]
+
+
+def map_in_processes(
+    function: Callable[[List[T]], Sequence[R]],
+    items: Iterable[T],
+    processes: int,
+    chunksize: int,
+    **state: Any,
+) -> Iterator[R]:
+    """Apply function to chunks of items in a process pool. Yield results in order.
+
+    State is pickled once and sent with every chunk, but every worker
+    unpickles it only once. Pool initializers would need Python 3.7. At
+    most two chunks per worker are in flight, so items are consumed lazily.
+    """
+    state_id = uuid.uuid4().hex
+    state_data = pickle.dumps(state)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures: Deque[Future] = deque()
+        for chunk in chunked(items, chunksize):
+            futures.append(
+                executor.submit(run_chunk, function, state_id, state_data, chunk)
+            )
+            if len(futures) >= 2 * processes:
+                yield from futures.popleft().result()
+        while futures:
+            yield from futures.popleft().result()
@@ -0,0 +1,150 @@
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+from coriander.core import BaseToken
+from coriander.tokens import CharToken, LiteralToken
+
+
+def required_literals(tokens: List[BaseToken]) -> List[str]:
+    """Return literal runs every message matching tokens must contain.
+
+    Runs are made of character and literal tokens outside optional, choice and
+    other tokens, so each of them is a substring of every matching message.
+    """
+    literals = []
+    chars: List[str] = []
+
+    for token in tokens:
+        if type(token) is CharToken:
+            chars.append(token.char)  # type: ignore
+        elif type(token) is LiteralToken:
+            chars.append(token.text)  # type: ignore
+        elif chars:
+            literals.append(''.join(chars))
+            chars = []
+
+    if chars:
+        literals.append(''.join(chars))
+    return literals
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton finding which patterns occur in a text in one scan."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.transitions: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Nearest state on the fail chain that ends some pattern.
+        self.output_link: List[int] = [0]
+        self.outputs: List[List[int]] = [[]]
+        self.patterns_count = 0
+
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.output_link.append(0)
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(pattern_id)
+            self.patterns_count += 1
+
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fail_state = self.fail[state]
+                while fail_state and char not in self.transitions[fail_state]:
+                    fail_state = self.fail[fail_state]
+                fail_next = self.transitions[fail_state].get(char, 0)
+                if fail_next == next_state:
+                    fail_next = 0
+                self.fail[next_state] = fail_next
+                self.output_link[next_state] = (
+                    fail_next
+                    if self.outputs[fail_next]
+                    else self.output_link[fail_next]
+                )
+
+    def find(self, text: str) -> Set[int]:
+        """Return ids of patterns occurring in text."""
+        transitions = self.transitions
+        fail = self.fail
+        output_link = self.output_link
+        outputs = self.outputs
+        found: Set[int] = set()
+        state = 0
+
+        for char in text:
+            while True:
+                next_state = transitions[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if not state:
+                    break
+                state = fail[state]
+
+            output_state = state if outputs[state] else output_link[state]
+            while output_state:
+                found.update(outputs[output_state])
+                output_state = output_link[output_state]
+
+        return found
+
+
+class LiteralPrefilter:
+    """Select templates whose required literals all occur in a message.
+
+    Each template is filed under its longest required literal, so a message
+    only visits templates whose rarest-looking literal it contains. Templates
+    without required literals are always candidates.
+    """
+
+    def __init__(self) -> None:
+        self.literal_ids: Dict[str, int] = {}
+        self.required: Dict[int, FrozenSet[int]] = {}
+        self.postings: Dict[int, List[int]] = {}
+        self.unanchored: Set[int] = set()
+        self._automaton: AhoCorasick = AhoCorasick(patterns=[])
+
+    def __len__(self) -> int:
+        return len(self.required)
+
+    def add(self, template_index: int, tokens: List[BaseToken]) -> None:
+        literals = required_literals(tokens)
+        literal_ids = []
+        for literal in literals:
+            if literal not in self.literal_ids:
+                self.literal_ids[literal] = len(self.literal_ids)
+            literal_ids.append(self.literal_ids[literal])
+
+        self.required[template_index] = frozenset(literal_ids)
+        if not literals:
+            self.unanchored.add(template_index)
+            return
+
+        anchor = max(literals, key=len)
+        self.postings.setdefault(self.literal_ids[anchor], []).append(template_index)
+
+    def build(self) -> None:
+        """Rebuild the automaton if literals were added since the last build."""
+        if self._automaton.patterns_count != len(self.literal_ids):
+            self._automaton = AhoCorasick(patterns=list(self.literal_ids))
+
+    def candidates(self, message: str) -> Set[int]:
+        """Return indexes of templates that can match message."""
+        self.build()
+        found = self._automaton.find(message)
+        result = set(self.unanchored)
+        for literal_id in found:
+            for template_index in self.postings.get(literal_id, ()):
+                if self.required[template_index] <= found:
+                    result.add(template_index)
+        return result
@@ -0,0 +1,225 @@
+import re
+from typing import Any, List, Optional, Pattern
+
+from coriander.core import BaseToken, CompiledTemplate
+from coriander.tokens import (
+    AnyToken,
+    CharToken,
+    ChoiceToken,
+    IntToken,
+    LiteralToken,
+    OptionalToken,
+)
+
+
+class RegexCapture:
+    KIND_TEXT = 'text'
+    KIND_INT = 'int'
+    KIND_PRESENT = 'present'
+
+    def __init__(
+        self,
+        associate_name: str,
+        group: str,
+        kind: str = KIND_TEXT,
+        reached_group: Optional[str] = None,
+    ) -> None:
+        self.associate_name = associate_name
+        self.group = group
+        self.kind = kind
+        self.reached_group = reached_group or group
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}('
+            f'associate_name={repr(self.associate_name)}, '
+            f'group={repr(self.group)})'
+        )
+
+    def value(self, text: Optional[str]) -> Any:
+        if self.kind == self.KIND_PRESENT:
+            return text is not None
+        if self.kind == self.KIND_INT:
+            return int(text)  # type: ignore
+        return text
+
+
+class RegexTemplate:
+    """Template translated to a compiled regular expression.
+
+    Captures are kept in group order, which is the order a context is filled
+    by `Matcher`, so later captures override earlier ones with the same name.
+    """
+
+    def __init__(self, pattern: Pattern, captures: List[RegexCapture]) -> None:
+        self.pattern = pattern
+        self.captures = captures
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(pattern={repr(self.pattern.pattern)})'
+
+    def match(self, message: str) -> Optional[dict]:
+        """Match the whole message. Return context or None."""
+        regex_match = self.pattern.fullmatch(message)
+        if regex_match is None:
+            return None
+
+        context = {}
+        for capture in self.captures:
+            if regex_match.start(capture.reached_group) == -1:
+                continue
+            context[capture.associate_name] = capture.value(
+                regex_match.group(capture.group)
+            )
+        return context
+
+
+class RegexCompiledTemplate(CompiledTemplate):
+    def __init__(
+        self,
+        template: str,
+        tokens: List[BaseToken],
+        regex_template: Optional[RegexTemplate],
+    ) -> None:
+        super().__init__(template=template, tokens=tokens)
+        self.regex_template = regex_template
+
+
+class RegexTranslator:
+    """Translate tokens of `DefaultTokenizer` to a regular expression.
+
+    `Matcher` never starts a token at the end of the message, so tokens that
+    can match the empty string are guarded by a lookahead. Custom tokens,
+    including subclasses of built-in tokens, have no translation and make
+    `translate` return None.
+    """
+
+    NOT_AT_END = '(?=.)'
+
+    def __init__(self) -> None:
+        self.captures: List[RegexCapture] = []
+        self.groups_count = 0
+
+    def translate(self, tokens: List[BaseToken]) -> Optional[RegexTemplate]:
+        self.captures = []
+        self.groups_count = 0
+        pattern = self.translate_tokens(tokens=tokens, capture=True)
+        if pattern is None:
+            return None
+        return RegexTemplate(
+            pattern=re.compile(pattern, re.DOTALL),
+            captures=self.captures,
+        )
+
+    def translate_tokens(
+        self,
+        tokens: List[BaseToken],
+        capture: bool,
+    ) -> Optional[str]:
+        parts = []
+        for token in tokens:
+            part = self.translate_token(token=token, capture=capture)
+            if part is None:
+                return None
+            parts.append(part)
+        return ''.join(parts)
+
+    def translate_token(self, token: BaseToken, capture: bool) -> Optional[str]:
+        # Nested names are visible only through named container tokens.
+        associate_name = token.associate_name if capture else None
+
+        if type(token) is CharToken:
+            pattern = re.escape(token.char)
+            if associate_name:
+                return self.capture(associate_name, pattern)
+            return pattern
+
+        if type(token) is LiteralToken:
+            pattern = re.escape(token.text)
+            if associate_name:
+                return self.capture(associate_name, pattern)
+            return pattern
+
+        if type(token) is AnyToken:
+            pattern = '.+?'
+            if associate_name:
+                return self.capture(associate_name, pattern)
+            return pattern
+
+        if type(token) is IntToken:
+            pattern = '[0-9]+'
+            if associate_name:
+                pattern = self.capture(associate_name, pattern, RegexCapture.KIND_INT)
+            return f'{pattern}(?![0-9])'
+
+        if type(token) is OptionalToken:
+            if associate_name:
+                reached_group = self.new_group()
+                present_group = self.new_group()
+                self.captures.append(
+                    RegexCapture(
+                        associate_name=associate_name,
+                        group=present_group,
+                        kind=RegexCapture.KIND_PRESENT,
+                        reached_group=reached_group,
+                    )
+                )
+                inner = self.translate_tokens(tokens=token.tokens, capture=True)
+                if inner is None:
+                    return None
+                return (
+                    f'{self.NOT_AT_END}(?P<{reached_group}>)'
+                    f'(?:(?P<{present_group}>{inner}))??'
+                )
+
+            inner = self.translate_tokens(tokens=token.tokens, capture=False)
+            if inner is None:
+                return None
+            return f'{self.NOT_AT_END}(?:{inner})??'
+
+        if type(token) is ChoiceToken:
+            if not token.choices:
+                return '(?!)'
+
+            group = None
+            if associate_name:
+                group = self.new_group()
+                self.captures.append(
+                    RegexCapture(
+                        associate_name=associate_name,
+                        group=group,
+                    )
+                )
+
+            alternatives = []
+            for choice in token.choices:
+                alternative = self.translate_tokens(
+                    tokens=choice,
+                    capture=bool(associate_name),
+                )
+                if alternative is None:
+                    return None
+                alternatives.append(alternative)
+
+            pattern = '|'.join(alternatives)
+            if group:
+                return f'{self.NOT_AT_END}(?P<{group}>{pattern})'
+            return f'{self.NOT_AT_END}(?:{pattern})'
+
+        return None
+
+    def new_group(self) -> str:
+        self.groups_count += 1
+        return f'g{self.groups_count}'
+
+    def capture(
+        self,
+        associate_name: str,
+        pattern: str,
+        kind: str = RegexCapture.KIND_TEXT,
+    ) -> str:
+        group = self.new_group()
+        self.captures.append(
+            RegexCapture(associate_name=associate_name, group=group, kind=kind)
+        )
+        return f'(?P<{group}>{pattern})'
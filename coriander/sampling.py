@@ -0,0 +1,117 @@
+import hashlib
+import random
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Sequence, TypeVar
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
+T = TypeVar('T')
+
+
+class BaseSampler(ABC):
+    """Source of random values drawn many at a time, for batch generation."""
+
+    @abstractmethod
+    def integers(self, low: int, high: int, count: int) -> List[int]:
+        """Return count integers drawn uniformly from low to high, exclusive."""
+
+    @abstractmethod
+    def choices(self, items: Sequence[T], count: int) -> List[T]:
+        """Return count items drawn uniformly with replacement."""
+
+    @abstractmethod
+    def text(self, alphabet: str, count: int) -> str:
+        """Return text of count characters drawn uniformly from alphabet."""
+
+
+class PythonSampler(BaseSampler):
+    """Sampler on `random.Random`, drawing ASCII text from random bytes."""
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.random = random.Random(seed)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}()'
+
+    def integers(self, low: int, high: int, count: int) -> List[int]:
+        return self.random.choices(range(low, high), k=count)
+
+    def choices(self, items: Sequence[T], count: int) -> List[T]:
+        return self.random.choices(items, k=count)
+
+    def text(self, alphabet: str, count: int) -> str:
+        if not _is_ascii(alphabet) or len(alphabet) > 256:
+            return ''.join(self.random.choices(alphabet, k=count))
+
+        # Bytes from `limit` on are dropped, so every character is as likely.
+        limit = 256 - 256 % len(alphabet)
+        table = bytes(
+            ord(alphabet[byte % len(alphabet)]) for byte in range(limit)
+        ) + bytes(256 - limit)
+        dropped = bytes(range(limit, 256))
+
+        chunks = []
+        missing = count
+        while missing > 0:
+            size = missing + missing // 8 + 8
+            data = self.random.getrandbits(size * 8).to_bytes(size, 'little')
+            chunk = data.translate(table, dropped)[:missing]
+            chunks.append(chunk)
+            missing -= len(chunk)
+        return b''.join(chunks).decode('ascii')
+
+
+class NumpySampler(BaseSampler):
+    """Sampler on a NumPy random generator, for large batches."""
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        if numpy is None:
+            raise RuntimeError('NumpySampler requires numpy')
+        self.generator = numpy.random.default_rng(seed)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}()'
+
+    def integers(self, low: int, high: int, count: int) -> List[int]:
+        return self.generator.integers(low, high, count).tolist()
+
+    def choices(self, items: Sequence[T], count: int) -> List[T]:
+        indexes = self.generator.integers(0, len(items), count)
+        objects = numpy.empty(len(items), dtype=object)
+        objects[:] = items
+        return objects[indexes].tolist()
+
+    def text(self, alphabet: str, count: int) -> str:
+        if not _is_ascii(alphabet):
+            return ''.join(self.choices(alphabet, count))
+
+        codes = numpy.frombuffer(alphabet.encode('ascii'), dtype=numpy.uint8)
+        indexes = self.generator.integers(0, len(codes), count)
+        return codes[indexes].tobytes().decode('ascii')
+
+
+def _is_ascii(text: str) -> bool:
+    return all(ord(char) < 128 for char in text)
+
+
+def stream_seed(seed: int, *keys: Any) -> int:
+    """Return seed of the random stream of seed named by keys.
+
+    Streams of different keys are independent, and seeds are the same on
+    every platform and Python version, unlike `hash`.
+    """
+    data = repr((seed,) + keys).encode()
+    return int.from_bytes(hashlib.sha256(data).digest()[:16], 'little')
+
+
+def create_sampler(seed: Optional[int] = None) -> BaseSampler:
+    """Return `NumpySampler` when numpy is installed, `PythonSampler` otherwise.
+
+    Samplers of the same seed and class draw the same values.
+    """
+    if numpy is not None:
+        return NumpySampler(seed)
+    return PythonSampler(seed)
@@ -1,7 +1,9 @@
 import string
-from typing import Iterable, List, Optional
+import time
+from typing import Dict, Iterable, List, Optional
 
-from coriander.core import BaseToken, BaseTokenFinder, BaseTokenizer
+from coriander.core import BaseToken, BaseTokenFinder, BaseTokenizer, TemplateScan
+from coriander.instrumentation import Instrumentation
 from coriander.tokens import (
     AnyTokenFinder,
     CharTokenFinder,
@@ -12,47 +14,102 @@ from coriander.tokens import (
 
 
 class Tokenizer(BaseTokenizer):
+    """Tokenizer reading a template once from left to right.
+
+    Finders are tried in order, but only the ones whose `start_chars` contain
+    the current char or are None. Nested templates of optional and choice
+    tokens are tokenized in place through `tokenize_at`.
+    """
+
     ASSOCIATE_NAME_CHAR = '~'
     ASSOCIATE_NAME_ALPHABET = set(string.ascii_letters) | {'_'}
 
     def __init__(
         self,
         token_finders: Iterable[BaseTokenFinder],
+        instrumentation: Optional[Instrumentation] = None,
     ) -> None:
-        self.token_finders = token_finders
+        self.token_finders = list(token_finders)
+        self.instrumentation = instrumentation
+        self._tokenize_depth = 0
+
+        self._any_char_finders: List[BaseTokenFinder] = []
+        self._finders_by_char: Dict[str, List[BaseTokenFinder]] = {}
+        for token_finder in self.token_finders:
+            start_chars = token_finder.start_chars()
+            if start_chars is None:
+                self._any_char_finders.append(token_finder)
+                for finders in self._finders_by_char.values():
+                    finders.append(token_finder)
+                continue
+            for char in start_chars:
+                if char not in self._finders_by_char:
+                    self._finders_by_char[char] = list(self._any_char_finders)
+                self._finders_by_char[char].append(token_finder)
 
     def tokenize(self, template: str) -> List[BaseToken]:
+        scan = TemplateScan(template)
+        if self.instrumentation is None:
+            return self.tokenize_at(scan=scan, start=0, end=len(template))
+
+        # Custom finders may tokenize nested templates; only the outer one is
+        # reported.
+        self._tokenize_depth += 1
+        started_at = time.perf_counter()
+        try:
+            tokens = self.tokenize_at(scan=scan, start=0, end=len(template))
+        finally:
+            self._tokenize_depth -= 1
+        if not self._tokenize_depth:
+            self.instrumentation.on_tokenize(
+                template=template,
+                seconds=time.perf_counter() - started_at,
+            )
+        return tokens
+
+    def tokenize_at(self, scan: TemplateScan, start: int, end: int) -> List[BaseToken]:
+        template = scan.template
         tokens = []
+        position = start
 
-        while template:
-            for token_finder in self.token_finders:
-                find_result = token_finder.find_in_template(
-                    template=template,
+        while position < end:
+            token_finders = self._finders_by_char.get(
+                template[position],
+                self._any_char_finders,
+            )
+            for token_finder in token_finders:
+                find_result = token_finder.find_in_template_at(
+                    scan=scan,
+                    start=position,
+                    end=end,
                     tokenizer=self,
                 )
                 if find_result:
-                    token = find_result.token
-                    end = find_result.end
-                    template = template[end:]
-
-                    if (
-                        len(template) > 1
-                        and template[0] == self.ASSOCIATE_NAME_CHAR
-                        and template[1] in self.ASSOCIATE_NAME_ALPHABET
-                    ):
-                        for i in range(1, len(template)):
-                            if template[i] not in self.ASSOCIATE_NAME_ALPHABET:
-                                associate_name = template[1:i]
-                                token.associate_name = associate_name
-                                template = template[i:]
-                                break
-                        else:
-                            associate_name = template[1:]
-                            token.associate_name = associate_name
-                            template = ''
-
-                    tokens.append(token)
                     break
+            else:
+                raise ValueError(
+                    f'No token finder matches template {repr(template[start:end])} '
+                    f'at {position - start}'
+                )
+
+            token = find_result.token
+            position = find_result.end
+
+            if (
+                position + 1 < end
+                and template[position] == self.ASSOCIATE_NAME_CHAR
+                and template[position + 1] in self.ASSOCIATE_NAME_ALPHABET
+            ):
+                name_end = position + 2
+                while (
+                    name_end < end
+                    and template[name_end] in self.ASSOCIATE_NAME_ALPHABET
+                ):
+                    name_end += 1
+                token.associate_name = template[position + 1 : name_end]
+                position = name_end
+
+            tokens.append(token)
 
         return tokens
 
@@ -61,6 +118,7 @@ class DefaultTokenizer(Tokenizer):
     def __init__(
         self,
         custom_token_finders: Optional[List[BaseTokenFinder]] = None,
+        instrumentation: Optional[Instrumentation] = None,
     ) -> None:
         if not custom_token_finders:
             custom_token_finders = []
@@ -74,4 +132,7 @@ class DefaultTokenizer(Tokenizer):
         ]
         token_finders = custom_token_finders + default_token_finders
 
-        super().__init__(token_finders=token_finders)
+        super().__init__(
+            token_finders=token_finders,
+            instrumentation=instrumentation,
+        )
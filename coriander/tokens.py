@@ -1,8 +1,8 @@
-import random
 import string
-from typing import Any, List, Optional
+from typing import Any, FrozenSet, Iterable, Iterator, List, Optional
 
 from coriander.core import (
+    EMPTY_CONTEXT,
     BaseGenerator,
     BaseMatcher,
     BaseToken,
@@ -10,31 +10,85 @@ from coriander.core import (
     BaseTokenizer,
     FindTokenInTemplateResult,
     MatchTokenWithMessageResult,
+    MatchTokenWithMessageSliceResult,
+    TemplateScan,
 )
+from coriander.tries import LiteralTrie
 
 
 class AnyToken(BaseToken):
+    """Token matching any non-empty text.
+
+    With `anchor`, the text the next token starts with, only ends where the
+    anchor occurs are returned, found by `str.find`. Other ends could not be
+    continued anyway. `coriander.optimization` sets anchors on compiled tokens.
+    """
+
+    # Generated text is 1 to GENERATE_MAX_LENGTH characters of GENERATE_ALPHABET.
+    GENERATE_ALPHABET = string.ascii_uppercase + string.digits
+    GENERATE_MAX_LENGTH = 10
+
+    anchor: Optional[str] = None
+
+    def __init__(self, anchor: Optional[str] = None) -> None:
+        self.anchor = anchor
+
     def __repr__(self) -> str:
-        return f'{self.__class__.__name__}()'
+        if self.anchor is None:
+            return f'{self.__class__.__name__}()'
+        return f'{self.__class__.__name__}(anchor={repr(self.anchor)})'
 
     def __eq__(self, other: Any) -> bool:
-        return isinstance(other, self.__class__)
+        return isinstance(other, self.__class__) and other.anchor == self.anchor
 
     def match_with_message(
         self,
         message: str,
         matcher: BaseMatcher,
     ) -> List[MatchTokenWithMessageResult]:
-        result = []
-        for end in range(1, len(message) + 1):
-            result.append(
-                MatchTokenWithMessageResult(
-                    value=message[:end],
-                    end=end,
-                    context={},
-                )
+        return self.match_with_message_at(message=message, start=0, matcher=matcher)
+
+    def match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        return [
+            MatchTokenWithMessageSliceResult(
+                message=message,
+                start=start,
+                end=end,
+                context={},
             )
-        return result
+            for end in self._ends(message, start)
+        ]
+
+    def iter_match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> Iterator[MatchTokenWithMessageResult]:
+        for end in self._ends(message, start):
+            yield MatchTokenWithMessageSliceResult(
+                message=message,
+                start=start,
+                end=end,
+                context={},
+            )
+
+    def _ends(self, message: str, start: int) -> Iterable[int]:
+        anchor = self.anchor
+        if anchor is None:
+            return range(start + 1, len(message) + 1)
+
+        ends = []
+        end = message.find(anchor, start + 1)
+        while end != -1:
+            ends.append(end)
+            end = message.find(anchor, end + 1)
+        return ends
 
     def generate_message(
         self,
@@ -45,23 +99,44 @@ class AnyToken(BaseToken):
         if value:
             return value
 
-        n = random.randint(1, 10)
-        alphabet = string.ascii_uppercase + string.digits
-        return ''.join(random.choice(alphabet) for _ in range(n))
+        n = generator.random.randint(1, self.GENERATE_MAX_LENGTH)
+        alphabet = self.GENERATE_ALPHABET
+        return ''.join(generator.random.choice(alphabet) for _ in range(n))
 
 
 class AnyTokenFinder(BaseTokenFinder):
+    CHAR = '*'
+
     @classmethod
     def find_in_template(
         cls,
         template: str,
         tokenizer: BaseTokenizer,
     ) -> Optional[FindTokenInTemplateResult]:
-        if template[0] == '*':
+        return cls.find_in_template_at(
+            scan=TemplateScan(template),
+            start=0,
+            end=len(template),
+            tokenizer=tokenizer,
+        )
+
+    @classmethod
+    def find_in_template_at(
+        cls,
+        scan: TemplateScan,
+        start: int,
+        end: int,
+        tokenizer: BaseTokenizer,
+    ) -> Optional[FindTokenInTemplateResult]:
+        if scan.template[start] == cls.CHAR:
             token = AnyToken()
-            return FindTokenInTemplateResult(token=token, end=1)
+            return FindTokenInTemplateResult(token=token, end=start + 1)
         return None
 
+    @classmethod
+    def start_chars(cls) -> Optional[FrozenSet[str]]:
+        return frozenset(cls.CHAR)
+
 
 class CharToken(BaseToken):
     def __init__(self, char: str) -> None:
@@ -78,8 +153,16 @@ class CharToken(BaseToken):
         message: str,
         matcher: BaseMatcher,
     ) -> List[MatchTokenWithMessageResult]:
-        if message[0] == self.char:
-            return [MatchTokenWithMessageResult(value=message[0], end=1)]
+        return self.match_with_message_at(message=message, start=0, matcher=matcher)
+
+    def match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        if message[start] == self.char:
+            return [MatchTokenWithMessageResult(value=self.char, end=start + 1)]
         return []
 
     def generate_message(
@@ -101,6 +184,60 @@ class CharTokenFinder(BaseTokenFinder):
         token = CharToken(char=template[0])
         return FindTokenInTemplateResult(token=token, end=1)
 
+    @classmethod
+    def find_in_template_at(
+        cls,
+        scan: TemplateScan,
+        start: int,
+        end: int,
+        tokenizer: BaseTokenizer,
+    ) -> Optional[FindTokenInTemplateResult]:
+        token = CharToken(char=scan.template[start])
+        return FindTokenInTemplateResult(token=token, end=start + 1)
+
+
+class LiteralToken(BaseToken):
+    """Run of characters matched at once. Made by `coalesce_literals`."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(text={repr(self.text)})'
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, self.__class__) and other.text == self.text
+
+    def match_with_message(
+        self,
+        message: str,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        return self.match_with_message_at(message=message, start=0, matcher=matcher)
+
+    def match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        if message.startswith(self.text, start):
+            return [
+                MatchTokenWithMessageResult(
+                    value=self.text,
+                    end=start + len(self.text),
+                )
+            ]
+        return []
+
+    def generate_message(
+        self,
+        generator: BaseGenerator,
+        value: Any,
+        context: dict,
+    ) -> str:
+        return self.text
+
 
 class OptionalToken(BaseToken):
     def __init__(self, tokens: List[BaseToken]) -> None:
@@ -117,11 +254,20 @@ class OptionalToken(BaseToken):
         message: str,
         matcher: BaseMatcher,
     ) -> List[MatchTokenWithMessageResult]:
-        match_tokens_with_message_results = matcher.match_with_tokens(
+        return self.match_with_message_at(message=message, start=0, matcher=matcher)
+
+    def match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        match_tokens_with_message_results = matcher.match_with_tokens_at(
             message=message,
+            start=start,
             tokens=self.tokens,
         )
-        return [MatchTokenWithMessageResult(end=0, value=False, context={})] + [
+        return [MatchTokenWithMessageResult(end=start, value=False, context={})] + [
             MatchTokenWithMessageResult(
                 end=r.end,
                 value=True,
@@ -130,6 +276,20 @@ class OptionalToken(BaseToken):
             for r in match_tokens_with_message_results
         ]
 
+    def iter_match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> Iterator[MatchTokenWithMessageResult]:
+        yield MatchTokenWithMessageResult(end=start, value=False, context={})
+        for r in matcher.iter_match_with_tokens_at(
+            message=message,
+            start=start,
+            tokens=self.tokens,
+        ):
+            yield MatchTokenWithMessageResult(end=r.end, value=True, context=r.context)
+
     def generate_message(
         self,
         generator: BaseGenerator,
@@ -145,7 +305,7 @@ class OptionalToken(BaseToken):
                     context=context,
                 )
         else:
-            if random.choice([True, False]):
+            if generator.random.choice([True, False]):
                 message = generator.generate_from_tokens(
                     tokens=self.tokens,
                     context=context,
@@ -164,29 +324,55 @@ class OptionalTokenFinder(BaseTokenFinder):
         template: str,
         tokenizer: BaseTokenizer,
     ) -> Optional[FindTokenInTemplateResult]:
+        return cls.find_in_template_at(
+            scan=TemplateScan(template),
+            start=0,
+            end=len(template),
+            tokenizer=tokenizer,
+        )
+
+    @classmethod
+    def find_in_template_at(
+        cls,
+        scan: TemplateScan,
+        start: int,
+        end: int,
+        tokenizer: BaseTokenizer,
+    ) -> Optional[FindTokenInTemplateResult]:
 
-        if template[0] != cls.CHAR_START:
+        if scan.template[start] != cls.CHAR_START:
             return None
 
-        depth = 1
-
-        for char_idx, char in enumerate(template[1:], start=1):
-            if char == cls.CHAR_FINISH:
-                depth -= 1
-                if depth == 0:
-                    template_part = template[1:char_idx]
-                    tokens = tokenizer.tokenize(template_part)
-                    return FindTokenInTemplateResult(
-                        token=OptionalToken(tokens=tokens),
-                        end=char_idx + 1,
-                    )
-            if char == cls.CHAR_START:
-                depth += 1
+        closing = scan.find_closing(
+            start=start,
+            end=end,
+            char_start=cls.CHAR_START,
+            char_finish=cls.CHAR_FINISH,
+        )
+        if closing is None:
+            return None
 
-        return None
+        tokens = tokenizer.tokenize_at(scan=scan, start=start + 1, end=closing)
+        return FindTokenInTemplateResult(
+            token=OptionalToken(tokens=tokens),
+            end=closing + 1,
+        )
+
+    @classmethod
+    def start_chars(cls) -> Optional[FrozenSet[str]]:
+        return frozenset(cls.CHAR_START)
 
 
 class ChoiceToken(BaseToken):
+    """Token matching any of its choices.
+
+    With `literal_trie`, a trie of the choices that all match literal text
+    only, the choices are matched by one walk of the trie instead of one
+    match per choice. `coriander.optimization` sets tries on compiled tokens.
+    """
+
+    literal_trie: Optional[LiteralTrie] = None
+
     def __init__(self, choices: List[List[BaseToken]]):
         self.choices = choices
 
@@ -201,26 +387,73 @@ class ChoiceToken(BaseToken):
         message: str,
         matcher: BaseMatcher,
     ) -> List[MatchTokenWithMessageResult]:
+        return self.match_with_message_at(message=message, start=0, matcher=matcher)
+
+    def match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        if self.literal_trie is not None:
+            return [
+                MatchTokenWithMessageSliceResult(
+                    message=message,
+                    start=start,
+                    end=end,
+                    context=EMPTY_CONTEXT,
+                )
+                for end in self.literal_trie.match_at(message, start)
+            ]
 
         variants = {}
 
         for index, choice in enumerate(self.choices):
-            match_tokens_with_message_results = matcher.match_with_tokens(
+            match_tokens_with_message_results = matcher.match_with_tokens_at(
                 message=message,
+                start=start,
                 tokens=choice,
             )
             variants[index] = match_tokens_with_message_results
 
         return [
-            MatchTokenWithMessageResult(
+            MatchTokenWithMessageSliceResult(
+                message=message,
+                start=start,
                 end=match_tokens_with_message_result.end,
-                value=message[: match_tokens_with_message_result.end],
                 context=match_tokens_with_message_result.context,
             )
             for key, match_tokens_with_message_results in variants.items()
             for match_tokens_with_message_result in match_tokens_with_message_results
         ]
 
+    def iter_match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: BaseMatcher,
+    ) -> Iterator[MatchTokenWithMessageResult]:
+        if self.literal_trie is not None:
+            yield from self.match_with_message_at(
+                message=message,
+                start=start,
+                matcher=matcher,
+            )
+            return
+
+        for choice in self.choices:
+            for r in matcher.iter_match_with_tokens_at(
+                message=message,
+                start=start,
+                tokens=choice,
+            ):
+                yield MatchTokenWithMessageSliceResult(
+                    message=message,
+                    start=start,
+                    end=r.end,
+                    context=r.context,
+                )
+
     def generate_message(
         self,
         generator: BaseGenerator,
@@ -233,7 +466,7 @@ class ChoiceToken(BaseToken):
         if not self.choices:
             return ''
 
-        choice = random.choice(self.choices)
+        choice = generator.random.choice(self.choices)
         message = generator.generate_from_tokens(tokens=choice, context=context)
         return message
 
@@ -249,40 +482,60 @@ class ChoiceTokenFinder(BaseTokenFinder):
         template: str,
         tokenizer: BaseTokenizer,
     ) -> Optional[FindTokenInTemplateResult]:
+        return cls.find_in_template_at(
+            scan=TemplateScan(template),
+            start=0,
+            end=len(template),
+            tokenizer=tokenizer,
+        )
+
+    @classmethod
+    def find_in_template_at(
+        cls,
+        scan: TemplateScan,
+        start: int,
+        end: int,
+        tokenizer: BaseTokenizer,
+    ) -> Optional[FindTokenInTemplateResult]:
+
+        if scan.template[start] != cls.CHAR_START:
+            return None
 
-        if template[0] != cls.CHAR_START:
+        closing = scan.find_closing(
+            start=start,
+            end=end,
+            char_start=cls.CHAR_START,
+            char_finish=cls.CHAR_FINISH,
+            char_separator=cls.CHAR_SEPARATOR,
+        )
+        if closing is None:
             return None
 
-        depth = 1
-        last_pos = 1
-        template_parts = []
-
-        for char_idx, char in enumerate(template[1:], start=1):
-            if char == cls.CHAR_SEPARATOR:
-                if depth == 1:
-                    template_parts.append(template[last_pos:char_idx])
-                    last_pos = char_idx + 1
-
-            if char == cls.CHAR_FINISH:
-                depth -= 1
-                if depth == 0:
-                    template_parts.append(template[last_pos:char_idx])
-                    choices = [
-                        tokenizer.tokenize(template_part)
-                        for template_part in template_parts
-                    ]
-                    return FindTokenInTemplateResult(
-                        token=ChoiceToken(choices=choices),
-                        end=char_idx + 1,
-                    )
-            if char == cls.CHAR_START:
-                depth += 1
+        separators = scan.find_separators(
+            start=start,
+            char_start=cls.CHAR_START,
+            char_finish=cls.CHAR_FINISH,
+            char_separator=cls.CHAR_SEPARATOR,
+        )
+        bounds = [start] + separators + [closing]
+        choices = [
+            tokenizer.tokenize_at(scan=scan, start=part_start + 1, end=part_end)
+            for part_start, part_end in zip(bounds, bounds[1:])
+        ]
+        return FindTokenInTemplateResult(
+            token=ChoiceToken(choices=choices),
+            end=closing + 1,
+        )
 
-        return None
+    @classmethod
+    def start_chars(cls) -> Optional[FrozenSet[str]]:
+        return frozenset(cls.CHAR_START)
 
 
 class IntToken(BaseToken):
     ALPHABET = set(map(str, range(10)))
+    # Generated numbers are 0 to GENERATE_MAX.
+    GENERATE_MAX = 100
 
     def __repr__(self) -> str:
         return 'IntToken()'
@@ -295,21 +548,25 @@ class IntToken(BaseToken):
         message: str,
         matcher: 'BaseMatcher',
     ) -> List[MatchTokenWithMessageResult]:
-        number_chars = []
-        for c in message:
-            if c in self.ALPHABET:
-                number_chars.append(c)
-            else:
-                break
-
-        if not number_chars:
+        return self.match_with_message_at(message=message, start=0, matcher=matcher)
+
+    def match_with_message_at(
+        self,
+        message: str,
+        start: int,
+        matcher: 'BaseMatcher',
+    ) -> List[MatchTokenWithMessageResult]:
+        end = start
+        while end < len(message) and message[end] in self.ALPHABET:
+            end += 1
+
+        if end == start:
             return []
 
-        number = ''.join(number_chars)
         return [
             MatchTokenWithMessageResult(
-                end=len(number),
-                value=int(number),
+                end=end,
+                value=int(message[start:end]),
                 context={},
             ),
         ]
@@ -322,16 +579,35 @@ class IntToken(BaseToken):
     ) -> str:
         if value is not None:
             return str(value)
-        return str(random.randint(0, 100))
+        return str(generator.random.randint(0, self.GENERATE_MAX))
 
 
 class IntTokenFinder(BaseTokenFinder):
+    KEYWORD = 'INT'
+
     def find_in_template(
         self, template: str, tokenizer: 'BaseTokenizer'
     ) -> Optional[FindTokenInTemplateResult]:
-        if template.startswith('INT'):
+        return self.find_in_template_at(
+            scan=TemplateScan(template),
+            start=0,
+            end=len(template),
+            tokenizer=tokenizer,
+        )
+
+    def find_in_template_at(
+        self,
+        scan: TemplateScan,
+        start: int,
+        end: int,
+        tokenizer: 'BaseTokenizer',
+    ) -> Optional[FindTokenInTemplateResult]:
+        if scan.template.startswith(self.KEYWORD, start, end):
             return FindTokenInTemplateResult(
                 token=IntToken(),
-                end=3,
+                end=start + len(self.KEYWORD),
             )
         return None
+
+    def start_chars(self) -> Optional[FrozenSet[str]]:
+        return frozenset(self.KEYWORD[0])
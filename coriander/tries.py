@@ -0,0 +1,76 @@
+import threading
+from typing import Dict, Iterable, List, Tuple
+from weakref import WeakValueDictionary
+
+
+class LiteralTrie:
+    """Trie of texts, matching every text at an offset of a message in one walk."""
+
+    def __init__(self, texts: Iterable[str]) -> None:
+        self.texts = tuple(texts)
+        self.transitions: List[Dict[str, int]] = [{}]
+        # Ids of texts ending at each state, in order of texts.
+        self.outputs: List[List[int]] = [[]]
+
+        for text_id, text in enumerate(self.texts):
+            state = 0
+            for char in text:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(text_id)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(texts={repr(list(self.texts))})'
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, LiteralTrie) and other.texts == self.texts
+
+    def __hash__(self) -> int:
+        return hash(self.texts)
+
+    def __reduce__(self) -> tuple:
+        # Unpickled tries are shared like the ones made by optimization.
+        return literal_trie, (self.texts,)
+
+    def match_at(self, message: str, start: int) -> List[int]:
+        """Return ends of texts occurring in message at start, in order of texts."""
+        transitions = self.transitions
+        outputs = self.outputs
+        matches: List[Tuple[int, int]] = []
+        state = 0
+        end = start
+
+        while True:
+            for text_id in outputs[state]:
+                matches.append((text_id, end))
+            if end == len(message):
+                break
+            next_state = transitions[state].get(message[end])
+            if next_state is None:
+                break
+            state = next_state
+            end += 1
+
+        if len(matches) > 1:
+            matches.sort()
+        return [end for _, end in matches]
+
+
+_tries: 'WeakValueDictionary[Tuple[str, ...], LiteralTrie]' = WeakValueDictionary()
+_tries_lock = threading.Lock()
+
+
+def literal_trie(texts: Iterable[str]) -> LiteralTrie:
+    """Return trie of texts, shared by everything using the same texts at once."""
+    key = tuple(texts)
+    with _tries_lock:
+        trie = _tries.get(key)
+        if trie is None:
+            trie = LiteralTrie(key)
+            _tries[key] = trie
+        return trie
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from coriander.aio import AsyncMatcher
+from coriander.core import MatchResult
+from coriander.matching import DefaultMatcher
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncMatcher:
+    def test_match(self):
+        async_matcher = AsyncMatcher(matcher=DefaultMatcher())
+
+        result = run(
+            async_matcher.match(
+                message='hi my name is Anise',
+                template='[hello|hi]~greeting my name is *~name',
+            )
+        )
+        async_matcher.close()
+
+        assert result == MatchResult(
+            success=True,
+            context={'greeting': 'hi', 'name': 'Anise'},
+        )
+
+    def test_match_many(self):
+        async_matcher = AsyncMatcher(matcher=DefaultMatcher())
+        messages = [f'{index} x' if index % 3 else 'no' for index in range(10)]
+
+        results = run(
+            async_matcher.match_many(
+                messages=messages,
+                template='INT *',
+                chunksize=3,
+            )
+        )
+        async_matcher.close()
+
+        assert [result.success for result in results] == [
+            message != 'no' for message in messages
+        ]
+
+    def test_match_many__empty(self):
+        async_matcher = AsyncMatcher(matcher=DefaultMatcher())
+
+        results = run(async_matcher.match_many(messages=[], template='*'))
+        async_matcher.close()
+
+        assert results == []
+
+    def test_match__timeout(self):
+        release = threading.Event()
+        matcher = mock.Mock()
+        matcher.match.side_effect = lambda message, template, **kwargs: release.wait()
+        async_matcher = AsyncMatcher(matcher=matcher, max_concurrency=1)
+
+        async def match_after_timeout():
+            with pytest.raises(asyncio.TimeoutError):
+                await async_matcher.match(message='a', template='a', timeout=0.01)
+            release.set()
+            return await async_matcher.match(message='b', template='b', timeout=1)
+
+        assert run(match_after_timeout()) is True
+        async_matcher.close()
+
+    def test_match__bounded_concurrency(self):
+        running = []
+        max_running = []
+        lock = threading.Lock()
+
+        def match(message, template):
+            with lock:
+                running.append(message)
+                max_running.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.remove(message)
+
+        matcher = mock.Mock()
+        matcher.match.side_effect = match
+        async_matcher = AsyncMatcher(matcher=matcher, max_concurrency=2)
+
+        async def match_all():
+            await asyncio.gather(
+                *[
+                    async_matcher.match(message=str(index), template='*')
+                    for index in range(8)
+                ]
+            )
+
+        run(match_all())
+        async_matcher.close()
+
+        assert matcher.match.call_count == 8
+        assert max(max_running) == 2
+
+    def test_match__cancelled_before_start(self):
+        release = threading.Event()
+        matcher = mock.Mock()
+        matcher.match.side_effect = lambda message, template: release.wait()
+        async_matcher = AsyncMatcher(matcher=matcher, max_concurrency=1)
+
+        async def cancel_waiting():
+            running = asyncio.ensure_future(
+                async_matcher.match(message='a', template='*')
+            )
+            waiting = asyncio.ensure_future(
+                async_matcher.match(message='b', template='*')
+            )
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            release.set()
+            await running
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+
+        run(cancel_waiting())
+        async_matcher.close()
+
+        assert matcher.match.call_args_list == [mock.call(message='a', template='*')]
+
+    def test_match__timeout_aborts_match(self):
+        matcher = DefaultMatcher()
+        async_matcher = AsyncMatcher(matcher=matcher, max_concurrency=1)
+
+        async def match_after_timeout():
+            with pytest.raises(asyncio.TimeoutError):
+                await async_matcher.match(
+                    message='a ' * 200,
+                    template='* * * * * x',
+                    timeout=0.01,
+                )
+            # The aborted match frees its slot, so this one does not wait.
+            return await async_matcher.match(message='a', template='a', timeout=1)
+
+        result = run(match_after_timeout())
+        async_matcher.close()
+
+        assert result.success
+
+    def test_match__max_steps(self):
+        async_matcher = AsyncMatcher(matcher=DefaultMatcher())
+
+        result = run(
+            async_matcher.match(message='a ' * 20, template='* * * x', max_steps=10)
+        )
+        async_matcher.close()
+
+        assert result.aborted
+        assert result.steps == 11
+
+    def test_match_many__max_steps(self):
+        async_matcher = AsyncMatcher(matcher=DefaultMatcher())
+
+        results = run(
+            async_matcher.match_many(
+                messages=['a b x', 'a ' * 20],
+                template='* * x',
+                max_steps=10,
+            )
+        )
+        async_matcher.close()
+
+        assert [result.aborted for result in results] == [False, True]
+        assert results[0].success
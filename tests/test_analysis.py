@@ -0,0 +1,150 @@
+from typing import List
+
+import pytest
+
+from coriander.analysis import AnalysisAborted, TemplateAnalysis, overlapping_intents
+from coriander.core import (
+    BaseMatcher,
+    BaseToken,
+    CompiledTemplate,
+    MatchTokenWithMessageResult,
+)
+from coriander.matching import DefaultMatcher, DefaultNFAMatcher
+from coriander.tokens import CharToken
+
+
+class DigitToken(BaseToken):
+    def match_with_message(
+        self,
+        message: str,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        if message[0].isdigit():
+            return [MatchTokenWithMessageResult(end=1, value=message[0])]
+        return []
+
+    def generate_message(self, generator, value, context) -> str:
+        return '0'
+
+
+def templates_of(compiled_templates: List[CompiledTemplate]) -> List[str]:
+    return [compiled_template.template for compiled_template in compiled_templates]
+
+
+class TestTemplateAnalysis:
+    def test_duplicates(self):
+        analysis = TemplateAnalysis(
+            DefaultMatcher(),
+            ['[hi|hello] *', 'hi *~name', 'bye', '[hello|hi] *', '(hi) bye'],
+        )
+
+        assert [templates_of(group) for group in analysis.duplicates()] == [
+            ['[hi|hello] *', '[hello|hi] *'],
+        ]
+
+    def test_duplicates__names_are_ignored(self):
+        analysis = TemplateAnalysis(DefaultMatcher(), ['INT~age', 'INT'])
+
+        assert [templates_of(group) for group in analysis.duplicates()] == [
+            ['INT~age', 'INT'],
+        ]
+
+    def test_subsumptions(self):
+        analysis = TemplateAnalysis(
+            DefaultMatcher(),
+            ['hi *', 'hi INT', '* *', 'bye'],
+        )
+
+        assert [templates_of(pair) for pair in analysis.subsumptions()] == [
+            ['hi *', '* *'],
+            ['hi INT', 'hi *'],
+            ['hi INT', '* *'],
+        ]
+
+    def test_subsumptions__int_is_maximal(self):
+        analysis = TemplateAnalysis(DefaultMatcher(), ['INT', '1', 'INT1'])
+
+        assert [templates_of(pair) for pair in analysis.subsumptions()] == [
+            ['1', 'INT'],
+        ]
+        assert templates_of(analysis.unmatchable()) == ['INT1']
+
+    def test_overlaps(self):
+        analysis = TemplateAnalysis(DefaultMatcher(), ['hi *', '* there', 'bye'])
+
+        assert [templates_of(pair) for pair in analysis.overlaps()] == [
+            ['hi *', '* there'],
+        ]
+
+    def test_minimized_templates(self):
+        analysis = TemplateAnalysis(
+            DefaultMatcher(),
+            ['hi INT', 'hi *', 'a', 'b', '[a|b]', '[b|a]', 'INT1'],
+        )
+
+        assert templates_of(analysis.minimized_templates()) == ['hi *', '[a|b]']
+
+    def test_minimized_templates__covered_by_several(self):
+        analysis = TemplateAnalysis(DefaultMatcher(), ['[a|b]', '[a|c]', '[b|d]'])
+
+        assert templates_of(analysis.minimized_templates()) == [
+            '[a|b]',
+            '[a|c]',
+            '[b|d]',
+        ]
+
+    def test_nfa_compiled_templates(self):
+        analysis = TemplateAnalysis(DefaultNFAMatcher(), ['hi *', 'hi there'])
+
+        assert [templates_of(pair) for pair in analysis.subsumptions()] == [
+            ['hi there', 'hi *'],
+        ]
+
+    def test_custom_token(self):
+        template = CompiledTemplate(
+            template='digit', tokens=[CharToken(char='a'), DigitToken()]
+        )
+        analysis = TemplateAnalysis(DefaultMatcher(), [template, 'a1', 'a*'])
+
+        assert [templates_of(pair) for pair in analysis.subsumptions()] == [
+            ['a1', 'a*'],
+        ]
+        assert analysis.minimized_templates() == [
+            template,
+            analysis.compiled_templates[2],
+        ]
+
+    def test_stars(self):
+        words = ['book', 'table', 'room', 'order', 'pizza', 'cancel']
+        templates = [f'* {first} * {second} *' for first in words for second in words]
+
+        analysis = TemplateAnalysis(DefaultMatcher(), templates + templates[:3])
+
+        assert len(analysis.duplicates()) == 3
+        assert analysis.subsumptions() == []
+        assert len(analysis.overlaps()) == 39 * 38 // 2
+        assert len(analysis.minimized_templates()) == 36
+
+    def test_max_states(self):
+        with pytest.raises(AnalysisAborted):
+            TemplateAnalysis(DefaultMatcher(), ['* a * b *', '* b * a *'], max_states=5)
+
+    def test_empty(self):
+        analysis = TemplateAnalysis(DefaultMatcher(), [])
+
+        assert analysis.duplicates() == []
+        assert analysis.minimized_templates() == []
+
+
+class TestOverlappingIntents:
+    def test_overlapping_intents(self):
+        intents = {
+            'greeting': ['[hello|hi]', 'good morning'],
+            'introduction': ['[hello|hi] my name is *'],
+            'any': ['hi *'],
+            'farewell': ['bye'],
+        }
+
+        assert overlapping_intents(DefaultMatcher(), intents) == [
+            ('introduction', 'any'),
+        ]
@@ -0,0 +1,187 @@
+import pickle
+import struct
+from typing import Optional
+from unittest import mock
+
+import pytest
+
+from coriander import __version__
+from coriander.bundles import FORMAT_VERSION, MAGIC, TemplateBundle
+from coriander.core import BaseTokenFinder, BaseTokenizer, FindTokenInTemplateResult
+from coriander.matching import DefaultMatcher, DefaultNFAMatcher, DefaultRegexMatcher
+from coriander.nfa import NFACompiledTemplate
+from coriander.tokens import IntToken
+
+
+class YearToken(IntToken):
+    def __repr__(self) -> str:
+        return 'YearToken()'
+
+
+class YearTokenFinder(BaseTokenFinder):
+    def find_in_template(
+        self,
+        template: str,
+        tokenizer: BaseTokenizer,
+    ) -> Optional[FindTokenInTemplateResult]:
+        if template.startswith('YEAR'):
+            return FindTokenInTemplateResult(token=YearToken(), end=4)
+        return None
+
+
+class TestTemplateBundle:
+    def test_compile(self):
+        matcher = DefaultMatcher()
+
+        bundle = TemplateBundle.compile(matcher, ['hi *~name', 'INT~age'])
+
+        assert len(bundle) == 2
+        assert list(bundle) == ['hi *~name', 'INT~age']
+        assert 'hi *~name' in bundle
+        assert bundle.optimize is True
+        assert matcher.template_cache.info().currsize == 0
+        assert bundle['INT~age'].tokens == matcher.compile('INT~age').tokens
+
+    def test_compiler(self):
+        bundle = TemplateBundle.compile(DefaultNFAMatcher(), ['hi *~name'])
+
+        loaded_bundle = TemplateBundle.loads(bundle.dumps())
+
+        assert bundle.compiler == 'coriander.matching.DefaultNFAMatcher'
+        assert loaded_bundle.compiler == bundle.compiler
+
+    def test_dumps_loads(self):
+        matcher = DefaultMatcher()
+        bundle = TemplateBundle.compile(matcher, ['[hello|hi]~greeting *~name'])
+
+        loaded_bundle = TemplateBundle.loads(bundle.dumps())
+
+        compiled_template = loaded_bundle['[hello|hi]~greeting *~name']
+        assert compiled_template.tokens == bundle[compiled_template.template].tokens
+        assert matcher.match('hi Anise', compiled_template).context == {
+            'greeting': 'hi',
+            'name': 'Anise',
+        }
+
+    def test_save_load(self, tmp_path):
+        path = str(tmp_path / 'templates.bundle')
+        matcher = DefaultNFAMatcher(optimize=False)
+        TemplateBundle.compile(matcher, ['INT~age years']).save(path)
+
+        loaded_bundle = TemplateBundle.load(path)
+
+        assert loaded_bundle.optimize is False
+        assert matcher.match('25 years', loaded_bundle['INT~age years']).context == {
+            'age': 25,
+        }
+
+    def test_save_load__custom_tokens(self, tmp_path):
+        path = str(tmp_path / 'templates.bundle')
+        matcher = DefaultMatcher(custom_token_finders=[YearTokenFinder()])
+        TemplateBundle.compile(matcher, ['born in YEAR~year']).save(path)
+
+        loaded_bundle = TemplateBundle.load(path)
+
+        compiled_template = loaded_bundle['born in YEAR~year']
+        assert isinstance(compiled_template.tokens[-1], YearToken)
+        assert matcher.match('born in 1990', compiled_template).context == {
+            'year': 1990,
+        }
+
+    def test_loads__lazy(self):
+        matcher = DefaultMatcher()
+        data = TemplateBundle.compile(matcher, ['hi *~name', 'INT~age']).dumps()
+
+        with mock.patch('pickle.loads', wraps=pickle.loads) as loads:
+            bundle = TemplateBundle.loads(data)
+            assert len(bundle) == 2
+            assert 'INT~age' in bundle
+            assert loads.call_count == 1
+
+            compiled_template = bundle['INT~age']
+            assert bundle['INT~age'] is compiled_template
+            assert loads.call_count == 2
+
+        assert compiled_template.tokens == matcher.compile('INT~age').tokens
+        assert bundle.dumps() == data
+
+    def test_pickle(self):
+        bundle = TemplateBundle.compile(DefaultMatcher(), ['hi *~name'])
+        loaded_bundle = TemplateBundle.loads(bundle.dumps())
+
+        unpickled_bundle = pickle.loads(pickle.dumps(loaded_bundle))
+
+        assert unpickled_bundle['hi *~name'].tokens == bundle['hi *~name'].tokens
+
+    def test_loads__not_a_bundle(self):
+        with pytest.raises(ValueError, match='wrong magic'):
+            TemplateBundle.loads(b'x' * 64)
+
+    def test_loads__too_short(self):
+        with pytest.raises(ValueError, match='too short'):
+            TemplateBundle.loads(MAGIC)
+
+    def test_loads__unsupported_format(self):
+        data = bytearray(TemplateBundle([]).dumps())
+        struct.pack_into('<H', data, len(MAGIC), FORMAT_VERSION + 1)
+
+        with pytest.raises(ValueError, match='Unsupported template bundle format'):
+            TemplateBundle.loads(bytes(data))
+
+    def test_loads__other_version(self):
+        data = (
+            TemplateBundle([])
+            .dumps()
+            .replace(
+                __version__.encode(),
+                b'9' * len(__version__),
+                1,
+            )
+        )
+
+        with pytest.raises(ValueError, match='rebuild the bundle'):
+            TemplateBundle.loads(data)
+
+
+class TestTemplateCompilerPrecompiledTemplates:
+    def test_compile(self, tmp_path):
+        path = str(tmp_path / 'templates.bundle')
+        TemplateBundle.compile(DefaultRegexMatcher(), ['hi *~name']).save(path)
+        matcher = DefaultRegexMatcher()
+        matcher.precompiled_templates = TemplateBundle.load(path)
+
+        with mock.patch.object(matcher, 'compile_template') as compile_template:
+            result = matcher.match(message='hi Anise', template='hi *~name')
+
+        assert result.context == {'name': 'Anise'}
+        assert 'hi *~name' in matcher.template_cache
+        compile_template.assert_not_called()
+
+    def test_compile__other_matcher(self):
+        bundle = TemplateBundle.compile(DefaultMatcher(), ['hi *~name'])
+        matcher = DefaultNFAMatcher()
+        matcher.precompiled_templates = TemplateBundle.loads(bundle.dumps())
+
+        with mock.patch.object(matcher, 'compile_template') as compile_template:
+            result = matcher.match(message='hi Anise', template='hi *~name')
+
+        assert result.context == {'name': 'Anise'}
+        assert isinstance(matcher.compile('hi *~name'), NFACompiledTemplate)
+        compile_template.assert_not_called()
+
+    def test_compile__other_optimize(self):
+        bundle = TemplateBundle.compile(DefaultMatcher(), ['hi *~name'])
+        matcher = DefaultMatcher(optimize=False)
+
+        with pytest.raises(ValueError):
+            matcher.precompiled_templates = bundle
+
+        assert matcher.precompiled_templates is None
+
+    def test_compile__missing_template(self):
+        matcher = DefaultMatcher()
+        matcher.precompiled_templates = TemplateBundle([])
+
+        result = matcher.match(message='hi Anise', template='hi *~name')
+
+        assert result.context == {'name': 'Anise'}
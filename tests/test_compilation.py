@@ -0,0 +1,106 @@
+import pickle
+from unittest import mock
+
+from coriander.compilation import CacheInfo, TemplateCache, TemplateCompiler
+from coriander.core import CompiledTemplate
+from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import AnyToken, CharToken
+
+
+class TestTemplateCache:
+    def test_get__miss(self):
+        cache = TemplateCache(maxsize=2)
+
+        assert cache.get('hello') is None
+        assert cache.info() == CacheInfo(hits=0, misses=1, maxsize=2, currsize=0)
+
+    def test_get__hit(self):
+        cache = TemplateCache(maxsize=2)
+        compiled_template = CompiledTemplate(template='hi', tokens=[])
+        cache.set('hi', compiled_template)
+
+        assert cache.get('hi') is compiled_template
+        assert cache.info() == CacheInfo(hits=1, misses=0, maxsize=2, currsize=1)
+
+    def test_set__evicts_least_recently_used(self):
+        cache = TemplateCache(maxsize=2)
+        cache.set('a', CompiledTemplate(template='a', tokens=[]))
+        cache.set('b', CompiledTemplate(template='b', tokens=[]))
+        cache.get('a')
+
+        cache.set('c', CompiledTemplate(template='c', tokens=[]))
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+        assert len(cache) == 2
+
+    def test_set__disabled(self):
+        cache = TemplateCache(maxsize=0)
+
+        cache.set('a', CompiledTemplate(template='a', tokens=[]))
+
+        assert len(cache) == 0
+
+    def test_set__unbounded(self):
+        cache = TemplateCache(maxsize=None)
+
+        for i in range(1000):
+            cache.set(str(i), CompiledTemplate(template=str(i), tokens=[]))
+
+        assert len(cache) == 1000
+
+    def test_clear(self):
+        cache = TemplateCache(maxsize=2)
+        cache.set('a', CompiledTemplate(template='a', tokens=[]))
+        cache.get('a')
+
+        cache.clear()
+
+        assert cache.info() == CacheInfo(hits=0, misses=0, maxsize=2, currsize=0)
+
+    def test_pickle(self):
+        cache = TemplateCache(maxsize=2)
+        cache.set('a', CompiledTemplate(template='a', tokens=[]))
+
+        restored_cache = pickle.loads(pickle.dumps(cache))
+
+        assert 'a' in restored_cache
+        assert restored_cache.get('a').template == 'a'
+
+
+class TestTemplateCompiler:
+    def test_compile(self):
+        compiler = TemplateCompiler(tokenizer=DefaultTokenizer())
+
+        compiled_template = compiler.compile('*o')
+
+        assert compiled_template.template == '*o'
+        assert compiled_template.tokens == [AnyToken(anchor='o'), CharToken(char='o')]
+
+    def test_compile__tokenize_once(self):
+        tokenizer = mock.Mock(wraps=DefaultTokenizer())
+        compiler = TemplateCompiler(tokenizer=tokenizer)
+
+        first = compiler.compile('hello')
+        second = compiler.compile('hello')
+
+        assert first is second
+        assert tokenizer.tokenize.call_count == 1
+        assert compiler.template_cache.info().hits == 1
+        assert compiler.template_cache.info().misses == 1
+
+    def test_compile__compiled_template(self):
+        compiler = TemplateCompiler(tokenizer=DefaultTokenizer())
+        compiled_template = CompiledTemplate(template='a', tokens=[])
+
+        assert compiler.compile(compiled_template) is compiled_template
+
+    def test_compile__without_cache(self):
+        tokenizer = mock.Mock(wraps=DefaultTokenizer())
+        compiler = TemplateCompiler(tokenizer=tokenizer, cache_size=0)
+
+        compiler.compile('hello')
+        compiler.compile('hello')
+
+        assert tokenizer.tokenize.call_count == 2
@@ -0,0 +1,153 @@
+import pickle
+
+import pytest
+
+from coriander.core import (
+    EMPTY_CONTEXT,
+    MatchContext,
+    MatchResult,
+    MatchTokensWithMessageResult,
+    MatchTokenWithMessageResult,
+    MatchTokenWithMessageSliceResult,
+    TemplateScan,
+)
+
+
+class TestMatchContext:
+    def test_mapping(self):
+        context = MatchContext({'name': 'Anise', 'age': 25})
+
+        assert context['name'] == 'Anise'
+        assert 'age' in context
+        assert len(context) == 2
+        assert dict(context) == {'name': 'Anise', 'age': 25}
+        assert context == {'age': 25, 'name': 'Anise'}
+        assert {'age': 25, 'name': 'Anise'} == context
+        assert context != {'name': 'Anise'}
+
+    def test_immutable(self):
+        context = MatchContext({'name': 'Anise'})
+
+        with pytest.raises(TypeError):
+            context['name'] = 'Millet'  # type: ignore
+
+    def test_hash(self):
+        first_context = MatchContext({'name': 'Anise', 'age': 25})
+        second_context = MatchContext({'age': 25, 'name': 'Anise'})
+
+        assert hash(first_context) == hash(second_context)
+        assert len({first_context, second_context}) == 1
+
+    def test_hash__unhashable_value(self):
+        context = MatchContext({'names': ['Anise']})
+
+        assert hash(context) == hash(MatchContext({'names': ['Anise']}))
+
+    def test_coerce(self):
+        context = MatchContext({'name': 'Anise'})
+
+        assert MatchContext.coerce(context) is context
+        assert MatchContext.coerce({}) is EMPTY_CONTEXT
+        assert MatchContext.coerce(None) is EMPTY_CONTEXT
+        assert MatchContext.coerce({'name': 'Anise'}) == context
+
+    def test_merged(self):
+        context = MatchContext({'name': 'Anise', 'age': 25})
+
+        merged_context = context.merged({'name': 'Millet'})
+
+        assert merged_context == {'name': 'Millet', 'age': 25}
+        assert context == {'name': 'Anise', 'age': 25}
+        assert context.merged({}) is context
+        assert EMPTY_CONTEXT.merged(context) is context
+
+    def test_pickle(self):
+        context = MatchContext({'name': 'Anise'})
+
+        assert pickle.loads(pickle.dumps(context)) == context
+
+
+class TestMatchTokenWithMessageResult:
+    def test_eq(self):
+        result = MatchTokenWithMessageResult(end=1, value='a', context={'x': 'a'})
+        equal_result = MatchTokenWithMessageResult(end=1, value='a', context={'x': 'a'})
+        other_result = MatchTokenWithMessageResult(end=2, value='a', context={'x': 'a'})
+
+        assert result == equal_result
+        assert result != other_result
+        assert len({result, equal_result, other_result}) == 2
+
+    def test_slots(self):
+        result = MatchTokenWithMessageResult(end=1)
+
+        assert not hasattr(result, '__dict__')
+
+    def test_slice_result(self):
+        result = MatchTokenWithMessageSliceResult(message='hello', start=1, end=3)
+
+        assert result.value == 'el'
+        assert result == MatchTokenWithMessageResult(end=3, value='el')
+        assert not hasattr(result, '__dict__')
+
+
+class TestMatchTokensWithMessageResult:
+    def test_eq(self):
+        first_result = MatchTokensWithMessageResult(end=1, context={'x': 'a'})
+        second_result = MatchTokensWithMessageResult(end=1, context={'x': 'a'})
+
+        assert first_result == second_result
+        assert len({first_result, second_result}) == 1
+        assert first_result.context == {'x': 'a'}
+
+
+class TestMatchResult:
+    def test_eq(self):
+        result = MatchResult(success=True, context={'x': 'a'})
+
+        assert result == MatchResult(success=True, context={'x': 'a'})
+        assert result != MatchResult(success=False, context={})
+        assert hash(result) == hash(MatchResult(success=True, context={'x': 'a'}))
+        assert pickle.loads(pickle.dumps(result)) == result
+
+    def test_eq__aborted(self):
+        result = MatchResult(success=False, context={}, aborted=True, steps=10)
+
+        assert result != MatchResult(success=False, context={})
+        assert result == MatchResult(success=False, context={}, aborted=True, steps=7)
+        assert not result
+        assert repr(result) == 'MatchResult(aborted=True, steps=10)'
+        assert pickle.loads(pickle.dumps(result)).steps == 10
+
+
+class TestTemplateScan:
+    def test_find_closing(self):
+        scan = TemplateScan('(a(b)c)(d')
+
+        assert scan.find_closing(0, 9, char_start='(', char_finish=')') == 6
+        assert scan.find_closing(2, 9, char_start='(', char_finish=')') == 4
+        assert scan.find_closing(7, 9, char_start='(', char_finish=')') is None
+
+    def test_find_closing__after_end(self):
+        scan = TemplateScan('[a(b]c)')
+
+        assert scan.find_closing(2, 4, char_start='(', char_finish=')') is None
+        assert scan.find_closing(2, 7, char_start='(', char_finish=')') == 6
+
+    def test_find_separators(self):
+        scan = TemplateScan('[a|[b|c]|d]')
+
+        separators = scan.find_separators(
+            start=0,
+            char_start='[',
+            char_finish=']',
+            char_separator='|',
+        )
+        nested_separators = scan.find_separators(
+            start=3,
+            char_start='[',
+            char_finish=']',
+            char_separator='|',
+        )
+
+        assert separators == [2, 8]
+        assert nested_separators == [5]
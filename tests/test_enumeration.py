@@ -0,0 +1,101 @@
+import pytest
+
+from coriander.generation import DefaultGenerator
+from coriander.matching import DefaultMatcher
+
+
+class TestMessageSpace:
+    def test_iterate(self):
+        generator = DefaultGenerator()
+
+        space = generator.message_space('[hi|hello] (dear )friend')
+
+        assert space.count == 4
+        assert list(space) == [
+            'hi friend',
+            'hi dear friend',
+            'hello friend',
+            'hello dear friend',
+        ]
+
+    def test_iterate__offset_limit(self):
+        generator = DefaultGenerator()
+        space = generator.message_space('[a|b[c|d]](e)INT', int_values=[1, 2])
+        messages = list(space)
+
+        for offset in range(space.count + 1):
+            for limit in [None, 0, 1, 5]:
+                stop = None if limit is None else offset + limit
+                assert list(space.iterate(offset, limit)) == messages[offset:stop]
+
+    def test_iterate__negative_offset(self):
+        generator = DefaultGenerator()
+        space = generator.message_space('[a|b]')
+
+        with pytest.raises(ValueError):
+            list(space.iterate(offset=-1))
+
+    def test_getitem(self):
+        generator = DefaultGenerator()
+        space = generator.message_space('[a|b]~x [c|d|e]')
+
+        assert [space[index] for index in range(space.count)] == list(space)
+        assert space[-1] == 'b e'
+        with pytest.raises(IndexError):
+            space[6]
+
+    def test_values(self):
+        generator = DefaultGenerator()
+
+        space = generator.message_space(
+            '[hi|hey]~greeting (dear )~dear*~name, INT~age *',
+            values={
+                'greeting': ['yo'],
+                'dear': [True],
+                'name': ['Anise', 'Millet'],
+                'age': [3],
+            },
+            any_values=['!'],
+        )
+
+        assert list(space) == ['yo dear Anise, 3 !', 'yo dear Millet, 3 !']
+
+    def test_values__missing(self):
+        generator = DefaultGenerator()
+
+        with pytest.raises(ValueError):
+            generator.message_space('hello *~name')
+
+        with pytest.raises(ValueError):
+            generator.message_space('INT years')
+
+    def test_values__empty(self):
+        generator = DefaultGenerator()
+
+        space = generator.message_space('[a|b] *', any_values=[])
+
+        assert space.count == 0
+        assert list(space) == []
+
+    def test_count__large(self):
+        generator = DefaultGenerator()
+
+        space = generator.message_space(' '.join(['[a|b|c]'] * 60))
+
+        assert space.count == 3 ** 60
+        assert space[-1] == ' '.join(['c'] * 60)
+        assert list(space.iterate(offset=space.count - 1)) == [space[-1]]
+
+    def test_messages_match_template(self):
+        generator = DefaultGenerator()
+        matcher = DefaultMatcher()
+        template = '[hello|hi|good [morning|evening]]~greeting (dear )*~name INT'
+
+        space = generator.message_space(
+            template,
+            any_values=['Anise', 'Millet'],
+            int_values=[1, 22],
+        )
+
+        assert space.count == 32
+        assert all(matcher.match(message, template) for message in space)
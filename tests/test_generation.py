@@ -1,9 +1,31 @@
+import random
+import re
 from typing import Optional
+from unittest import mock
+
+import pytest
 
 from coriander.core import BaseTokenFinder, BaseTokenizer, FindTokenInTemplateResult
 from coriander.generation import DefaultGenerator, Generator
+from coriander.sampling import PythonSampler
 from coriander.tokenizers import DefaultTokenizer
-from coriander.tokens import AnyToken
+from coriander.tokens import AnyToken, CharToken
+
+
+class ColorToken(CharToken):
+    def generate_message(self, generator, value, context) -> str:
+        return value or generator.random.choice(['red', 'green', 'blue'])
+
+
+class ColorTokenFinder(BaseTokenFinder):
+    def find_in_template(
+        self,
+        template: str,
+        tokenizer: 'BaseTokenizer',
+    ) -> Optional[FindTokenInTemplateResult]:
+        if not template.startswith('COLOR'):
+            return None
+        return FindTokenInTemplateResult(token=ColorToken('C'), end=5)
 
 
 class TestGenerator:
@@ -65,6 +87,232 @@ class TestGenerator:
 
         assert message == '25 years old'
 
+    def test_generate__compiled_template(self):
+        tokenizer = mock.Mock(wraps=DefaultTokenizer())
+        generator = Generator(tokenizer=tokenizer)
+        compiled_template = generator.compile('INT~age years old')
+
+        first_message = generator.generate(compiled_template, context={'age': 25})
+        second_message = generator.generate('INT~age years old', context={'age': 3})
+
+        assert first_message == '25 years old'
+        assert second_message == '3 years old'
+        assert tokenizer.tokenize.call_count == 1
+
+
+class TestGeneratorRandom:
+    def test_generate__seed(self):
+        first_generator = DefaultGenerator(seed=3)
+        second_generator = DefaultGenerator(seed=3)
+        template = '[a|b](c)* INT'
+
+        first_messages = [first_generator.generate(template) for _ in range(20)]
+        second_messages = [second_generator.generate(template) for _ in range(20)]
+
+        assert first_messages == second_messages
+        assert len(set(first_messages)) > 1
+
+    def test_generate__rng(self):
+        rng = mock.Mock(wraps=random.Random(1))
+        generator = DefaultGenerator(rng=rng)
+
+        generator.generate('[a|b]')
+
+        rng.choice.assert_called_once()
+
+    def test_generate__seed_and_rng(self):
+        with pytest.raises(ValueError):
+            DefaultGenerator(seed=1, rng=random.Random(1))
+
+    def test_split(self):
+        template = '* INT'
+
+        generators = DefaultGenerator(seed=5).split(3)
+        other_generators = DefaultGenerator(seed=5).split(2)
+
+        messages = [
+            [generator.generate(template) for _ in range(10)]
+            for generator in generators
+        ]
+        other_messages = [
+            [generator.generate(template) for _ in range(10)]
+            for generator in other_generators
+        ]
+        assert messages[:2] == other_messages
+        assert len({tuple(stream) for stream in messages}) == 3
+
+    def test_split__without_seed(self):
+        generator = DefaultGenerator(rng=random.Random(7))
+
+        generators = generator.split(2)
+
+        assert all(isinstance(stream.seed, int) for stream in generators)
+        assert generators[0].seed != generators[1].seed
+        assert generators[0].template_cache is generator.template_cache
+
+
+class TestGeneratorGenerateMany:
+    def test_generate_many(self):
+        generator = DefaultGenerator()
+        template = '[hello|hi|good [morning|evening]] (dear )*, I am INT'
+
+        messages = generator.generate_many(template, n=200, seed=1)
+
+        assert len(messages) == 200
+        pattern = re.compile(
+            r'(hello|hi|good (morning|evening)) (dear )?[A-Z0-9]{1,10}, I am \d+'
+        )
+        assert all(pattern.fullmatch(message) for message in messages)
+        assert len(set(messages)) > 100
+
+    def test_generate_many__seed(self):
+        generator = DefaultGenerator()
+
+        first_messages = generator.generate_many('[a|b](c)*INT', n=20, seed=7)
+        second_messages = generator.generate_many('[a|b](c)*INT', n=20, seed=7)
+
+        assert first_messages == second_messages
+
+    def test_generate_many__seeded_generator(self):
+        first_messages = DefaultGenerator(seed=2).generate_many('*', n=5)
+        second_messages = DefaultGenerator(seed=2).generate_many('*', n=5)
+
+        assert first_messages == second_messages
+
+    def test_generate_many__chunks(self):
+        generator = DefaultGenerator()
+
+        messages = generator.generate_many('* INT', n=25, seed=1, chunksize=10)
+        chunk_messages = generator.generate_chunk(
+            '* INT',
+            start=10,
+            count=10,
+            contexts=None,
+            seed=1,
+        )
+
+        assert chunk_messages == messages[10:20]
+
+    def test_generate_many__processes(self):
+        generator = DefaultGenerator()
+        template = '[hi|hey] (dear )*~name'
+        contexts = [{'name': str(index)} if index % 3 else {} for index in range(50)]
+
+        messages = generator.generate_many(
+            template,
+            n=50,
+            contexts=contexts,
+            seed=4,
+            chunksize=8,
+        )
+        for processes in [1, 3]:
+            assert (
+                generator.generate_many(
+                    template,
+                    n=50,
+                    contexts=contexts,
+                    seed=4,
+                    processes=processes,
+                    chunksize=8,
+                )
+                == messages
+            )
+
+    def test_generate_many__contexts(self):
+        generator = DefaultGenerator()
+        template = '[hi|hey]~greeting (dear )~dear*~name INT~age'
+
+        messages = generator.generate_many(
+            template,
+            n=3,
+            contexts=[
+                {'greeting': 'yo', 'dear': True, 'name': 'Anise', 'age': 3},
+                {'dear': False, 'name': '', 'age': 0},
+                {},
+            ],
+            seed=1,
+        )
+
+        assert messages[0] == 'yo dear Anise 3'
+        assert re.fullmatch(r'(hi|hey) [A-Z0-9]{1,10} 0', messages[1])
+        assert re.fullmatch(r'(hi|hey) (dear )?[A-Z0-9]{1,10} \d+', messages[2])
+
+    def test_generate_many__contexts_count(self):
+        generator = DefaultGenerator()
+
+        with pytest.raises(ValueError):
+            generator.generate_many('*', n=2, contexts=[{}])
+
+    def test_generate_many__empty(self):
+        generator = DefaultGenerator()
+
+        assert generator.generate_many('', n=2) == ['', '']
+        assert generator.generate_many('*', n=0) == []
+
+    def test_generate_many__custom_token(self):
+        class DotToken(CharToken):
+            def generate_message(self, generator, value, context) -> str:
+                return value or '.'
+
+        class DotTokenFinder(BaseTokenFinder):
+            def find_in_template(
+                self,
+                template: str,
+                tokenizer: 'BaseTokenizer',
+            ) -> Optional[FindTokenInTemplateResult]:
+                if template[0] != '.':
+                    return None
+                return FindTokenInTemplateResult(token=DotToken('.'), end=1)
+
+        generator = DefaultGenerator(custom_token_finders=[DotTokenFinder()])
+
+        messages = generator.generate_many(
+            'a.~dot',
+            n=2,
+            contexts=[{'dot': '!'}, {}],
+        )
+
+        assert messages == ['a!', 'a.']
+
+    def test_generate_many__custom_token_seed(self):
+        generator = DefaultGenerator(seed=3, custom_token_finders=[ColorTokenFinder()])
+
+        messages = generator.generate_many('COLOR', n=40, seed=7, chunksize=10)
+
+        assert generator.generate_many('COLOR', n=40, seed=7, chunksize=10) == messages
+        assert messages[:10] != messages[10:20]
+        for processes in [2, 4]:
+            assert (
+                generator.generate_many(
+                    'COLOR',
+                    n=40,
+                    seed=7,
+                    chunksize=10,
+                    processes=processes,
+                )
+                == messages
+            )
+
+    def test_generate_many_from_tokens(self):
+        generator = DefaultGenerator()
+        tokens = generator.compile('(a)[b|c]').tokens
+
+        first_messages = generator.generate_many_from_tokens(
+            tokens=tokens,
+            count=50,
+            contexts=None,
+            sampler=PythonSampler(seed=3),
+        )
+        second_messages = generator.generate_many_from_tokens(
+            tokens=tokens,
+            count=50,
+            contexts=None,
+            sampler=PythonSampler(seed=3),
+        )
+
+        assert first_messages == second_messages
+        assert set(first_messages) == {'b', 'c', 'ab', 'ac'}
+
 
 class TestDefaultGenerator:
     def test_generate(self):
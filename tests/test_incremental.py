@@ -0,0 +1,153 @@
+from typing import List
+
+from coriander.core import (
+    BaseMatcher,
+    BaseToken,
+    CompiledTemplate,
+    MatchTokenWithMessageResult,
+)
+from coriander.incremental import IncrementalMatcher
+from coriander.matching import DefaultMatcher, DefaultNFAMatcher
+from coriander.tokens import CharToken
+
+
+class DigitToken(BaseToken):
+    def match_with_message(
+        self,
+        message: str,
+        matcher: BaseMatcher,
+    ) -> List[MatchTokenWithMessageResult]:
+        if message[0].isdigit():
+            return [MatchTokenWithMessageResult(end=1, value=message[0])]
+        return []
+
+    def generate_message(self, generator, value, context) -> str:
+        return '0'
+
+
+class TestIncrementalMatcher:
+    def test_compiled_templates(self):
+        matcher = DefaultMatcher()
+
+        incremental_matcher = IncrementalMatcher(matcher, ['hi *', 'bye'])
+
+        assert [t.template for t in incremental_matcher.compiled_templates] == [
+            'hi *',
+            'bye',
+        ]
+
+    def test_nfa_compiled_templates(self):
+        incremental_matcher = IncrementalMatcher(DefaultNFAMatcher(), ['hi *'])
+        session = incremental_matcher.session()
+
+        session.append('hi there')
+
+        assert session.matched
+
+    def test_sessions_share_dfa(self):
+        incremental_matcher = IncrementalMatcher(DefaultMatcher(), ['* bye'])
+        session = incremental_matcher.session()
+        session.append('so bye')
+        states_count = len(incremental_matcher.nfa._dfa_states)
+
+        other_session = incremental_matcher.session()
+        other_session.append('so bye')
+
+        assert other_session.matched
+        assert len(incremental_matcher.nfa._dfa_states) == states_count
+
+
+class TestIncrementalMatchSession:
+    def test_append(self):
+        session = IncrementalMatcher(DefaultMatcher(), ['hi *']).session()
+
+        session.append('h')
+        session.append('i ')
+        session.append('there')
+
+        assert session.message == 'hi there'
+        assert session.matched
+        assert session.viable
+
+    def test_viable(self):
+        session = IncrementalMatcher(DefaultMatcher(), ['hi INT']).session()
+
+        assert session.viable
+        session.append('hi ')
+        assert session.viable
+        assert not session.matched
+        session.append('4')
+        assert session.matched
+        session.append('x')
+        assert not session.viable
+        assert not session.matched
+
+    def test_viable__empty(self):
+        session = IncrementalMatcher(DefaultMatcher(), []).session()
+
+        assert not session.viable
+        assert not session.matched
+
+    def test_viable_templates(self):
+        session = IncrementalMatcher(
+            DefaultMatcher(), ['hi *', 'hello *', 'INT1', 'bye']
+        ).session()
+
+        assert [t.template for t in session.viable_templates()] == [
+            'hi *',
+            'hello *',
+            'bye',
+        ]
+        session.append('h')
+        assert [t.template for t in session.viable_templates()] == [
+            'hi *',
+            'hello *',
+        ]
+        session.append('el')
+        assert [t.template for t in session.viable_templates()] == ['hello *']
+
+    def test_matched_templates(self):
+        session = IncrementalMatcher(
+            DefaultMatcher(), ['* bye', 'so *', 'so']
+        ).session()
+
+        session.append('so bye')
+
+        assert [t.template for t in session.matched_templates()] == [
+            '* bye',
+            'so *',
+        ]
+
+    def test_match_results(self):
+        session = IncrementalMatcher(
+            DefaultMatcher(), ['*~name bye', 'INT~count']
+        ).session()
+
+        session.append('Anise bye')
+
+        assert [
+            (template.template, result.context)
+            for template, result in session.match_results()
+        ] == [('*~name bye', {'name': 'Anise'})]
+
+    def test_custom_token(self):
+        template = CompiledTemplate(
+            template='digit', tokens=[CharToken(char='a'), DigitToken()]
+        )
+        session = IncrementalMatcher(DefaultMatcher(), [template, 'b']).session()
+
+        session.append('a')
+        assert session.viable_templates() == [template]
+        assert not session.matched
+        session.append('1')
+        assert session.matched_templates() == [template]
+
+    def test_reset(self):
+        session = IncrementalMatcher(DefaultMatcher(), ['hi']).session()
+        session.append('bye')
+
+        session.reset()
+        session.append('hi')
+
+        assert session.message == 'hi'
+        assert session.matched
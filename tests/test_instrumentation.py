@@ -0,0 +1,128 @@
+from unittest import mock
+
+from coriander.instrumentation import Instrumentation, MatchStats
+from coriander.matching import (
+    DefaultMatcher,
+    DefaultMemoizedMatcher,
+    DefaultNFAMatcher,
+    Matcher,
+)
+from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import AnyToken, CharToken, ChoiceToken, IntToken
+
+
+class TestMatchStats:
+    def test_match(self):
+        stats = MatchStats()
+        matcher = DefaultMatcher(instrumentation=stats)
+
+        matcher.match(message='hi Anise', template='[hello|hi]~greeting *~name')
+        matcher.match(message='bye Anise', template='[hello|hi]~greeting *~name')
+
+        template_stats = stats['[hello|hi]~greeting *~name']
+        assert len(stats) == 1
+        assert template_stats.tokenize_count == 1
+        assert template_stats.tokenize_time > 0
+        assert template_stats.match_count == 2
+        assert template_stats.success_count == 1
+        assert template_stats.match_time > 0
+        # 'bye Anise' can not start the template, so it costs no token calls.
+        assert template_stats.token_calls == {
+            'ChoiceToken': 1,
+            'CharToken': 1,
+            'AnyToken': 1,
+        }
+        assert template_stats.variants_count == 7
+        assert template_stats.max_depth == 2
+
+    def test_match__backtracking_template_stands_out(self):
+        stats = MatchStats()
+        matcher = DefaultMatcher(instrumentation=stats)
+
+        matcher.match(message='a ' * 8, template='* * * x')
+        matcher.match(message='a ' * 8, template='a *')
+
+        most_expensive = stats.most_expensive(count=1, key='variants_count')
+        assert [s.template for s in most_expensive] == ['* * * x']
+
+    def test_match__max_token_calls(self):
+        stats = MatchStats()
+        matcher = DefaultMatcher(instrumentation=stats)
+
+        result = matcher.match(message='a ' * 4, template='* * x', max_steps=1000)
+        matcher.match(message='a', template='* * x')
+
+        assert stats['* * x'].max_token_calls == result.steps
+
+    def test_match__memoized(self):
+        stats = MatchStats()
+        matcher = DefaultMemoizedMatcher(instrumentation=stats)
+
+        matcher.match(message='a b', template='[a|b] *')
+
+        assert stats['[a|b] *'].token_calls == {
+            'ChoiceToken': 1,
+            'CharToken': 1,
+            'AnyToken': 1,
+        }
+
+    def test_match__nfa(self):
+        stats = MatchStats()
+        matcher = DefaultNFAMatcher(instrumentation=stats)
+
+        matcher.match(message='a b', template='[a|b] *')
+
+        assert stats['[a|b] *'].match_count == 1
+        assert stats['[a|b] *'].token_calls == {}
+
+    def test_clear(self):
+        stats = MatchStats()
+        matcher = DefaultMatcher(instrumentation=stats)
+        matcher.match(message='a', template='a')
+
+        stats.clear()
+
+        assert len(stats) == 0
+        assert stats.get('a') is None
+
+
+class TestInstrumentation:
+    def test_hooks(self):
+        instrumentation = mock.Mock(wraps=Instrumentation())
+        matcher = Matcher(
+            tokenizer=DefaultTokenizer(instrumentation=instrumentation),
+            instrumentation=instrumentation,
+        )
+
+        result = matcher.match(message='ab', template='[a|INT]*')
+
+        assert result.success
+        instrumentation.on_tokenize.assert_called_once_with(
+            template='[a|INT]*',
+            seconds=mock.ANY,
+        )
+        instrumentation.on_token_match.assert_has_calls(
+            [
+                mock.call(token=CharToken(char='a'), depth=1, variants_count=1),
+                mock.call(
+                    token=ChoiceToken(choices=[[CharToken(char='a')], [IntToken()]]),
+                    depth=0,
+                    variants_count=1,
+                ),
+                mock.call(token=AnyToken(), depth=1, variants_count=1),
+            ]
+        )
+        instrumentation.on_match.assert_called_once_with(
+            template='[a|INT]*',
+            seconds=mock.ANY,
+            success=True,
+        )
+
+    def test_disabled(self):
+        matcher = DefaultMatcher()
+
+        result = matcher.match(message='ab', template='[a]*')
+
+        assert result.success
+        assert matcher.instrumentation is None
+        assert matcher.tokenizer.instrumentation is None
@@ -0,0 +1,160 @@
+from typing import List
+
+from coriander.core import (
+    BaseMatcher,
+    BaseToken,
+    CompiledTemplate,
+    MatchTokenWithMessageResult,
+)
+from coriander.intents import (
+    DefaultIntentIndex,
+    IntentIndex,
+    IntentMatchResult,
+    token_key,
+)
+from coriander.matching import DefaultMemoizedMatcher
+from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import AnyToken, CharToken, ChoiceToken, IntToken, OptionalToken
+
+INTENTS = {
+    'greeting': ['[hello|hi]~greeting', '[hello|hi] my name is *~name'],
+    'introduction': ['my name is *~name', '[hello|hi] my name is *~name INT~age'],
+    'weather': ['what is the weather (in *~city)~has_city'],
+}
+
+
+class TestTokenKey:
+    def test_token_key__equal_tokens(self):
+        first = ChoiceToken(choices=[[CharToken(char='a')], [AnyToken()]])
+        second = ChoiceToken(choices=[[CharToken(char='a')], [AnyToken()]])
+
+        assert token_key(first) == token_key(second)
+
+    def test_token_key__nested_associate_name(self):
+        first = OptionalToken(tokens=[AnyToken()])
+        second = OptionalToken(tokens=[AnyToken()])
+        second.tokens[0].associate_name = 'name'
+
+        assert token_key(first) != token_key(second)
+
+    def test_token_key__custom_token(self):
+        class CustomToken(AnyToken):
+            pass
+
+        assert token_key(CustomToken()) != token_key(CustomToken())
+
+
+class TestIntentIndex:
+    def test_match(self):
+        index = IntentIndex(intents=INTENTS, tokenizer=DefaultTokenizer())
+
+        result = index.match('hi my name is Anise')
+
+        assert result == IntentMatchResult(
+            intent='greeting',
+            template='[hello|hi] my name is *~name',
+            context={'name': 'Anise'},
+        )
+
+    def test_match__without_match(self):
+        index = IntentIndex(intents=INTENTS, tokenizer=DefaultTokenizer())
+
+        assert index.match('good bye') is None
+
+    def test_match_all(self):
+        index = IntentIndex(intents=INTENTS, tokenizer=DefaultTokenizer())
+
+        results = index.match_all('hello my name is Anise 25')
+
+        assert results == [
+            IntentMatchResult(
+                intent='greeting',
+                template='[hello|hi] my name is *~name',
+                context={'name': 'Anise 25'},
+            ),
+            IntentMatchResult(
+                intent='introduction',
+                template='[hello|hi] my name is *~name INT~age',
+                context={'name': 'Anise', 'age': 25},
+            ),
+        ]
+
+    def test_match_templates__same_as_matcher(self):
+        index = IntentIndex(intents=INTENTS, tokenizer=DefaultTokenizer())
+        matcher = DefaultMemoizedMatcher()
+        templates = [template for ts in INTENTS.values() for template in ts]
+        messages = [
+            'hello',
+            'hi my name is Anise',
+            'my name is Anise',
+            'hello my name is Anise 25',
+            'what is the weather ',
+            'what is the weather in Paris',
+            'what is the weather in',
+            '',
+        ]
+
+        for message in messages:
+            expected = {}
+            for template_index, template in enumerate(templates):
+                result = matcher.match(message=message, template=template)
+                if result:
+                    expected[template_index] = result.context
+
+            assert index.match_templates(message) == expected, message
+
+    def test_match_templates__without_prefilter(self):
+        index = IntentIndex(
+            intents=INTENTS,
+            tokenizer=DefaultTokenizer(),
+            prefilter=False,
+        )
+
+        assert index.prefilter is None
+        assert index.match_templates('hi my name is Anise') == {1: {'name': 'Anise'}}
+
+    def test_add__shares_prefixes(self):
+        index = IntentIndex(intents={}, tokenizer=DefaultTokenizer())
+
+        index.add(intent='a', template='hello *')
+        index.add(intent='b', template='hello INT')
+
+        node = index.root
+        for char in 'hello ':
+            assert list(node.char_children) == [char]
+            node = node.char_children[char][0]
+        assert len(index) == 2
+        assert [type(n.token) for n in node.other_children] == [AnyToken, IntToken]
+
+    def test_match__custom_token(self):
+        class DigitToken(BaseToken):
+            def match_with_message(
+                self,
+                message: str,
+                matcher: BaseMatcher,
+            ) -> List[MatchTokenWithMessageResult]:
+                if message[0].isdigit():
+                    return [MatchTokenWithMessageResult(end=1, value=message[0])]
+                return []
+
+            def generate_message(self, generator, value, context) -> str:
+                return '0'
+
+        tokens = [CharToken(char='#'), DigitToken()]
+        tokens[1].associate_name = 'digit'
+        index = IntentIndex(intents={}, tokenizer=DefaultTokenizer())
+        index.add(intent='room', template=index.matcher.compile('#*'))
+        index.add(intent='digit', template=CompiledTemplate('#D', tokens=tokens))
+
+        assert index.match('#7').intent == 'room'
+        assert [r.context for r in index.match_all('#7')] == [{}, {'digit': '7'}]
+
+
+class TestDefaultIntentIndex:
+    def test_match(self):
+        index = DefaultIntentIndex(intents=INTENTS)
+
+        result = index.match('what is the weather in Paris')
+
+        assert result.intent == 'weather'
+        assert result.context == {'has_city': True, 'city': 'Paris'}
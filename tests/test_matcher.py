@@ -1,8 +1,32 @@
-from typing import Optional
+import time
+from typing import List, Optional
 from unittest import mock
 
-from coriander.core import BaseTokenFinder, BaseTokenizer, FindTokenInTemplateResult
-from coriander.matching import DefaultMatcher, Matcher
+import pytest
+
+from coriander.core import (
+    BaseMatcher,
+    BaseToken,
+    BaseTokenFinder,
+    BaseTokenizer,
+    FindTokenInTemplateResult,
+    MatchTokensWithMessageResult,
+    MatchTokenWithMessageResult,
+)
+from coriander.matching import (
+    DefaultMatcher,
+    DefaultMemoizedMatcher,
+    DefaultNFAMatcher,
+    DefaultRegexMatcher,
+    MatchAborted,
+    MatchBudget,
+    Matcher,
+    MemoizedMatcher,
+    NFAMatcher,
+    RegexMatcher,
+)
+from coriander.nfa import NFACompiledTemplate
+from coriander.regex import RegexCompiledTemplate
 from coriander.tokenizers import DefaultTokenizer
 from coriander.tokens import AnyToken, CharToken
 
@@ -123,6 +147,47 @@ class TestMatcher:
         assert match_tokens_with_message_results[2].end == 3
         assert match_tokens_with_message_results[2].context == {}
 
+    def test_match_with_tokens_at(self):
+        tokens = [
+            CharToken(char='l'),
+            AnyToken(),
+        ]
+        matcher = Matcher(tokenizer=mock.Mock())
+
+        match_tokens_with_message_results = matcher.match_with_tokens_at(
+            message='hello',
+            start=2,
+            tokens=tokens,
+        )
+
+        assert [r.end for r in match_tokens_with_message_results] == [4, 5]
+
+    def test_match__token_with_message_protocol(self):
+        class DigitsToken(BaseToken):
+            def match_with_message(
+                self,
+                message: str,
+                matcher: BaseMatcher,
+            ) -> List[MatchTokenWithMessageResult]:
+                if message[0].isdigit():
+                    return [MatchTokenWithMessageResult(end=1, value=message[0])]
+                return []
+
+            def generate_message(self, generator, value, context) -> str:
+                return '0'
+
+        tokens = [CharToken(char='a'), DigitsToken(), CharToken(char='b')]
+        tokens[1].associate_name = 'digit'
+        matcher = Matcher(tokenizer=mock.Mock())
+
+        match_tokens_with_message_results = matcher.match_with_tokens(
+            message='a7b',
+            tokens=tokens,
+        )
+
+        assert match_tokens_with_message_results[0].end == 3
+        assert match_tokens_with_message_results[0].context == {'digit': '7'}
+
     def test_match__associate_name(self):
         tokenizer = DefaultTokenizer()
         matcher = Matcher(tokenizer=tokenizer)
@@ -230,6 +295,105 @@ class TestMatcher:
         assert result.success
         assert result.context['is_age'] is True
 
+    def test_match__associate_name_not_leaking_between_variants(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer())
+
+        result = matcher.match(message='abc', template='a[b~k|bc]~c')
+
+        assert result.success
+        assert result.context == {'c': 'bc'}
+
+    def test_match_with_tokens__equal_variants_collapse(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer())
+
+        match_tokens_with_message_results = matcher.match_with_tokens(
+            message='aaa',
+            tokens=[AnyToken(), AnyToken()],
+        )
+
+        assert match_tokens_with_message_results == [
+            MatchTokensWithMessageResult(end=2, context={}),
+            MatchTokensWithMessageResult(end=3, context={}),
+        ]
+
+    def test_match__compiled_template(self):
+        tokenizer = mock.Mock(wraps=DefaultTokenizer())
+        matcher = Matcher(tokenizer=tokenizer)
+        compiled_template = matcher.compile('*~name hello')
+
+        first_result = matcher.match(message='millet hello', template=compiled_template)
+        second_result = matcher.match(message='anise hello', template='*~name hello')
+
+        assert first_result.context == {'name': 'millet'}
+        assert second_result.context == {'name': 'anise'}
+        assert tokenizer.tokenize.call_count == 1
+
+    def test_match__lazy(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer(), lazy=True)
+
+        result = matcher.match(message='a b c', template='*~x *~y')
+        incorrect_result = matcher.match(message='a b c', template='*~x d')
+
+        assert result.success
+        assert result.context == {'x': 'a', 'y': 'b c'}
+        assert not incorrect_result.success
+        assert incorrect_result.context == {}
+
+    def test_match__lazy_stops_at_first_match(self):
+        class CountingAnyToken(AnyToken):
+            calls = 0
+
+            def iter_match_with_message_at(self, message, start, matcher):
+                for result in super().iter_match_with_message_at(
+                    message, start, matcher
+                ):
+                    CountingAnyToken.calls += 1
+                    yield result
+
+        class CountingAnyTokenFinder(BaseTokenFinder):
+            def find_in_template(self, template, tokenizer):
+                if template[0] == '*':
+                    return FindTokenInTemplateResult(token=CountingAnyToken(), end=1)
+                return None
+
+        matcher = Matcher(
+            tokenizer=DefaultTokenizer(custom_token_finders=[CountingAnyTokenFinder()]),
+            lazy=True,
+        )
+
+        result = matcher.match(message='a' + ' b' * 50, template='* *')
+
+        assert result.success
+        assert CountingAnyToken.calls == 100
+
+    def test_match__lazy_same_success_as_eager(self):
+        eager_matcher = DefaultMatcher()
+        lazy_matcher = DefaultMatcher(lazy=True)
+
+        for message, template in MATCH_CASES:
+            eager_result = eager_matcher.match(message=message, template=template)
+            lazy_result = lazy_matcher.match(message=message, template=template)
+            assert lazy_result.success == eager_result.success
+
+    def test_iter_matches(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer())
+
+        results = matcher.iter_matches(message='a b c', template='*~x *~y')
+
+        assert [result.context for result in results] == [
+            {'x': 'a', 'y': 'b c'},
+            {'x': 'a b', 'y': 'c'},
+        ]
+
+    def test_iter_matches__distinct(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer())
+
+        results = list(matcher.iter_matches(message='aaa', template='**'))
+        no_results = list(matcher.iter_matches(message='aa', template='b'))
+
+        assert [result.context for result in results] == [{}]
+        assert no_results == []
+
 
 class TestDefaultMatcher:
     def test_match(self):
@@ -280,3 +444,428 @@ class TestDefaultMatcher:
         assert result
         assert result.success
         assert result.context == {}
+
+    def test_match_many(self):
+        matcher = DefaultMatcher()
+
+        results = matcher.match_many(
+            messages=['hi Anise', 'hello Millet', 'bye'],
+            template='[hello|hi] *~name',
+        )
+
+        assert [result.context for result in results] == [
+            {'name': 'Anise'},
+            {'name': 'Millet'},
+            {},
+        ]
+
+    def test_match_many__processes(self):
+        matcher = DefaultMatcher()
+        messages = [f'hi {index}' for index in range(50)] + ['bye']
+
+        results = list(
+            matcher.match_many(
+                messages=messages,
+                template='hi INT~n',
+                processes=2,
+                chunksize=7,
+            )
+        )
+
+        assert [result.success for result in results] == [True] * 50 + [False]
+        assert results[10].context == {'n': 10}
+
+    def test_match_many_templates(self):
+        matcher = DefaultMatcher()
+        templates = ['hi *~name', 'hello *', '[hi|hello]~greeting Anise']
+
+        results = list(
+            matcher.match_many_templates(message='hi Anise', templates=templates)
+        )
+        process_results = list(
+            matcher.match_many_templates(
+                message='hi Anise',
+                templates=templates,
+                processes=2,
+                chunksize=1,
+            )
+        )
+
+        assert [result.context for result in results] == [
+            {'name': 'Anise'},
+            {},
+            {'greeting': 'hi'},
+        ]
+        assert [result.success for result in results] == [True, False, True]
+        assert [result.context for result in process_results] == [
+            result.context for result in results
+        ]
+
+
+MATCH_CASES = [
+    ('hello my name is Docker', '[hello|hi] my name is *'),
+    ('hallo my name is Docker', '[hello|hi] my name is *'),
+    ('hi', '[hello|hi]~greeting'),
+    ('millet', '[[galangal|millet]~name|hi]~greeting'),
+    ('hi', '[[galangal|millet]~name|hi]~greeting'),
+    ('millet hello', '[galangal|millet]~name [hello|hi]~greeting'),
+    ('millet hello', '*~name hello'),
+    ('25 years old', 'INT~age years old'),
+    ('25 years old', '(INT)~is_age years old'),
+    ('years old', '(INT )~is_age years old'),
+    ('hello', 'hello (world)'),
+    ('', ''),
+    ('', '*'),
+    ('a7b', 'a~x INT~n b'),
+    ('a 7 b', 'a~x INT~n b'),
+    ('a 75', 'a *~rest'),
+    ('hi (there)', '[hi|hello] \\(there\\)'),
+]
+
+
+class TestMatcherBudget:
+    def test_match__max_steps(self):
+        matcher = DefaultMatcher()
+
+        result = matcher.match(message='a ' * 30, template='* * * * x', max_steps=100)
+
+        assert result.aborted
+        assert not result.success
+        assert result.steps == 101
+        assert matcher._budget is None
+
+    def test_match__max_steps_enough(self):
+        matcher = DefaultMatcher()
+
+        result = matcher.match(
+            message='hi my name is Anise',
+            template='[hello|hi] my name is *~name',
+            max_steps=100,
+        )
+
+        assert not result.aborted
+        assert result.context == {'name': 'Anise'}
+        # Choice matched by its trie, the literal and any token.
+        assert result.steps == 3
+
+    def test_match__timeout(self):
+        matcher = DefaultMatcher()
+
+        with mock.patch('time.perf_counter', side_effect=[0.0, 2.0]):
+            result = matcher.match(message='a ' * 30, template='* * * * x', timeout=1)
+
+        assert result.aborted
+        assert result.steps == 1
+
+    def test_match__lazy(self):
+        matcher = DefaultMatcher(lazy=True)
+
+        result = matcher.match(message='a ' * 30, template='* * * * x', max_steps=50)
+
+        assert result.aborted
+        assert result.steps == 51
+
+    def test_match__memoized(self):
+        matcher = DefaultMemoizedMatcher()
+        message = 'a ' * 30
+
+        result = matcher.match(message=message, template='* * * * x', max_steps=1000)
+        aborted_result = matcher.match(
+            message=message,
+            template='* * * * x',
+            max_steps=result.steps - 1,
+        )
+
+        assert not result.aborted
+        assert not result.success
+        assert aborted_result.aborted
+
+    def test_match__nested_tokens_count(self):
+        matcher = DefaultMatcher()
+
+        result = matcher.match(message='a1', template='[a|INT][a|INT]', max_steps=100)
+
+        # Both choices and one nested token each; the others are pruned.
+        assert result.success
+        assert result.steps == 4
+
+    def test_match__regex(self):
+        matcher = DefaultRegexMatcher()
+
+        result = matcher.match(message='a ' * 30, template='* * * * x', max_steps=100)
+
+        assert result.aborted
+        assert result.steps == 101
+
+    def test_match__regex_hostile_message(self):
+        matcher = DefaultRegexMatcher()
+
+        started_at = time.perf_counter()
+        result = matcher.match(message='a ' * 100, template='* * * * * x', timeout=0.05)
+
+        assert result.aborted
+        assert time.perf_counter() - started_at < 1
+
+
+class TestMatchBudget:
+    def test_step(self):
+        budget = MatchBudget(max_steps=2)
+
+        budget.step()
+        budget.step()
+
+        assert budget.steps == 2
+        with pytest.raises(MatchAborted):
+            budget.step()
+
+    def test_step__deadline_checked_every_interval(self):
+        budget = MatchBudget(deadline=1.0)
+
+        with mock.patch('time.perf_counter', return_value=2.0) as perf_counter:
+            with pytest.raises(MatchAborted):
+                budget.step()
+
+        assert perf_counter.call_count == 1
+
+
+class TestMemoizedMatcher:
+    def test_match_with_tokens__few_variants(self):
+        tokens = [
+            AnyToken(),
+            CharToken(char='e'),
+        ]
+        matcher = MemoizedMatcher(tokenizer=mock.Mock())
+
+        match_tokens_with_message_results = matcher.match_with_tokens(
+            tokens=tokens,
+            message='hee',
+        )
+
+        assert [r.end for r in match_tokens_with_message_results] == [2, 3]
+        assert [r.context for r in match_tokens_with_message_results] == [{}, {}]
+
+    def test_match_with_tokens__empty_message(self):
+        tokens = [AnyToken()]
+        matcher = MemoizedMatcher(tokenizer=mock.Mock())
+
+        match_tokens_with_message_results = matcher.match_with_tokens(
+            tokens=tokens,
+            message='',
+        )
+
+        assert match_tokens_with_message_results == []
+
+    def test_match__same_as_matcher(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer())
+        memoized_matcher = MemoizedMatcher(tokenizer=DefaultTokenizer())
+
+        for message, template in MATCH_CASES:
+            expected = matcher.match(message=message, template=template)
+            actual = memoized_matcher.match(message=message, template=template)
+
+            assert actual.success == expected.success, (message, template)
+            assert actual.context == expected.context, (message, template)
+
+    def test_match__adversarial_any_tokens(self):
+        matcher = MemoizedMatcher(tokenizer=DefaultTokenizer())
+        message = 'a ' * 100
+
+        with mock.patch.object(
+            AnyToken,
+            'match_with_message',
+            autospec=True,
+            side_effect=AnyToken.match_with_message,
+        ) as match_with_message_mock:
+            result = matcher.match(message=message, template='* * * * x')
+
+        assert not result
+        assert match_with_message_mock.call_count <= 4 * len(message)
+
+    def test_match__adversarial_nested_tokens(self):
+        matcher = MemoizedMatcher(tokenizer=DefaultTokenizer())
+        message = 'ab ' * 50 + 'c'
+
+        result = matcher.match(message=message, template='[(a)(b)*]~x [*|(*)]~y d')
+
+        assert not result
+
+    def test_match__associate_names(self):
+        matcher = MemoizedMatcher(tokenizer=DefaultTokenizer())
+
+        result = matcher.match(
+            message='hi my name is Anise and I am 25',
+            template='[hello|hi] my name is *~name and I am INT~age',
+        )
+
+        assert result
+        assert result.context == {'name': 'Anise', 'age': 25}
+
+
+class TestDefaultMemoizedMatcher:
+    def test_match(self):
+        matcher = DefaultMemoizedMatcher()
+
+        result = matcher.match(
+            message='hello my name is Docker',
+            template='[hello|hi] my name is *~name',
+        )
+
+        assert result
+        assert result.context == {'name': 'Docker'}
+
+
+class TestRegexMatcher:
+    def test_compile(self):
+        matcher = RegexMatcher(tokenizer=DefaultTokenizer())
+
+        compiled_template = matcher.compile('[hello|hi]~greeting *')
+
+        assert isinstance(compiled_template, RegexCompiledTemplate)
+        assert compiled_template.regex_template
+
+    def test_match__same_as_matcher(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer())
+        regex_matcher = RegexMatcher(tokenizer=DefaultTokenizer())
+
+        for message, template in MATCH_CASES:
+            expected = matcher.match(message=message, template=template)
+            actual = regex_matcher.match(message=message, template=template)
+
+            assert actual.success == expected.success, (message, template)
+            assert actual.context == expected.context, (message, template)
+
+    def test_match__foreign_compiled_template(self):
+        compiled_template = Matcher(tokenizer=DefaultTokenizer()).compile('INT~age')
+        matcher = RegexMatcher(tokenizer=DefaultTokenizer())
+
+        result = matcher.match(message='25', template=compiled_template)
+
+        assert result
+        assert result.context == {'age': 25}
+
+    def test_match__custom_token_fallback(self):
+        class DigitToken(BaseToken):
+            def match_with_message(
+                self,
+                message: str,
+                matcher: BaseMatcher,
+            ) -> List[MatchTokenWithMessageResult]:
+                if message[0].isdigit():
+                    return [MatchTokenWithMessageResult(end=1, value=message[0])]
+                return []
+
+            def generate_message(self, generator, value, context) -> str:
+                return '0'
+
+        class DigitTokenFinder(BaseTokenFinder):
+            def find_in_template(
+                self,
+                template: str,
+                tokenizer: 'BaseTokenizer',
+            ) -> Optional[FindTokenInTemplateResult]:
+                if template.startswith('D'):
+                    return FindTokenInTemplateResult(end=1, token=DigitToken())
+                return None
+
+        matcher = DefaultRegexMatcher(custom_token_finders=[DigitTokenFinder()])
+
+        compiled_template = matcher.compile('room D~digit')
+        result = matcher.match(message='room 7', template=compiled_template)
+
+        assert compiled_template.regex_template is None
+        assert result
+        assert result.context == {'digit': '7'}
+
+
+class TestDefaultRegexMatcher:
+    def test_match(self):
+        matcher = DefaultRegexMatcher()
+
+        result = matcher.match(
+            message='hello my name is Docker',
+            template='[hello|hi]~greeting my name is *~name',
+        )
+
+        assert result
+        assert result.context == {'greeting': 'hello', 'name': 'Docker'}
+
+    def test_match__incorrect(self):
+        matcher = DefaultRegexMatcher()
+
+        result = matcher.match(
+            message='hallo my name is Docker',
+            template='[hello|hi] my name is *',
+        )
+
+        assert not result
+        assert result.context == {}
+
+
+class TestNFAMatcher:
+    def test_compile(self):
+        matcher = NFAMatcher(tokenizer=DefaultTokenizer())
+
+        compiled_template = matcher.compile('[hello|hi]~greeting *')
+
+        assert isinstance(compiled_template, NFACompiledTemplate)
+        assert compiled_template.nfa
+
+    def test_match__same_as_matcher(self):
+        matcher = Matcher(tokenizer=DefaultTokenizer())
+        nfa_matcher = NFAMatcher(tokenizer=DefaultTokenizer())
+
+        for message, template in MATCH_CASES:
+            expected = matcher.match(message=message, template=template)
+            actual = nfa_matcher.match(message=message, template=template)
+
+            assert actual.success == expected.success, (message, template)
+            assert actual.context == expected.context, (message, template)
+
+    def test_match__foreign_compiled_template(self):
+        compiled_template = Matcher(tokenizer=DefaultTokenizer()).compile('INT~age')
+        matcher = NFAMatcher(tokenizer=DefaultTokenizer())
+
+        result = matcher.match(message='25', template=compiled_template)
+
+        assert result
+        assert result.context == {'age': 25}
+
+    def test_match__hostile_message(self):
+        matcher = NFAMatcher(tokenizer=DefaultTokenizer())
+
+        result = matcher.match(message='a ' * 5000, template='*~a * *~b * x')
+
+        assert not result
+
+    def test_match__custom_token_fallback(self):
+        class AllTokenFinder(BaseTokenFinder):
+            def find_in_template(
+                self,
+                template: str,
+                tokenizer: 'BaseTokenizer',
+            ) -> Optional[FindTokenInTemplateResult]:
+                return FindTokenInTemplateResult(
+                    end=len(template),
+                    token=type('AllToken', (AnyToken,), {})(),
+                )
+
+        matcher = NFAMatcher(tokenizer=DefaultTokenizer([AllTokenFinder()]))
+
+        compiled_template = matcher.compile('hello')
+        result = matcher.match(message='anything', template=compiled_template)
+
+        assert compiled_template.nfa is None
+        assert result
+
+
+class TestDefaultNFAMatcher:
+    def test_match(self):
+        matcher = DefaultNFAMatcher()
+
+        result = matcher.match(
+            message='hello my name is Docker',
+            template='[hello|hi]~greeting my name is *~name',
+        )
+
+        assert result
+        assert result.context == {'greeting': 'hello', 'name': 'Docker'}
@@ -0,0 +1,161 @@
+import pickle
+import random
+
+from coriander.nfa import NFA, NFACapture, NFACompiler
+from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import AnyToken, CharToken
+
+
+def compile_nfa(template: str) -> NFA:
+    return NFACompiler().compile(DefaultTokenizer().tokenize(template))
+
+
+class TestNFACompiler:
+    def test_compile(self):
+        nfa = compile_nfa('[hi|hello] *')
+
+        assert len(nfa) > 0
+        assert nfa.captures == []
+
+    def test_compile__captures(self):
+        nfa = compile_nfa('INT~age (years)~unit')
+
+        assert [c.associate_name for c in nfa.captures] == ['age', 'unit']
+        assert nfa.captures[0].kind == NFACapture.KIND_INT
+        assert nfa.captures[1].kind == NFACapture.KIND_PRESENT
+
+    def test_compile__nested_names_of_unnamed_container(self):
+        nfa = compile_nfa('([a|b]~letter)')
+
+        assert nfa.captures == []
+
+    def test_compile__untranslatable_token(self):
+        class CustomToken(AnyToken):
+            pass
+
+        nfa = NFACompiler().compile([CharToken(char='a'), CustomToken()])
+
+        assert nfa is None
+
+
+class TestNFA:
+    def test_accepts(self):
+        nfa = compile_nfa('[hello|hi] my name is *')
+
+        assert nfa.accepts('hi my name is Anise')
+        assert not nfa.accepts('hallo my name is Anise')
+        assert not nfa.accepts('hi my name is ')
+
+    def test_accepts__not_at_end(self):
+        nfa = compile_nfa('hello (world)')
+
+        assert nfa.accepts('hello world')
+        assert not nfa.accepts('hello ')
+
+    def test_accepts__int_is_maximal(self):
+        nfa = compile_nfa('INT1')
+
+        assert not nfa.accepts('251')
+
+    def test_accepts__reuses_dfa_states(self):
+        nfa = compile_nfa('* x')
+        nfa.accepts('a b c x')
+        states_count = len(nfa._dfa_states)
+
+        nfa.accepts('c b a x')
+
+        assert len(nfa._dfa_states) == states_count
+
+    def test_accepts__max_dfa_states(self):
+        nfa = compile_nfa('*a*b*c*d*e')
+        nfa.MAX_DFA_STATES = 20
+        rng = random.Random(0)
+
+        for _ in range(200):
+            message = ''.join(rng.choice('abcde ') for _ in range(30)) + 'e'
+            assert nfa.accepts(message) == (nfa.match(message) is not None)
+
+        reachable = {id(nfa._dfa_start): nfa._dfa_start}
+        stack = [nfa._dfa_start]
+        while stack:
+            for state in stack.pop().transitions.values():
+                if id(state) not in reachable:
+                    reachable[id(state)] = state
+                    stack.append(state)
+        assert len(reachable) <= 20
+        assert len(nfa._dfa_states) <= 20
+
+    def test_accepts__hostile_message(self):
+        nfa = compile_nfa('* * * * x')
+
+        assert not nfa.accepts('a ' * 10000)
+
+    def test_match(self):
+        nfa = compile_nfa('INT~age (years)~unit old')
+
+        assert nfa.match('25 years old') == {'age': 25, 'unit': True}
+        assert nfa.match('25  old') == {'age': 25, 'unit': False}
+        assert nfa.match('25 old') is None
+
+    def test_match__not_reached_capture(self):
+        nfa = compile_nfa('[(a)~x|b]~y')
+
+        assert nfa.match('b') == {'y': 'b'}
+        assert nfa.match('a') == {'y': 'a', 'x': True}
+
+    def test_match__priority(self):
+        nfa = compile_nfa('*~first *~second')
+
+        assert nfa.match('a b c') == {'first': 'a', 'second': 'b c'}
+
+    def test_union(self):
+        nfa = NFA.union([compile_nfa('hi *'), compile_nfa('* bye')])
+
+        assert nfa.accepts('hi there')
+        assert nfa.accepts('so bye')
+        assert not nfa.accepts('hello')
+        assert nfa.captures == []
+
+    def test_union__empty(self):
+        nfa = NFA.union([])
+
+        assert not nfa.accepts('')
+        assert nfa.live_pcs() == frozenset()
+
+    def test_matches(self):
+        nfa = NFA.union([compile_nfa('hi *'), compile_nfa('* bye')])
+        state = nfa.start_state
+        for char in 'hi bye':
+            state = nfa.transition(state, char)
+
+        assert nfa.matches(state) == {0, 1}
+        assert nfa.matches(nfa.transition(state, 's')) == {0}
+
+    def test_transition__reuses_dfa_states(self):
+        nfa = compile_nfa('a*')
+        state = nfa.transition(nfa.start_state, 'a')
+
+        assert nfa.transition(nfa.start_state, 'a') is state
+
+    def test_live(self):
+        nfa = compile_nfa('ab INT')
+        state = nfa.start_state
+        for char in 'ab ':
+            state = nfa.transition(state, char)
+
+        assert nfa.live(state)
+        assert nfa.live(nfa.transition(state, '4'))
+        assert not nfa.live(nfa.transition(state, 'x'))
+
+    def test_live__never_matching(self):
+        nfa = compile_nfa('INT1')
+
+        assert not nfa.live(nfa.start_state)
+
+    def test_pickle(self):
+        nfa = compile_nfa('*~name hello')
+
+        restored_nfa = pickle.loads(pickle.dumps(nfa))
+
+        assert restored_nfa.accepts('Anise hello')
+        assert restored_nfa.match('Anise hello') == {'name': 'Anise'}
@@ -0,0 +1,380 @@
+import pickle
+from unittest import mock
+
+from coriander.matching import DefaultMatcher
+from coriander.optimization import (
+    TokenBounds,
+    TokenList,
+    anchor_any_tokens,
+    annotate_bounds,
+    coalesce_literals,
+    index_literal_choices,
+    optimize,
+    token_bounds,
+    tokens_bounds,
+)
+from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import (
+    AnyToken,
+    CharToken,
+    ChoiceToken,
+    IntToken,
+    LiteralToken,
+    OptionalToken,
+)
+
+
+class TestCoalesceLiterals:
+    def test_coalesce_literals(self):
+        tokens = DefaultTokenizer().tokenize('hello * my name')
+
+        assert coalesce_literals(tokens) == [
+            LiteralToken(text='hello '),
+            AnyToken(),
+            LiteralToken(text=' my name'),
+        ]
+
+    def test_coalesce_literals__single_char(self):
+        tokens = DefaultTokenizer().tokenize('a*b')
+
+        assert coalesce_literals(tokens) == [
+            CharToken(char='a'),
+            AnyToken(),
+            CharToken(char='b'),
+        ]
+
+    def test_coalesce_literals__associate_name_breaks_run(self):
+        tokens = DefaultTokenizer().tokenize('ab~x cd')
+
+        coalesced_tokens = coalesce_literals(tokens)
+
+        assert coalesced_tokens == [
+            CharToken(char='a'),
+            CharToken(char='b'),
+            LiteralToken(text=' cd'),
+        ]
+        assert coalesced_tokens[1].associate_name == 'x'
+
+    def test_coalesce_literals__nested(self):
+        tokens = DefaultTokenizer().tokenize('[hello|hi]~greeting (dear)~dear')
+
+        coalesced_tokens = coalesce_literals(tokens)
+
+        assert coalesced_tokens == [
+            ChoiceToken(
+                choices=[[LiteralToken(text='hello')], [LiteralToken(text='hi')]],
+            ),
+            CharToken(char=' '),
+            OptionalToken(tokens=[LiteralToken(text='dear')]),
+        ]
+        assert coalesced_tokens[0].associate_name == 'greeting'
+        assert coalesced_tokens[2].associate_name == 'dear'
+
+    def test_coalesce_literals__subclass_kept(self):
+        class MyOptionalToken(OptionalToken):
+            pass
+
+        token = MyOptionalToken(tokens=[CharToken(char='a'), CharToken(char='b')])
+
+        assert coalesce_literals([token])[0] is token
+
+
+DIGITS = frozenset('0123456789')
+
+
+class TestAnchorAnyTokens:
+    def test_anchor_any_tokens(self):
+        tokens = [AnyToken(), LiteralToken(text=' my name'), AnyToken(), CharToken('!')]
+
+        assert anchor_any_tokens(tokens) == [
+            AnyToken(anchor=' my name'),
+            LiteralToken(text=' my name'),
+            AnyToken(anchor='!'),
+            CharToken('!'),
+        ]
+
+    def test_anchor_any_tokens__without_literal(self):
+        tokens = DefaultTokenizer().tokenize('* (a)*INT*')
+
+        anchored_tokens = anchor_any_tokens(tokens)
+
+        assert anchored_tokens[0] == AnyToken(anchor=' ')
+        assert anchored_tokens[1:] == tokens[1:]
+        assert anchored_tokens[3].anchor is None
+        assert anchored_tokens[5].anchor is None
+
+    def test_anchor_any_tokens__associate_name(self):
+        tokens = DefaultTokenizer().tokenize('*~name!')
+
+        anchored_tokens = anchor_any_tokens(tokens)
+
+        assert anchored_tokens[0] == AnyToken(anchor='!')
+        assert anchored_tokens[0].associate_name == 'name'
+
+    def test_anchor_any_tokens__nested(self):
+        tokens = coalesce_literals(DefaultTokenizer().tokenize('[*, |(* )]'))
+
+        anchored_tokens = anchor_any_tokens(tokens)
+
+        choices = anchored_tokens[0].choices
+        assert choices[0][0] == AnyToken(anchor=', ')
+        assert choices[1][0].tokens[0] == AnyToken(anchor=' ')
+
+    def test_anchor_any_tokens__subclass_kept(self):
+        class MyAnyToken(AnyToken):
+            pass
+
+        tokens = [MyAnyToken(), CharToken('!')]
+
+        assert anchor_any_tokens(tokens)[0].anchor is None
+
+
+class TestIndexLiteralChoices:
+    def test_index_literal_choices(self):
+        tokens = coalesce_literals(DefaultTokenizer().tokenize('[hello|hi|]~greeting'))
+
+        indexed_tokens = index_literal_choices(tokens)
+
+        assert indexed_tokens == tokens
+        assert indexed_tokens[0].associate_name == 'greeting'
+        assert indexed_tokens[0].literal_trie.texts == ('hello', 'hi', '')
+        assert tokens[0].literal_trie is None
+
+    def test_index_literal_choices__not_literal(self):
+        tokenizer = DefaultTokenizer()
+
+        for template in ['[hi|*]', '[hi|a~x]', '[hi|(a)]']:
+            indexed_tokens = index_literal_choices(tokenizer.tokenize(template))
+            assert indexed_tokens[0].literal_trie is None
+
+    def test_index_literal_choices__nested(self):
+        tokens = DefaultTokenizer().tokenize('[[a|b] *|c]')
+
+        indexed_tokens = index_literal_choices(tokens)
+
+        assert indexed_tokens[0].literal_trie is None
+        assert indexed_tokens[0].choices[0][0].literal_trie.texts == ('a', 'b')
+
+    def test_index_literal_choices__shared(self):
+        matcher = DefaultMatcher()
+
+        first_template = matcher.compile('[hi|hey] there')
+        second_template = matcher.compile('oh [hi|hey]')
+
+        assert first_template.tokens[0].literal_trie.texts == ('hi', 'hey')
+        assert first_template.tokens[0].literal_trie is (
+            second_template.tokens[1].literal_trie
+        )
+
+
+class TestTokenBounds:
+    def test_token_bounds(self):
+        assert token_bounds(CharToken(char='a')) == TokenBounds(1, 1, frozenset('a'))
+        assert token_bounds(LiteralToken(text='hi')) == TokenBounds(
+            2, 2, frozenset('h')
+        )
+        assert token_bounds(AnyToken()) == TokenBounds(1, None, None)
+        assert token_bounds(IntToken()) == TokenBounds(1, None, DIGITS)
+
+    def test_token_bounds__optional(self):
+        token = OptionalToken(tokens=[LiteralToken(text='ab'), CharToken(char='c')])
+
+        assert token_bounds(token) == TokenBounds(0, 3, frozenset('a'))
+
+    def test_token_bounds__choice(self):
+        token = ChoiceToken(
+            choices=[
+                [LiteralToken(text='hello')],
+                [CharToken(char='h'), CharToken(char='i')],
+                [OptionalToken(tokens=[IntToken()]), CharToken(char='x')],
+            ],
+        )
+
+        assert token_bounds(token) == TokenBounds(1, None, frozenset('hx') | DIGITS)
+
+    def test_token_bounds__custom_token(self):
+        class MyAnyToken(AnyToken):
+            pass
+
+        assert token_bounds(MyAnyToken()) == TokenBounds(0, None, None)
+
+    def test_tokens_bounds(self):
+        tokens = [
+            OptionalToken(tokens=[CharToken(char='a')]),
+            CharToken(char='b'),
+            AnyToken(),
+        ]
+
+        assert tokens_bounds(tokens) == TokenBounds(2, None, frozenset('ab'))
+        assert tokens_bounds(TokenList(tokens)) == tokens_bounds(tokens)
+
+    def test_tokens_bounds__empty(self):
+        assert tokens_bounds([]) == TokenBounds(0, 0, frozenset())
+
+
+class TestTokenList:
+    def test_suffixes(self):
+        tokens = TokenList(
+            [
+                IntToken(),
+                OptionalToken(tokens=[CharToken(char=' ')]),
+                LiteralToken(text='years'),
+            ]
+        )
+
+        assert tokens == [
+            IntToken(),
+            OptionalToken(tokens=[CharToken(char=' ')]),
+            LiteralToken(text='years'),
+        ]
+        assert tokens.min_lengths == [6, 5, 5, 0]
+        assert tokens.max_lengths == [None, 6, 5, 0]
+        assert tokens.first_chars == [DIGITS, frozenset(' y'), frozenset('y'), None]
+
+    def test_suffixes__nullable(self):
+        tokens = TokenList([CharToken(char='a'), OptionalToken(tokens=[AnyToken()])])
+
+        assert tokens.min_lengths == [1, 0, 0]
+        assert tokens.first_chars == [frozenset('a'), None, None]
+
+    def test_accepts_length(self):
+        tokens = TokenList([CharToken(char='a'), OptionalToken(tokens=[IntToken()])])
+
+        assert not tokens.accepts_length(0)
+        assert tokens.accepts_length(1)
+        assert tokens.accepts_length(100)
+        assert not TokenList([LiteralToken(text='ab')]).accepts_length(3)
+
+    def test_pickle(self):
+        tokens = TokenList([LiteralToken(text='ab'), AnyToken()])
+
+        unpickled_tokens = pickle.loads(pickle.dumps(tokens))
+
+        assert unpickled_tokens == tokens
+        assert unpickled_tokens.min_lengths == tokens.min_lengths
+
+
+class TestAnnotateBounds:
+    def test_annotate_bounds(self):
+        tokens = DefaultTokenizer().tokenize('[a|b(c)]~x')
+
+        annotated_tokens = annotate_bounds(tokens)
+
+        assert annotated_tokens == tokens
+        assert isinstance(annotated_tokens, TokenList)
+        choice_token = annotated_tokens[0]
+        assert choice_token.associate_name == 'x'
+        assert all(isinstance(choice, TokenList) for choice in choice_token.choices)
+        assert isinstance(choice_token.choices[1][1].tokens, TokenList)
+
+    def test_optimize(self):
+        tokens = optimize(DefaultTokenizer().tokenize('hello *~name'))
+
+        assert isinstance(tokens, TokenList)
+        assert tokens.min_lengths == [7, 1, 0]
+
+
+class TestMatcherPruning:
+    def test_match__too_short(self):
+        matcher = DefaultMatcher()
+
+        with mock.patch.object(matcher, 'match_compiled') as match_compiled:
+            result = matcher.match(message='hi', template='hello *')
+
+        assert not result
+        match_compiled.assert_not_called()
+
+    def test_match__too_long(self):
+        matcher = DefaultMatcher()
+
+        with mock.patch.object(matcher, 'match_compiled') as match_compiled:
+            result = matcher.match(message='hello there', template='[hello|hi] (a)')
+
+        assert not result
+        match_compiled.assert_not_called()
+
+    def test_match__any_token_ends_pruned(self):
+        matcher = DefaultMatcher()
+
+        with mock.patch.object(
+            LiteralToken,
+            'match_with_message_at',
+            autospec=True,
+            side_effect=LiteralToken.match_with_message_at,
+        ) as match_with_message_at:
+            result = matcher.match(message='a' * 20 + ' end', template='* end')
+
+        # Only ends of the any token leaving four characters are tried.
+        assert result
+        assert match_with_message_at.call_count == 1
+
+    def test_match__choice_branches_pruned(self):
+        matcher = DefaultMatcher()
+
+        with mock.patch.object(
+            LiteralToken,
+            'match_with_message_at',
+            autospec=True,
+            side_effect=LiteralToken.match_with_message_at,
+        ) as match_with_message_at:
+            result = matcher.match(message='hi', template='[hello *|hi|hey *]')
+
+        assert result
+        assert match_with_message_at.call_count == 1
+
+    def test_match__any_token_jumps_to_anchor(self):
+        matcher = DefaultMatcher()
+
+        with mock.patch.object(
+            LiteralToken,
+            'match_with_message_at',
+            autospec=True,
+            side_effect=LiteralToken.match_with_message_at,
+        ) as match_with_message_at:
+            result = matcher.match(
+                message='a b c d my name is e f',
+                template='* my name is *~name',
+            )
+
+        # The first any token ends at the literal only, the rest are skipped.
+        assert result.context == {'name': 'e f'}
+        assert match_with_message_at.call_count == 1
+
+    def test_match_with_tokens__prefixes(self):
+        matcher = DefaultMatcher()
+        compiled_template = matcher.compile('*!')
+
+        results = matcher.match_with_tokens('a!b!', compiled_template.tokens)
+
+        assert [result.end for result in results] == [2, 4]
+
+
+class TestTemplateCompilerOptimize:
+    def test_compile(self):
+        matcher = DefaultMatcher()
+
+        compiled_template = matcher.compile('hello *~name')
+
+        assert compiled_template.tokens == [LiteralToken(text='hello '), AnyToken()]
+
+    def test_compile__without_optimize(self):
+        matcher = DefaultMatcher(optimize=False)
+
+        compiled_template = matcher.compile('hi *~name')
+
+        assert compiled_template.tokens == [
+            CharToken(char='h'),
+            CharToken(char='i'),
+            CharToken(char=' '),
+            AnyToken(),
+        ]
+
+    def test_match__same_as_without_optimize(self):
+        matcher = DefaultMatcher()
+        raw_matcher = DefaultMatcher(optimize=False)
+        template = '[hello|hi]~greeting (dear )my name is *~name'
+
+        for message in ['hi my name is Anise', 'hello dear my name is Millet', 'hi']:
+            result = matcher.match(message=message, template=template)
+            raw_result = raw_matcher.match(message=message, template=template)
+            assert result == raw_result
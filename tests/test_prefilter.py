@@ -0,0 +1,55 @@
+from coriander.prefilter import AhoCorasick, LiteralPrefilter, required_literals
+from coriander.tokenizers import DefaultTokenizer
+
+
+class TestRequiredLiterals:
+    def test_required_literals(self):
+        tokens = DefaultTokenizer().tokenize('[hello|hi] my name is *~name, INT')
+
+        assert required_literals(tokens) == [' my name is ', ', ']
+
+    def test_required_literals__without_literals(self):
+        tokens = DefaultTokenizer().tokenize('(hello)[a|b]*')
+
+        assert required_literals(tokens) == []
+
+
+class TestAhoCorasick:
+    def test_find(self):
+        automaton = AhoCorasick(patterns=['he', 'she', 'his', 'hers'])
+
+        assert automaton.find('ushers') == {0, 1, 3}
+
+    def test_find__nested_patterns(self):
+        automaton = AhoCorasick(patterns=['a', 'ab', 'bab', 'bc', 'bca', 'c', 'caa'])
+
+        assert automaton.find('abccab') == {0, 1, 3, 5}
+
+    def test_find__without_patterns(self):
+        automaton = AhoCorasick(patterns=[])
+
+        assert automaton.find('hello') == set()
+
+
+class TestLiteralPrefilter:
+    def test_candidates(self):
+        tokenizer = DefaultTokenizer()
+        prefilter = LiteralPrefilter()
+        prefilter.add(0, tokenizer.tokenize('my name is *'))
+        prefilter.add(1, tokenizer.tokenize('* years old'))
+        prefilter.add(2, tokenizer.tokenize('[hello|hi]'))
+        prefilter.add(3, tokenizer.tokenize('call me * at INT o\'clock'))
+
+        assert prefilter.candidates('my name is Anise') == {0, 2}
+        assert prefilter.candidates('call me later at 5 o\'clock') == {2, 3}
+        assert prefilter.candidates('call me at noon') == {2}
+
+    def test_candidates__added_after_first_use(self):
+        tokenizer = DefaultTokenizer()
+        prefilter = LiteralPrefilter()
+        prefilter.add(0, tokenizer.tokenize('hello'))
+        prefilter.candidates('hello')
+
+        prefilter.add(1, tokenizer.tokenize('hi'))
+
+        assert prefilter.candidates('hi') == {1}
@@ -0,0 +1,56 @@
+from coriander.regex import RegexCapture, RegexTranslator
+from coriander.tokenizers import DefaultTokenizer
+from coriander.tokens import AnyToken, CharToken
+
+
+class TestRegexTranslator:
+    def test_translate(self):
+        tokens = DefaultTokenizer().tokenize('[hi|hello] *')
+
+        regex_template = RegexTranslator().translate(tokens)
+
+        assert regex_template.pattern.pattern == '(?=.)(?:hi|hello)\\ .+?'
+        assert regex_template.captures == []
+
+    def test_translate__captures(self):
+        tokens = DefaultTokenizer().tokenize('INT~age (years)~unit')
+
+        regex_template = RegexTranslator().translate(tokens)
+
+        assert [c.associate_name for c in regex_template.captures] == ['age', 'unit']
+        assert regex_template.captures[0].kind == RegexCapture.KIND_INT
+        assert regex_template.captures[1].kind == RegexCapture.KIND_PRESENT
+
+    def test_translate__nested_names_of_unnamed_container(self):
+        tokens = DefaultTokenizer().tokenize('([a|b]~letter)')
+
+        regex_template = RegexTranslator().translate(tokens)
+
+        assert regex_template.captures == []
+
+    def test_translate__untranslatable_token(self):
+        class CustomToken(AnyToken):
+            pass
+
+        regex_template = RegexTranslator().translate(
+            [CharToken(char='a'), CustomToken()]
+        )
+
+        assert regex_template is None
+
+
+class TestRegexTemplate:
+    def test_match(self):
+        tokens = DefaultTokenizer().tokenize('INT~age (years)~unit old')
+        regex_template = RegexTranslator().translate(tokens)
+
+        assert regex_template.match('25 years old') == {'age': 25, 'unit': True}
+        assert regex_template.match('25  old') == {'age': 25, 'unit': False}
+        assert regex_template.match('25 old') is None
+
+    def test_match__not_reached_capture(self):
+        tokens = DefaultTokenizer().tokenize('[(a)~x|b]~y')
+        regex_template = RegexTranslator().translate(tokens)
+
+        assert regex_template.match('b') == {'y': 'b'}
+        assert regex_template.match('a') == {'y': 'a', 'x': True}
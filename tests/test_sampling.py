@@ -0,0 +1,105 @@
+from unittest import mock
+
+import pytest
+
+from coriander.sampling import (
+    NumpySampler,
+    PythonSampler,
+    create_sampler,
+    numpy,
+    stream_seed,
+)
+
+
+class TestPythonSampler:
+    def test_integers(self):
+        sampler = PythonSampler(seed=1)
+
+        integers = sampler.integers(2, 5, 1000)
+
+        assert len(integers) == 1000
+        assert set(integers) == {2, 3, 4}
+
+    def test_choices(self):
+        sampler = PythonSampler(seed=1)
+
+        choices = sampler.choices(['a', 'b'], 100)
+
+        assert len(choices) == 100
+        assert set(choices) == {'a', 'b'}
+
+    def test_text(self):
+        sampler = PythonSampler(seed=1)
+
+        text = sampler.text('abc', 3000)
+
+        assert len(text) == 3000
+        assert all(900 < text.count(char) < 1100 for char in 'abc')
+
+    def test_text__not_ascii(self):
+        sampler = PythonSampler(seed=1)
+
+        text = sampler.text('äö', 100)
+
+        assert len(text) == 100
+        assert set(text) == {'ä', 'ö'}
+
+    def test_seed(self):
+        first_sampler = PythonSampler(seed=5)
+        second_sampler = PythonSampler(seed=5)
+
+        assert first_sampler.text('abc', 20) == second_sampler.text('abc', 20)
+        assert first_sampler.integers(0, 9, 20) == second_sampler.integers(0, 9, 20)
+
+
+@pytest.mark.skipif(numpy is None, reason='requires numpy')
+class TestNumpySampler:
+    def test_integers(self):
+        sampler = NumpySampler(seed=1)
+
+        integers = sampler.integers(2, 5, 1000)
+
+        assert len(integers) == 1000
+        assert set(integers) == {2, 3, 4}
+        assert all(type(integer) is int for integer in integers)
+
+    def test_choices(self):
+        sampler = NumpySampler(seed=1)
+
+        choices = sampler.choices(['a', 'bc'], 100)
+
+        assert set(choices) == {'a', 'bc'}
+        assert all(type(choice) is str for choice in choices)
+
+    def test_text(self):
+        sampler = NumpySampler(seed=1)
+
+        text = sampler.text('abc', 3000)
+
+        assert len(text) == 3000
+        assert all(900 < text.count(char) < 1100 for char in 'abc')
+
+    def test_seed(self):
+        first_sampler = NumpySampler(seed=5)
+        second_sampler = NumpySampler(seed=5)
+
+        assert first_sampler.text('abc', 20) == second_sampler.text('abc', 20)
+
+
+class TestStreamSeed:
+    def test_stream_seed(self):
+        assert stream_seed(1, 'chunk', 0) == 134124555482060150672488263649267000327
+        assert stream_seed(1, 'chunk', 0) != stream_seed(1, 'chunk', 1)
+        assert stream_seed(1, 'chunk', 0) != stream_seed(2, 'chunk', 0)
+
+
+class TestCreateSampler:
+    def test_create_sampler__without_numpy(self):
+        with mock.patch('coriander.sampling.numpy', None):
+            sampler = create_sampler(seed=1)
+
+        assert isinstance(sampler, PythonSampler)
+
+    @pytest.mark.skipif(numpy is None, reason='requires numpy')
+    def test_create_sampler__numpy(self):
+        assert isinstance(create_sampler(seed=1), NumpySampler)
@@ -1,13 +1,23 @@
-from typing import Optional
+from typing import FrozenSet, Optional
+from unittest import mock
 
-from coriander.core import BaseTokenFinder, BaseTokenizer, FindTokenInTemplateResult
+import pytest
+
+from coriander.core import (
+    BaseTokenFinder,
+    BaseTokenizer,
+    FindTokenInTemplateResult,
+    TemplateScan,
+)
 from coriander.tokenizers import DefaultTokenizer, Tokenizer
 from coriander.tokens import (
     AnyToken,
     AnyTokenFinder,
     CharToken,
     CharTokenFinder,
+    ChoiceToken,
     ChoiceTokenFinder,
+    OptionalToken,
 )
 
 
@@ -84,6 +94,74 @@ class TestTokenizer:
         assert tokens[1].associate_name is None  # space char
         assert tokens[2].associate_name == 'age'
 
+    def test_tokenize__associate_name_inside_brackets(self):
+        tokenizer = DefaultTokenizer()
+
+        tokens = tokenizer.tokenize(template='[a~x|(b~y)~z]~w')
+
+        assert tokens[0].associate_name == 'w'
+        assert tokens[0].choices[0][0].associate_name == 'x'
+        assert tokens[0].choices[1][0].associate_name == 'z'
+        assert tokens[0].choices[1][0].tokens[0].associate_name == 'y'
+
+    def test_tokenize__bracket_closed_outside_nested_template(self):
+        tokenizer = DefaultTokenizer()
+
+        tokens = tokenizer.tokenize(template='[a(b]c)')
+
+        assert tokens == [
+            ChoiceToken(
+                choices=[[CharToken(char='a'), CharToken(char='('), CharToken('b')]]
+            ),
+            CharToken(char='c'),
+            CharToken(char=')'),
+        ]
+
+    def test_tokenize__deeply_nested(self):
+        tokenizer = DefaultTokenizer()
+
+        tokens = tokenizer.tokenize(template='(' * 100 + 'a' + ')' * 100)
+
+        token = tokens[0]
+        for _ in range(99):
+            token = token.tokens[0]
+        assert token == OptionalToken(tokens=[CharToken(char='a')])
+
+    def test_tokenize__dispatch_by_start_char(self):
+        class StarTokenFinder(BaseTokenFinder):
+            def find_in_template(self, template, tokenizer):
+                return FindTokenInTemplateResult(token=AnyToken(), end=1)
+
+            def start_chars(self) -> Optional[FrozenSet[str]]:
+                return frozenset('*')
+
+        token_finder = mock.Mock(wraps=StarTokenFinder())
+        token_finder.start_chars.return_value = frozenset('*')
+        tokenizer = Tokenizer(token_finders=[token_finder, CharTokenFinder()])
+
+        tokens = tokenizer.tokenize(template='ab*')
+
+        assert tokens == [CharToken(char='a'), CharToken(char='b'), AnyToken()]
+        assert token_finder.find_in_template_at.call_count == 1
+
+    def test_tokenize__no_token_finder(self):
+        tokenizer = Tokenizer(token_finders=[AnyTokenFinder()])
+
+        with pytest.raises(ValueError):
+            tokenizer.tokenize(template='*a')
+
+    def test_tokenize_at(self):
+        tokenizer = DefaultTokenizer()
+
+        tokens = tokenizer.tokenize_at(
+            scan=TemplateScan('[a|b] (c)~x'),
+            start=6,
+            end=11,
+        )
+
+        assert tokens == [OptionalToken(tokens=[CharToken(char='c')])]
+        assert tokens[0].associate_name == 'x'
+
 
 class TestDefaultTokenizer:
     def test_tokenize(self):
@@ -123,3 +201,26 @@ class TestDefaultTokenizer:
             AnyToken(),
         ]
         assert actual_tokens == expected_tokens
+
+    def test_tokenize__with_custom_token_finders_nested(self):
+        class AllTokenFinder(BaseTokenFinder):
+            def find_in_template(
+                self,
+                template: str,
+                tokenizer: 'BaseTokenizer',
+            ) -> Optional[FindTokenInTemplateResult]:
+                if template[0] != '!':
+                    return None
+                return FindTokenInTemplateResult(
+                    end=len(template),
+                    token=AnyToken(),
+                )
+
+        tokenizer = DefaultTokenizer(custom_token_finders=[AllTokenFinder()])
+
+        actual_tokens = tokenizer.tokenize(template='[!ab|c]d')
+
+        assert actual_tokens == [
+            ChoiceToken(choices=[[AnyToken()], [CharToken(char='c')]]),
+            CharToken(char='d'),
+        ]
@@ -1,5 +1,6 @@
 from unittest import mock
 
+from coriander.core import TemplateScan
 from coriander.generation import DefaultGenerator
 from coriander.matching import Matcher
 from coriander.tokenizers import DefaultTokenizer
@@ -12,9 +13,11 @@ from coriander.tokens import (
     ChoiceTokenFinder,
     IntToken,
     IntTokenFinder,
+    LiteralToken,
     OptionalToken,
     OptionalTokenFinder,
 )
+from coriander.tries import LiteralTrie
 
 
 class TestAnyToken:
@@ -23,6 +26,12 @@ class TestAnyToken:
 
         assert repr(token) == 'AnyToken()'
 
+    def test_repr__anchor(self):
+        token = AnyToken(anchor=' ')
+
+        assert repr(token) == 'AnyToken(anchor=\' \')'
+        assert token != AnyToken()
+
     def test_match_with_message(self):
         token = AnyToken()
 
@@ -37,6 +46,30 @@ class TestAnyToken:
         assert match_token_with_message_results[3].end == 4
         assert match_token_with_message_results[4].end == 5
 
+    def test_match_with_message_at(self):
+        token = AnyToken()
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='hello',
+            start=3,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert [r.end for r in match_token_with_message_results] == [4, 5]
+        assert [r.value for r in match_token_with_message_results] == ['l', 'lo']
+
+    def test_iter_match_with_message_at(self):
+        token = AnyToken()
+
+        match_token_with_message_results = token.iter_match_with_message_at(
+            message='hello',
+            start=1,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert next(match_token_with_message_results).value == 'e'
+        assert next(match_token_with_message_results).value == 'el'
+
     def test_generate_message(self):
         token = AnyToken()
 
@@ -48,6 +81,34 @@ class TestAnyToken:
 
         assert message
 
+    def test_match_with_message_at__anchor(self):
+        token = AnyToken(anchor=' ')
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='a b c ',
+            start=0,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert [r.end for r in match_token_with_message_results] == [1, 3, 5]
+        assert [r.value for r in match_token_with_message_results] == [
+            'a',
+            'a b',
+            'a b c',
+        ]
+
+    def test_iter_match_with_message_at__anchor(self):
+        token = AnyToken(anchor='b')
+
+        match_token_with_message_results = token.iter_match_with_message_at(
+            message='bab b',
+            start=0,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        # Ends at the start are skipped, the any token matches something.
+        assert [r.end for r in match_token_with_message_results] == [2, 4]
+
 
 class TestAnyTokenFinder:
     def test_find_in_template(self):
@@ -101,6 +162,18 @@ class TestCharToken:
 
         assert match_token_with_message_results == []
 
+    def test_match_with_message_at(self):
+        token = CharToken(char='l')
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='hello',
+            start=2,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert match_token_with_message_results[0].end == 3
+        assert match_token_with_message_results[0].value == 'l'
+
     def test_generate_message(self):
         token = CharToken(char='h')
 
@@ -128,6 +201,53 @@ class TestCharTokenFinder:
         assert find_token_in_template_result.end == 1
 
 
+class TestLiteralToken:
+    def test_repr(self):
+        token = LiteralToken(text='hello')
+
+        assert repr(token) == "LiteralToken(text='hello')"
+
+    def test_match_with_message_at(self):
+        token = LiteralToken(text='ll')
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='hello',
+            start=2,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+        no_match_token_with_message_results = token.match_with_message_at(
+            message='hello',
+            start=1,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert len(match_token_with_message_results) == 1
+        assert match_token_with_message_results[0].end == 4
+        assert match_token_with_message_results[0].value == 'll'
+        assert no_match_token_with_message_results == []
+
+    def test_match_with_message(self):
+        token = LiteralToken(text='he')
+
+        match_token_with_message_results = token.match_with_message(
+            message='hello',
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert match_token_with_message_results[0].end == 2
+
+    def test_generate_message(self):
+        token = LiteralToken(text='hello')
+
+        message = token.generate_message(
+            generator=DefaultGenerator(),
+            value=None,
+            context={},
+        )
+
+        assert message == 'hello'
+
+
 class TestOptionalToken:
     def test_repr(self):
         token = OptionalToken(tokens=[AnyToken(), CharToken(char='a')])
@@ -145,6 +265,34 @@ class TestOptionalToken:
         assert match_token_with_message_results[0].end == 0
         assert match_token_with_message_results[1].end == 1
 
+    def test_match_with_message_at(self):
+        token = OptionalToken(tokens=[CharToken(char='l')])
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='hello',
+            start=2,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert match_token_with_message_results[0].end == 2
+        assert match_token_with_message_results[0].value is False
+        assert match_token_with_message_results[1].end == 3
+        assert match_token_with_message_results[1].value is True
+
+    def test_iter_match_with_message_at(self):
+        token = OptionalToken(tokens=[CharToken(char='l')])
+
+        match_token_with_message_results = list(
+            token.iter_match_with_message_at(
+                message='hello',
+                start=2,
+                matcher=Matcher(tokenizer=DefaultTokenizer()),
+            )
+        )
+
+        assert [r.end for r in match_token_with_message_results] == [2, 3]
+        assert [r.value for r in match_token_with_message_results] == [False, True]
+
     @mock.patch('random.choice')
     def test_generate_message__random_true(self, choice_mock):
         choice_mock.return_value = True
@@ -356,6 +504,41 @@ class TestChoiceToken:
 
         assert token_ending_variants == []
 
+    def test_match_with_message_at(self):
+        token = ChoiceToken(
+            choices=[
+                [CharToken(char='l')],
+                [CharToken(char='l'), CharToken(char='o')],
+            ]
+        )
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='hello',
+            start=3,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert [r.end for r in match_token_with_message_results] == [4, 5]
+        assert [r.value for r in match_token_with_message_results] == ['l', 'lo']
+
+    def test_iter_match_with_message_at(self):
+        token = ChoiceToken(
+            choices=[
+                [CharToken(char='l'), CharToken(char='o')],
+                [CharToken(char='l')],
+            ]
+        )
+
+        match_token_with_message_results = list(
+            token.iter_match_with_message_at(
+                message='hello',
+                start=3,
+                matcher=Matcher(tokenizer=DefaultTokenizer()),
+            )
+        )
+
+        assert [r.value for r in match_token_with_message_results] == ['lo', 'l']
+
     @mock.patch('random.choice')
     def test_generate_message(self, choice_mock):
         choices = [
@@ -395,6 +578,28 @@ class TestChoiceToken:
 
         assert message == ''
 
+    def test_match_with_message_at__literal_trie(self):
+        token = ChoiceToken(choices=[[LiteralToken('hey there')], [CharToken('h')]])
+        token.literal_trie = LiteralTrie(['hey there', 'h'])
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='oh hey there',
+            start=3,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert [r.end for r in match_token_with_message_results] == [12, 4]
+        assert [r.value for r in match_token_with_message_results] == [
+            'hey there',
+            'h',
+        ]
+        iterated_results = token.iter_match_with_message_at(
+            message='oh hey there',
+            start=3,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+        assert list(iterated_results) == match_token_with_message_results
+
 
 class TestChoiceTokenFinder:
     def test_find_in_template(self):
@@ -425,6 +630,28 @@ class TestChoiceTokenFinder:
         assert find_token_in_template_result.token == expected_token
         assert find_token_in_template_result.end == 10
 
+    def test_find_in_template_at(self):
+        tokenizer = DefaultTokenizer()
+        token_in_template_finder = ChoiceTokenFinder()
+
+        find_token_in_template_result = token_in_template_finder.find_in_template_at(
+            scan=TemplateScan('hi [a|[b|c]] [d]'),
+            start=3,
+            end=16,
+            tokenizer=tokenizer,
+        )
+
+        expected_token = ChoiceToken(
+            choices=[
+                [CharToken(char='a')],
+                [ChoiceToken(choices=[[CharToken(char='b')], [CharToken(char='c')]])],
+            ]
+        )
+
+        assert find_token_in_template_result
+        assert find_token_in_template_result.token == expected_token
+        assert find_token_in_template_result.end == 12
+
     def test_find_in_template__nested_tokens(self):
         tokenizer = DefaultTokenizer()
         token_in_template_finder = ChoiceTokenFinder()
@@ -504,6 +731,18 @@ class TestIntToken:
 
         assert not match_token_with_message_results
 
+    def test_match_with_message_at(self):
+        token = IntToken()
+
+        match_token_with_message_results = token.match_with_message_at(
+            message='age 25',
+            start=4,
+            matcher=Matcher(tokenizer=DefaultTokenizer()),
+        )
+
+        assert match_token_with_message_results[0].end == 6
+        assert match_token_with_message_results[0].value == 25
+
     def test_generate_message(self):
         token = IntToken()
 
@@ -554,3 +793,28 @@ class TestIntTokenFinder:
         )
 
         assert not find_token_in_template_result
+
+    def test_find_in_template_at(self):
+        tokenizer = DefaultTokenizer()
+        token_in_template_finder = IntTokenFinder()
+        scan = TemplateScan('a INT b')
+
+        find_token_in_template_result = token_in_template_finder.find_in_template_at(
+            scan=scan,
+            start=2,
+            end=7,
+            tokenizer=tokenizer,
+        )
+        cut_find_token_in_template_result = (
+            token_in_template_finder.find_in_template_at(
+                scan=scan,
+                start=2,
+                end=4,
+                tokenizer=tokenizer,
+            )
+        )
+
+        assert find_token_in_template_result
+        assert find_token_in_template_result.token == IntToken()
+        assert find_token_in_template_result.end == 5
+        assert not cut_find_token_in_template_result
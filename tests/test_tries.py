@@ -0,0 +1,49 @@
+import gc
+import pickle
+import weakref
+
+from coriander.tries import LiteralTrie, literal_trie
+
+
+class TestLiteralTrie:
+    def test_repr(self):
+        trie = LiteralTrie(['hi', 'hey'])
+
+        assert repr(trie) == 'LiteralTrie(texts=[\'hi\', \'hey\'])'
+
+    def test_match_at(self):
+        trie = LiteralTrie(['hey there', 'hi', 'hey'])
+
+        assert trie.match_at('hey there!', 0) == [9, 3]
+        assert trie.match_at('oh hi', 3) == [5]
+        assert trie.match_at('hello', 0) == []
+
+    def test_match_at__order_of_texts(self):
+        trie = LiteralTrie(['ab', 'a', 'ab'])
+
+        assert trie.match_at('abc', 0) == [2, 1, 2]
+
+    def test_match_at__empty_text(self):
+        trie = LiteralTrie(['a', ''])
+
+        assert trie.match_at('ab', 0) == [1, 0]
+        assert trie.match_at('ab', 2) == [2]
+
+    def test_pickle(self):
+        trie = literal_trie(['hi', 'hey'])
+
+        assert pickle.loads(pickle.dumps(trie)) is trie
+
+
+class TestSharedLiteralTrie:
+    def test_literal_trie(self):
+        trie = literal_trie(['hi', 'hey'])
+
+        assert literal_trie(('hi', 'hey')) is trie
+        assert literal_trie(['hey', 'hi']) is not trie
+
+    def test_literal_trie__released(self):
+        trie_ref = weakref.ref(literal_trie(['released']))
+        gc.collect()
+
+        assert trie_ref() is None